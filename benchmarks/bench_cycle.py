@@ -0,0 +1,331 @@
+"""بنچمارک انتها به انتهای چرخه خبرگیری با فیدهای ضبط شده و شبیه‌سازهای محلی
+
+fetch_news_async_with_report بدون دسترسی به اینترنت اجرا می‌شود: فیدها، Bot API تلگرام و
+MyMemory همه از benchmarks/stubs.py سرو می‌شوند. چرخه اول سرد است (همه خبرها جدید) و در
+چرخه‌های بعدی هر منبع چند خبر تازه می‌گیرد.
+
+اجرا از ریشه پروژه:
+    python benchmarks/bench_cycle.py [--cycles N] [--compare benchmarks/results/<commit>.json]
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import platform
+import resource
+import tempfile
+import subprocess
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from redis_standin import RedisStandIn  # noqa: E402
+from stubs import FeedServer, MyMemoryStub, StubCluster, TelegramStub, write_sources  # noqa: E402
+
+# منابع ویژه: فید کوچک، خراب (bozo)، خالی (مسیر fallback) و فید واقعی گاردین با خبرهای مشابه
+SPECIAL_FIXTURES = {
+    "fa": ["malformed_feed.xml", "empty_feed.xml"],
+    "en": ["small_feed.xml", "guardian_world.xml"],
+}
+LARGE_FIXTURES = {"fa": "large_fa_feed.xml", "en": "large_en_feed.xml"}
+
+# مرحله → هیستوگرام metrics؛ زمان‌ها هم‌پوشان‌اند (کارهای هم‌زمان) و جمع آن‌ها «ثانیه مشغول» است
+STAGES = {
+    "fetch": "FETCH_SECONDS",
+    "parse": "PARSE_SECONDS",
+    "dedup": "DEDUP_SECONDS",
+    "translate": "TRANSLATE_SECONDS",
+    "send": "SEND_SECONDS",
+}
+COUNTERS = {
+    "entries_seen": "ENTRIES_SEEN",
+    "duplicates": "DUPLICATES",
+    "sent": "SENT",
+    "errors": "ERRORS",
+    "rate_limited": "RATE_LIMITED",
+    "translation_fallbacks": "TRANSLATION_FALLBACKS",
+}
+
+# معیارهای مقایسه: (مسیر در خلاصه نتیجه، True اگر مقدار بیشتر بهتر است)
+COMPARED = {
+    "cold_wall_seconds": False,
+    "warm_wall_seconds": False,
+    "cold_messages_per_second": True,
+    "warm_messages_per_second": True,
+    "peak_rss_mb": False,
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Offline news cycle benchmark")
+    parser.add_argument("--cycles", type=int, default=3, help="number of cycles; the first one is cold")
+    parser.add_argument("--items", type=int, default=10, help="entries per source in the cold cycle")
+    parser.add_argument("--new-per-cycle", type=int, default=2, help="fresh entries per source in warm cycles")
+    parser.add_argument("--feed-latency", type=float, default=0.02)
+    parser.add_argument("--telegram-latency", type=float, default=0.01)
+    parser.add_argument("--translate-latency", type=float, default=0.05)
+    parser.add_argument("--telegram-429-every", type=int, default=0, help="answer every Nth sendMessage with 429")
+    parser.add_argument("--translate-429-every", type=int, default=0, help="answer every Nth translation with 429")
+    parser.add_argument("--realistic-rate", action="store_true",
+                        help="keep the production Telegram send rate limits instead of lifting them")
+    parser.add_argument("--coordination", choices=("sqlite", "redis"), default="sqlite",
+                        help="coordination backend; redis runs against the local stand-in")
+    parser.add_argument("--trace-memory", action="store_true", help="also report the tracemalloc peak (slower)")
+    parser.add_argument("--output", help="result file (default: benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", help="baseline result file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="relative regression that fails the comparison (default 0.15)")
+    args = parser.parse_args()
+    # بنچمارک در پوشه موقت اجرا می‌شود؛ مسیرهای نسبی از همین ابتدا مطلق می‌شوند
+    args.output = os.path.abspath(args.output) if args.output else None
+    args.compare = os.path.abspath(args.compare) if args.compare else None
+    return args
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT_DIR,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return commit + ("-dirty" if dirty else "")
+
+
+def build_plan(sources, args):
+    """برش خبرهای هر منبع؛ برش‌ها جدا هستند تا خبر تکراری بین منابع فقط در فید گاردین باشد"""
+    room = args.items + args.new_per_cycle * args.cycles
+    special = {lang: list(names) for lang, names in SPECIAL_FIXTURES.items()}
+    slots = {"fa": 0, "en": 0}
+    plan, rolling = [], {}
+
+    for index, source in reversed(list(enumerate(sources))):
+        lang = "en" if source.get("lang") == "en" else "fa"
+        if special[lang]:
+            plan.append((index, (special[lang].pop(), 0, None)))
+            continue
+        # خبرهای جدیدتر ابتدای فایل‌اند؛ هر چرخه گرم برش را new_per_cycle خبر به عقب می‌برد
+        start = slots[lang] * room + args.new_per_cycle * args.cycles
+        slots[lang] += 1
+        rolling[index] = (LARGE_FIXTURES[lang], start)
+        plan.append((index, (LARGE_FIXTURES[lang], start, args.items)))
+
+    return [entry for _, entry in sorted(plan)], rolling
+
+
+def metrics_snapshot(metrics):
+    snapshot = {}
+    for stage, attr in STAGES.items():
+        seconds, count = getattr(metrics, attr).totals()
+        snapshot[stage] = {"seconds": seconds, "count": count}
+    for key, attr in COUNTERS.items():
+        snapshot[key] = getattr(metrics, attr).total()
+    return snapshot
+
+
+def metrics_delta(before, after):
+    delta = {}
+    for key, value in after.items():
+        if isinstance(value, dict):
+            delta[key] = {
+                "seconds": round(value["seconds"] - before[key]["seconds"], 4),
+                "count": value["count"] - before[key]["count"],
+            }
+        else:
+            delta[key] = value - before[key]
+    return delta
+
+
+def counters_delta(before, after):
+    return {
+        name: {key: value - before[name].get(key, 0) for key, value in counters.items()}
+        for name, counters in after.items()
+    }
+
+
+def peak_rss_mb():
+    # ru_maxrss روی لینوکس کیلوبایت و روی macOS بایت است
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+async def run_cycle(main):
+    # Bot به session همان loop وابسته است و باید داخل loop ساخته شود
+    return await main.fetch_news_async_with_report(main.get_bot())
+
+
+def run_benchmark(args):
+    with open(os.path.join(ROOT_DIR, "sources.json"), "r", encoding="utf-8") as f:
+        sources = json.load(f)
+
+    plan, rolling = build_plan(sources, args)
+    feeds = FeedServer(plan, latency=args.feed_latency)
+    telegram = TelegramStub(latency=args.telegram_latency, rate_limit_every=args.telegram_429_every)
+    translator = MyMemoryStub(latency=args.translate_latency, rate_limit_every=args.translate_429_every)
+    cluster = StubCluster(feeds=feeds, telegram=telegram, translate=translator)
+    urls = cluster.start()
+    redis = RedisStandIn() if args.coordination == "redis" else None
+
+    # فایل‌های وضعیت ربات (sent_news.db، feed_state.json و ...) در پوشه موقت ساخته می‌شوند
+    workdir = tempfile.mkdtemp(prefix="cafeshams-bench-")
+    os.chdir(workdir)
+    sources_file = os.path.join(workdir, "sources.json")
+    write_sources(sources_file, sources, urls["feeds"])
+
+    os.environ.update({
+        "BOT_TOKEN": "123456:BENCH",
+        "TELEGRAM_API_URL": urls["telegram"] + "/bot",
+        "TRANSLATION_API_URL": urls["translate"] + "/get",
+        "SOURCES_FILE": sources_file,
+        "FEED_INITIAL_ENTRIES": str(args.items),
+        "FEED_MAX_ENTRIES_PER_CYCLE": str(max(args.items, args.new_per_cycle)),
+        # همه فیدها روی یک میزبان محلی‌اند؛ سقف هر میزبان نباید کل چرخه را سریالی کند
+        "FETCH_PER_HOST": os.getenv("FETCH_CONCURRENCY", "10"),
+        "COORDINATION_BACKEND": args.coordination,
+    })
+    if redis is not None:
+        os.environ["REDIS_URL"] = redis.start()
+    if not args.realistic_rate:
+        os.environ.update({
+            "TELEGRAM_GROUP_RATE_PER_MIN": "100000",
+            "TELEGRAM_GROUP_BURST": "1000",
+            "TELEGRAM_GLOBAL_RATE": "1000",
+        })
+
+    if args.trace_memory:
+        tracemalloc.start()
+
+    import main
+    import metrics
+    import runtime
+
+    logging.getLogger().setLevel(logging.WARNING)
+    main.load_sent_news()
+    main.load_feed_state()
+    main.translation_cache.open()
+    main.feed_parsing.warm_up()
+    runtime.add_shutdown_hook(main.send_queue.close)
+    runtime.add_shutdown_hook(main.feed_parsing.shutdown)
+    runtime.add_shutdown_hook(main.coordinator.close)
+    runtime.start()
+
+    cycles = []
+    try:
+        for number in range(args.cycles):
+            if number:
+                for index, (fixture, start) in rolling.items():
+                    feeds.replace(index, fixture, start - number * args.new_per_cycle, args.items)
+
+            before_metrics = metrics_snapshot(metrics)
+            before_stubs = cluster.counters()
+            started = time.perf_counter()
+            result = runtime.run(run_cycle(main), timeout=main.NEWS_CYCLE_TIMEOUT)
+            wall = time.perf_counter() - started
+
+            stages = metrics_delta(before_metrics, metrics_snapshot(metrics))
+            sent = result.get("total_sent", 0)
+            cycle = {
+                "cycle": number + 1,
+                "kind": "cold" if number == 0 else "warm",
+                "status": result.get("status"),
+                "wall_seconds": round(wall, 3),
+                "messages_sent": sent,
+                "messages_per_second": round(sent / wall, 2) if wall else 0,
+                "entries_per_second": round(stages["entries_seen"] / wall, 2) if wall else 0,
+                "feed_kb": round(sum(r.get("bytes", 0) for r in result.get("sources", [])) / 1024, 1),
+                "stages": stages,
+                "stubs": counters_delta(before_stubs, cluster.counters()),
+                "peak_rss_mb": peak_rss_mb(),
+            }
+            if args.trace_memory:
+                cycle["peak_traced_mb"] = round(tracemalloc.get_traced_memory()[1] / 1024 / 1024, 1)
+            cycles.append(cycle)
+    finally:
+        runtime.stop()
+        cluster.stop()
+        if redis is not None:
+            redis.stop()
+
+    warm = [cycle for cycle in cycles if cycle["kind"] == "warm"]
+    summary = {
+        "cold_wall_seconds": cycles[0]["wall_seconds"],
+        "cold_messages_per_second": cycles[0]["messages_per_second"],
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    if warm:
+        summary["warm_wall_seconds"] = round(sum(c["wall_seconds"] for c in warm) / len(warm), 3)
+        summary["warm_messages_per_second"] = round(sum(c["messages_per_second"] for c in warm) / len(warm), 2)
+
+    return {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "sources": len(sources),
+        "summary": summary,
+        "cycles": cycles,
+    }
+
+
+def print_result(result):
+    print(f"commit {result['commit']} · Python {result['python']} · {result['sources']} sources")
+    print(f"{'cycle':<8}{'wall s':>8}{'sent':>6}{'msg/s':>8}{'entries':>9}{'feed KB':>9}"
+          + "".join(f"{stage + ' s':>12}" for stage in STAGES) + f"{'429s':>6}{'RSS MB':>8}")
+    for cycle in result["cycles"]:
+        stages = cycle["stages"]
+        rate_limited = sum(counters.get("rate_limited", 0) for counters in cycle["stubs"].values())
+        print(f"{cycle['cycle']} {cycle['kind']:<6}{cycle['wall_seconds']:>8.2f}{cycle['messages_sent']:>6}"
+              f"{cycle['messages_per_second']:>8.1f}{stages['entries_seen']:>9}{cycle.get('feed_kb', 0):>9.0f}"
+              + "".join(f"{stages[stage]['seconds']:>12.3f}" for stage in STAGES)
+              + f"{rate_limited:>6}{cycle['peak_rss_mb']:>8.1f}")
+
+
+def compare(result, baseline_path, threshold):
+    """درصد تغییر نسبت به نتیجه پایه؛ False اگر معیاری بیش از threshold بدتر شده باشد"""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+
+    print(f"\ncompared with {baseline['commit']} ({os.path.basename(baseline_path)}):")
+    config = baseline.get("config", {})
+    if any(config[key] != result["config"].get(key, config[key]) for key in config):
+        print("  ⚠️ benchmark options differ from the baseline; deltas may not be meaningful")
+
+    ok = True
+    for key, higher_is_better in COMPARED.items():
+        old, new = baseline["summary"].get(key), result["summary"].get(key)
+        if not old or new is None:
+            continue
+        change = (new - old) / old
+        worse = -change if higher_is_better else change
+        flag = "REGRESSION" if worse > threshold else ""
+        ok = ok and not flag
+        print(f"  {key:<26}{old:>10}{new:>10}{change:>+9.1%}  {flag}")
+    return ok
+
+
+def main():
+    args = parse_args()
+    result = run_benchmark(args)
+    print_result(result)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{result['commit']}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"\nresult written to {output}")
+
+    if args.compare and not compare(result, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""میکروبنچمارک پاک‌سازی خلاصه خبرها روی فیدهای نمونه
+
+اجرا از ریشه پروژه: python benchmarks/bench_normalizer.py [--repeat N]
+"""
+import os
+import re
+import sys
+import time
+import argparse
+
+import feedparser
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from text_normalizer import extract_summary  # noqa: E402
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def legacy_extract_summary(entry, title):
+    """نسخه قبلی process_and_send_news برای مقایسه"""
+    summary = ""
+    if hasattr(entry, 'summary') and entry.summary:
+        summary = entry.summary
+    elif hasattr(entry, 'content') and entry.content:
+        summary = entry.content[0].value
+
+    summary = re.sub(r'<[^>]+>', '', summary)
+    summary = summary.strip()
+    summary = re.sub(r'https?://[^\s]+\.(mp4|avi|mov|wmv|flv|webm|jpg|jpeg|png|gif)', '', summary)
+    summary = re.sub(r'\[video\]|\[image\]|\[photo\]|\[pic\]', '', summary, flags=re.IGNORECASE)
+    summary = re.sub(r'(تصویر|ویدیو|فیلم|عکس):', '', summary)
+    summary = summary.strip()
+
+    if not summary or summary == title or len(summary) < 50:
+        if hasattr(entry, 'content') and entry.content:
+            for content_item in entry.content:
+                temp_content = re.sub(r'<[^>]+>', '', content_item.value).strip()
+                if len(temp_content) > 100 and temp_content != title:
+                    summary = temp_content
+                    break
+    return summary
+
+
+def load_entries():
+    entries = []
+    for name in sorted(os.listdir(FIXTURES_DIR)):
+        if name.endswith(".xml"):
+            with open(os.path.join(FIXTURES_DIR, name), "rb") as f:
+                entries.extend(feedparser.parse(f.read()).entries)
+    return entries
+
+
+def measure(label, func, entries, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for entry in entries:
+            func(entry, entry.get("title", ""))
+        best = min(best, time.perf_counter() - start)
+    per_entry = best / len(entries) * 1e6
+    print(f"{label:<28} {best * 1000:8.2f} ms  {per_entry:8.1f} µs/entry")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    entries = load_entries()
+    print(f"{len(entries)} entries from {FIXTURES_DIR}\n")
+
+    legacy = measure("legacy re.sub chain", legacy_extract_summary, entries, args.repeat)
+    current = measure("normalizer", extract_summary, entries, args.repeat)
+
+    print(f"\nspeedup: {legacy / current:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""سرور جایگزین کوچک با پروتکل Redis (RESP2) برای بنچمارک و آزمایش چند نسخه‌ای بدون Redis واقعی
+
+فقط دستورهایی که coordination.RedisCoordinator لازم دارد پیاده شده‌اند:
+PING، AUTH، SELECT، GET، SET (NX/XX/PX/EX)، DEL، PEXPIRE، PTTL، SCAN، WATCH/UNWATCH/MULTI/EXEC/DISCARD.
+
+اجرای مستقل: python benchmarks/redis_standin.py --port 6379
+"""
+import time
+import asyncio
+import argparse
+import fnmatch
+import threading
+
+# پاسخ EXEC وقتی کلید WATCH شده تغییر کرده باشد
+NULL_ARRAY = object()
+
+
+class RedisStandIn:
+    def __init__(self):
+        self.data = {}
+        self.expires = {}
+        # نسخه هر کلید برای WATCH؛ هر نوشتن یا انقضا آن را افزایش می‌دهد
+        self.versions = {}
+        self.counters = {"commands": 0, "connections": 0}
+        self._server = None
+        self._writers = set()
+        self._loop = None
+        self._thread = None
+
+    # --- ذخیره‌سازی ---
+
+    def _touch(self, key):
+        self.versions[key] = self.versions.get(key, 0) + 1
+
+    def _alive(self, key):
+        expires = self.expires.get(key)
+        if expires is not None and expires <= time.time():
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+            self._touch(key)
+        return key in self.data
+
+    def _delete(self, key):
+        if self._alive(key):
+            del self.data[key]
+            self.expires.pop(key, None)
+            self._touch(key)
+            return 1
+        return 0
+
+    # --- دستورها ---
+
+    def cmd_ping(self, *args):
+        return ("+", args[0] if args else "PONG")
+
+    def cmd_auth(self, *args):
+        return ("+", "OK")
+
+    def cmd_select(self, *args):
+        return ("+", "OK")
+
+    def cmd_get(self, key):
+        return self.data[key] if self._alive(key) else None
+
+    def cmd_set(self, key, value, *options):
+        options = [option.upper() for option in options]
+        exists = self._alive(key)
+        if "NX" in options and exists or "XX" in options and not exists:
+            return None
+
+        ttl = None
+        for unit, scale in (("PX", 0.001), ("EX", 1)):
+            if unit in options:
+                ttl = int(options[options.index(unit) + 1]) * scale
+        self.data[key] = value
+        if ttl is None:
+            self.expires.pop(key, None)
+        else:
+            self.expires[key] = time.time() + ttl
+        self._touch(key)
+        return ("+", "OK")
+
+    def cmd_del(self, *keys):
+        return sum(self._delete(key) for key in keys)
+
+    def cmd_pexpire(self, key, milliseconds):
+        if not self._alive(key):
+            return 0
+        self.expires[key] = time.time() + int(milliseconds) / 1000
+        self._touch(key)
+        return 1
+
+    def cmd_pttl(self, key):
+        if not self._alive(key):
+            return -2
+        expires = self.expires.get(key)
+        return -1 if expires is None else int((expires - time.time()) * 1000)
+
+    def cmd_scan(self, cursor, *options):
+        options = list(options)
+        pattern = options[options.index("MATCH") + 1] if "MATCH" in options else "*"
+        keys = [key for key in list(self.data) if self._alive(key) and fnmatch.fnmatchcase(key, pattern)]
+        return ["0", keys]
+
+    # --- اتصال و تراکنش ---
+
+    async def _read_command(self, reader):
+        line = await reader.readline()
+        if not line:
+            return None
+        if not line.startswith(b"*"):
+            return line.decode().split()
+        args = []
+        for _ in range(int(line[1:-2])):
+            length = int((await reader.readline())[1:-2])
+            args.append((await reader.readexactly(length + 2))[:-2].decode())
+        return args
+
+    @classmethod
+    def _encode(cls, reply):
+        if reply is None:
+            return b"$-1\r\n"
+        if reply is NULL_ARRAY:
+            return b"*-1\r\n"
+        if isinstance(reply, tuple):
+            kind, text = reply
+            return f"{kind}{text}\r\n".encode()
+        if isinstance(reply, bool):
+            reply = int(reply)
+        if isinstance(reply, int):
+            return b":%d\r\n" % reply
+        if isinstance(reply, list):
+            return b"*%d\r\n" % len(reply) + b"".join(cls._encode(item) for item in reply)
+        data = str(reply).encode()
+        return b"$%d\r\n%s\r\n" % (len(data), data)
+
+    def _execute(self, name, args):
+        handler = getattr(self, f"cmd_{name.lower()}", None)
+        if handler is None:
+            return ("-", f"ERR unknown command '{name}'")
+        try:
+            return handler(*args)
+        except (TypeError, ValueError, IndexError):
+            return ("-", f"ERR wrong arguments for '{name}'")
+
+    async def _handle(self, reader, writer):
+        self.counters["connections"] += 1
+        self._writers.add(writer)
+        watched = {}
+        queued = None
+        try:
+            while True:
+                command = await self._read_command(reader)
+                if not command:
+                    break
+                self.counters["commands"] += 1
+                name, args = command[0].upper(), command[1:]
+
+                if name == "QUIT":
+                    writer.write(b"+OK\r\n")
+                    break
+                if name == "WATCH":
+                    for key in args:
+                        self._alive(key)
+                        watched[key] = self.versions.get(key, 0)
+                    reply = ("+", "OK")
+                elif name == "UNWATCH":
+                    watched.clear()
+                    reply = ("+", "OK")
+                elif name == "MULTI":
+                    queued = []
+                    reply = ("+", "OK")
+                elif name == "DISCARD":
+                    queued = None
+                    watched.clear()
+                    reply = ("+", "OK")
+                elif name == "EXEC":
+                    if queued is None:
+                        reply = ("-", "ERR EXEC without MULTI")
+                    else:
+                        # بدون await بین بررسی و اجرا، پس نسبت به اتصال‌های دیگر اتمی است
+                        for key in watched:
+                            self._alive(key)
+                        changed = any(self.versions.get(key, 0) != version for key, version in watched.items())
+                        reply = NULL_ARRAY if changed else [self._execute(n, a) for n, a in queued]
+                    queued = None
+                    watched.clear()
+                elif queued is not None:
+                    queued.append((name, args))
+                    reply = ("+", "QUEUED")
+                else:
+                    reply = self._execute(name, args)
+
+                writer.write(self._encode(reply))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=0):
+        self._server = await asyncio.start_server(self._handle, host, port)
+        return self._server.sockets[0].getsockname()[1]
+
+    def start(self, host="127.0.0.1", port=0):
+        """اجرا روی یک thread جدا؛ آدرس redis:// برمی‌گرداند"""
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="redis-standin", daemon=True)
+        self._thread.start()
+        port = asyncio.run_coroutine_threadsafe(self.serve(host, port), self._loop).result(10)
+        return f"redis://{host}:{port}/0"
+
+    def stop(self):
+        async def close():
+            self._server.close()
+            for writer in list(self._writers):
+                writer.close()
+            await self._server.wait_closed()
+
+        asyncio.run_coroutine_threadsafe(close(), self._loop).result(10)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(10)
+        self._loop.close()
+
+
+async def _main(host, port):
+    standin = RedisStandIn()
+    port = await standin.serve(host, port)
+    print(f"Redis stand-in listening on redis://{host}:{port}/0")
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Minimal Redis-protocol stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6379)
+    args = parser.parse_args()
+    try:
+        asyncio.run(_main(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,206 @@
+"""سرورهای شبیه‌ساز محلی برای بنچمارک: فیدهای ضبط شده، Bot API تلگرام و MyMemory
+
+هر سرور تأخیر پاسخ قابل تنظیم دارد و می‌تواند هر N درخواست یک بار پاسخ 429 بدهد.
+"""
+import os
+import re
+import json
+import time
+import asyncio
+import hashlib
+import threading
+
+from aiohttp import web
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+ITEM_RE = re.compile(rb"<item\b.*?</item>", re.DOTALL)
+
+
+class _Stub:
+    """پایه سرورها: شمارش درخواست‌ها، تأخیر و 429 دوره‌ای"""
+
+    def __init__(self, latency=0.0, rate_limit_every=0):
+        self.latency = latency
+        self.rate_limit_every = rate_limit_every
+        self.counters = {"requests": 0, "rate_limited": 0}
+
+    async def _enter(self):
+        self.counters["requests"] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.rate_limit_every and self.counters["requests"] % self.rate_limit_every == 0:
+            self.counters["rate_limited"] += 1
+            return True
+        return False
+
+    def routes(self):
+        raise NotImplementedError
+
+
+class FeedServer(_Stub):
+    """فیدهای ضبط شده؛ هر منبع برشی جدا از خبرهای یک فایل می‌گیرد تا خبرها تکراری نباشند
+
+    plan فهرست (نام فایل، شروع برش، تعداد خبر) به ترتیب اندیس منبع است؛ تعداد None یعنی کل فایل.
+    """
+
+    def __init__(self, plan, latency=0.0, rate_limit_every=0, archive="archive.html"):
+        super().__init__(latency, rate_limit_every)
+        self.plan = plan
+        self._fixtures = {}
+        self._bodies = [self._render(*entry) for entry in plan]
+        with open(os.path.join(FIXTURES_DIR, archive), "rb") as f:
+            self._archive = f.read()
+        self.counters["not_modified"] = 0
+
+    def _fixture(self, name):
+        if name not in self._fixtures:
+            with open(os.path.join(FIXTURES_DIR, name), "rb") as f:
+                data = f.read()
+            items = list(ITEM_RE.finditer(data))
+            self._fixtures[name] = (data, items)
+        return self._fixtures[name]
+
+    def _render(self, name, start=0, count=None):
+        data, items = self._fixture(name)
+        if count is None or not items:
+            body = data
+        else:
+            chosen = [items[(start + i) % len(items)].group(0) for i in range(count)]
+            body = data[:items[0].start()] + b"\n".join(chosen) + data[items[-1].end():]
+        etag = '"' + hashlib.md5(body).hexdigest() + '"'
+        return body, etag
+
+    def replace(self, index, name, start=0, count=None):
+        """تغییر محتوای یک منبع بین چرخه‌ها (مثلاً برای شبیه‌سازی خبر جدید)"""
+        self._bodies[index] = self._render(name, start, count)
+
+    async def feed(self, request):
+        if await self._enter():
+            return web.Response(status=429)
+        body, etag = self._bodies[int(request.match_info["index"])]
+        if request.headers.get("If-None-Match") == etag:
+            self.counters["not_modified"] += 1
+            return web.Response(status=304, headers={"ETag": etag})
+        response = web.Response(body=body, content_type="application/rss+xml", charset="utf-8",
+                                headers={"ETag": etag})
+        response.enable_compression()
+        return response
+
+    async def archive(self, request):
+        if await self._enter():
+            return web.Response(status=429)
+        return web.Response(body=self._archive, content_type="text/html", charset="utf-8")
+
+    def routes(self):
+        return [web.get("/feed/{index}", self.feed), web.get("/archive/{index}", self.archive)]
+
+
+class TelegramStub(_Stub):
+    """شبیه‌ساز Bot API: getMe و sendMessage با پاسخ 429 و retry_after"""
+
+    def __init__(self, latency=0.0, rate_limit_every=0, retry_after=1):
+        super().__init__(latency, rate_limit_every)
+        self.retry_after = retry_after
+        self.messages = []
+
+    @staticmethod
+    def _ok(result):
+        return web.json_response({"ok": True, "result": result})
+
+    async def method(self, request):
+        name = request.match_info["method"]
+        if name == "getMe":
+            return self._ok({"id": 1, "is_bot": True, "first_name": "Bench", "username": "bench_bot"})
+
+        if await self._enter():
+            return web.json_response({
+                "ok": False, "error_code": 429,
+                "description": f"Too Many Requests: retry after {self.retry_after}",
+                "parameters": {"retry_after": self.retry_after}
+            }, status=429)
+
+        if request.content_type == "application/json":
+            params = await request.json()
+        else:
+            params = dict(await request.post())
+        chat_id = int(params.get("chat_id", 0))
+        self.messages.append(params.get("text", ""))
+        return self._ok({
+            "message_id": len(self.messages),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "supergroup" if chat_id < 0 else "private"},
+            "text": params.get("text", "")
+        })
+
+    def routes(self):
+        return [web.post("/bot{token}/{method}", self.method)]
+
+
+class MyMemoryStub(_Stub):
+    """شبیه‌ساز endpoint /get سرویس MyMemory؛ هر خط متن جداگانه «ترجمه» می‌شود"""
+
+    async def get(self, request):
+        if await self._enter():
+            return web.json_response({"responseStatus": 429, "responseDetails": "TOO MANY REQUESTS"}, status=429)
+        text = request.query.get("q", "")
+        translated = "\n".join(f"ترجمه: {line}" if line else line for line in text.split("\n"))
+        return web.json_response({"responseData": {"translatedText": translated}, "responseStatus": 200})
+
+    def routes(self):
+        return [web.get("/get", self.get)]
+
+
+class StubCluster:
+    """اجرای سرورهای شبیه‌ساز روی event loop جداگانه، مستقل از loop برنامه"""
+
+    def __init__(self, **stubs):
+        self.stubs = stubs
+        self.urls = {}
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="bench-stubs", daemon=True)
+        self._runners = []
+
+    async def _start_one(self, stub):
+        app = web.Application()
+        app.add_routes(stub.routes())
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        self._runners.append(runner)
+        host, port = runner.addresses[0][:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread.start()
+        for name, stub in self.stubs.items():
+            self.urls[name] = asyncio.run_coroutine_threadsafe(self._start_one(stub), self._loop).result(10)
+        return self.urls
+
+    def stop(self):
+        async def cleanup():
+            for runner in self._runners:
+                await runner.cleanup()
+
+        asyncio.run_coroutine_threadsafe(cleanup(), self._loop).result(10)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(10)
+        self._loop.close()
+
+    def counters(self):
+        return {name: dict(stub.counters) for name, stub in self.stubs.items()}
+
+
+def write_sources(path, sources, feed_url):
+    """نسخه sources.json که همه منابع آن به سرور فید محلی اشاره می‌کنند"""
+    local = []
+    for index, source in enumerate(sources):
+        local.append({
+            **source,
+            "rss": f"{feed_url}/feed/{index}",
+            "fallback": f"{feed_url}/archive/{index}",
+            "scrape": {"link_pattern": r"/news/\d+"}
+        })
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(local, f, ensure_ascii=False, indent=1)
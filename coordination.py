@@ -0,0 +1,340 @@
+import os
+import time
+import socket
+import asyncio
+import sqlite3
+import logging
+import threading
+from urllib.parse import urlsplit
+
+# هماهنگی چند نسخه هم‌زمان ربات: قفل رهبری چرخه خودکار و رزرو اتمی هش خبر پیش از ارسال
+COORDINATION_BACKEND = os.getenv("COORDINATION_BACKEND", "sqlite")
+COORDINATION_DB_FILE = os.getenv("COORDINATION_DB_FILE", "coordination.db")
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+COORDINATION_PREFIX = os.getenv("COORDINATION_PREFIX", "cafeshams:")
+COORDINATION_TIMEOUT = float(os.getenv("COORDINATION_TIMEOUT", "5"))
+INSTANCE_ID = os.getenv("INSTANCE_ID") or f"{socket.gethostname()}-{os.getpid()}"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS leases (
+    name TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS claims (
+    digest TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_claims_expires_at ON claims (expires_at);
+"""
+
+
+class SQLiteCoordinator:
+    """هماهنگی نسخه‌های روی یک میزبان با یک فایل SQLite مشترک
+
+    هر عملیات یک دستور یا تراکنش IMMEDIATE است، پس بین پردازه‌ها اتمی است. فراخوانی‌های sqlite3
+    در thread جدا اجرا می‌شوند تا انتظار برای قفل نسخه دیگر event loop را متوقف نکند.
+    """
+
+    def __init__(self, path=COORDINATION_DB_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connection(self):
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=COORDINATION_TIMEOUT, check_same_thread=False,
+                                   isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            return self._connection().execute(sql, params).rowcount
+
+    def _acquire_lease(self, name, owner, ttl):
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT owner, expires_at FROM leases WHERE name = ?", (name,)).fetchone()
+                if row is not None and row[0] != owner and row[1] > now:
+                    conn.execute("COMMIT")
+                    return False
+                conn.execute(
+                    "INSERT OR REPLACE INTO leases (name, owner, expires_at) VALUES (?, ?, ?)",
+                    (name, owner, now + ttl)
+                )
+                conn.execute("COMMIT")
+                return True
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    async def acquire_lease(self, name, owner, ttl):
+        """گرفتن یا تمدید lease؛ True اگر owner اکنون صاحب آن باشد"""
+        return await asyncio.to_thread(self._acquire_lease, name, owner, ttl)
+
+    async def release_lease(self, name, owner):
+        await asyncio.to_thread(self._execute, "DELETE FROM leases WHERE name = ? AND owner = ?", (name, owner))
+
+    async def claim(self, digest, owner, ttl):
+        """رزرو اتمی هش خبر؛ False اگر نسخه دیگری پیش‌تر آن را رزرو یا ارسال کرده باشد"""
+        now = time.time()
+        rowcount = await asyncio.to_thread(
+            self._execute,
+            "INSERT INTO claims (digest, owner, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT (digest) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+            "WHERE claims.expires_at <= ?",
+            (digest, owner, now + ttl, now)
+        )
+        return rowcount == 1
+
+    async def release_claim(self, digest, owner):
+        """آزاد کردن رزرو پس از ارسال ناموفق تا خبر دوباره قابل ارسال باشد"""
+        await asyncio.to_thread(self._execute, "DELETE FROM claims WHERE digest = ? AND owner = ?", (digest, owner))
+
+    async def confirm(self, digest, owner, ttl):
+        """ثبت قطعی ارسال؛ رزرو تا پایان بازه نگهداری باقی می‌ماند"""
+        await asyncio.to_thread(
+            self._execute,
+            "INSERT OR REPLACE INTO claims (digest, owner, expires_at) VALUES (?, ?, ?)",
+            (digest, owner, time.time() + ttl)
+        )
+
+    async def prune(self):
+        return await asyncio.to_thread(self._execute, "DELETE FROM claims WHERE expires_at <= ?", (time.time(),))
+
+    async def clear(self):
+        return await asyncio.to_thread(self._execute, "DELETE FROM claims")
+
+    def _close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    async def close(self):
+        await asyncio.to_thread(self._close)
+
+
+class RespError(Exception):
+    """پاسخ خطای سرور Redis"""
+
+
+class RedisCoordinator:
+    """هماهنگی بین میزبان‌ها روی هر سرور سازگار با پروتکل Redis (RESP2)
+
+    فقط دستورهای پایه استفاده می‌شوند (SET NX PX، WATCH/MULTI/EXEC) تا سرورهای جایگزین ساده هم کافی باشند.
+    """
+
+    def __init__(self, url=REDIS_URL, prefix=COORDINATION_PREFIX):
+        parts = urlsplit(url)
+        self.host = parts.hostname or "localhost"
+        self.port = parts.port or 6379
+        self.password = parts.password
+        self.db = int(parts.path.strip("/") or 0)
+        self.prefix = prefix
+        self._reader = self._writer = None
+        # یک اتصال و یک درخواست در هر لحظه؛ WATCH به اتصال وابسته است
+        self._lock = asyncio.Lock()
+
+    async def _connect(self):
+        self._reader, self._writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port), COORDINATION_TIMEOUT
+        )
+        if self.password:
+            await self._command("AUTH", self.password)
+        if self.db:
+            await self._command("SELECT", self.db)
+
+    @staticmethod
+    def _encode(args):
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        return b"".join(parts)
+
+    async def _read_reply(self):
+        line = await self._reader.readline()
+        if not line:
+            raise ConnectionError("connection closed by server")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b"+":
+            return payload.decode()
+        if kind == b"-":
+            raise RespError(payload.decode())
+        if kind == b":":
+            return int(payload)
+        if kind == b"$":
+            length = int(payload)
+            if length < 0:
+                return None
+            data = await self._reader.readexactly(length + 2)
+            return data[:-2].decode()
+        if kind == b"*":
+            length = int(payload)
+            if length < 0:
+                return None
+            return [await self._read_reply() for _ in range(length)]
+        raise ConnectionError(f"unexpected reply {line!r}")
+
+    async def _command(self, *args):
+        self._writer.write(self._encode(args))
+        await self._writer.drain()
+        return await asyncio.wait_for(self._read_reply(), COORDINATION_TIMEOUT)
+
+    async def _run(self, operation):
+        """اجرای یک عملیات (چند دستور پشت سر هم) با یک بار اتصال مجدد در صورت قطع"""
+        async with self._lock:
+            for attempt in (1, 2):
+                try:
+                    if self._writer is None:
+                        await self._connect()
+                    return await operation()
+                except RespError:
+                    # اتصال ممکن است وسط MULTI مانده باشد
+                    await self._drop()
+                    raise
+                except (ConnectionError, OSError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+                    await self._drop()
+                    if attempt == 2:
+                        raise
+
+    async def _drop(self):
+        writer, self._reader, self._writer = self._writer, None, None
+        if writer is not None:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except Exception:
+                pass
+
+    async def _compare_and(self, key, owner, *command):
+        """اجرای command فقط اگر مقدار key برابر owner باشد (WATCH/MULTI/EXEC)"""
+        await self._command("WATCH", key)
+        if await self._command("GET", key) != owner:
+            await self._command("UNWATCH")
+            return False
+        await self._command("MULTI")
+        await self._command(*command)
+        return await self._command("EXEC") is not None
+
+    async def acquire_lease(self, name, owner, ttl):
+        key = f"{self.prefix}lease:{name}"
+        ttl_ms = int(ttl * 1000)
+
+        async def operation():
+            if await self._command("SET", key, owner, "NX", "PX", ttl_ms) == "OK":
+                return True
+            return await self._compare_and(key, owner, "PEXPIRE", key, ttl_ms)
+
+        return await self._run(operation)
+
+    async def release_lease(self, name, owner):
+        key = f"{self.prefix}lease:{name}"
+        await self._run(lambda: self._compare_and(key, owner, "DEL", key))
+
+    async def claim(self, digest, owner, ttl):
+        key = f"{self.prefix}claim:{digest}"
+
+        async def operation():
+            if await self._command("SET", key, owner, "NX", "PX", int(ttl * 1000)) == "OK":
+                return True
+            # تکرار پس از قطع اتصال: شاید SET قبلی همین نسخه انجام شده و فقط پاسخش نرسیده باشد
+            return await self._command("GET", key) == owner
+
+        return await self._run(operation)
+
+    async def release_claim(self, digest, owner):
+        key = f"{self.prefix}claim:{digest}"
+        await self._run(lambda: self._compare_and(key, owner, "DEL", key))
+
+    async def confirm(self, digest, owner, ttl):
+        key = f"{self.prefix}claim:{digest}"
+        await self._run(lambda: self._command("SET", key, owner, "PX", int(ttl * 1000)))
+
+    async def prune(self):
+        # کلیدها با PX خودشان منقضی می‌شوند
+        return 0
+
+    async def clear(self):
+        async def operation():
+            cursor, removed = "0", 0
+            while True:
+                cursor, keys = await self._command("SCAN", cursor, "MATCH", f"{self.prefix}claim:*", "COUNT", 500)
+                if keys:
+                    removed += await self._command("DEL", *keys)
+                if cursor == "0":
+                    return removed
+
+        return await self._run(operation)
+
+    async def close(self):
+        async with self._lock:
+            await self._drop()
+
+
+class LeaderLease:
+    """قفل رهبری با مهلت؛ تا زمانی که نگه داشته شده، در پس‌زمینه هر ttl/3 ثانیه تمدید می‌شود
+
+    اگر نسخه رهبر از کار بیفتد، پس از ttl ثانیه نسخه دیگری رهبر می‌شود.
+    """
+
+    def __init__(self, coordinator, name, owner=INSTANCE_ID, ttl=120):
+        self.coordinator = coordinator
+        self.name = name
+        self.owner = owner
+        self.ttl = ttl
+        self.held = False
+        self._keepalive = None
+
+    async def acquire(self):
+        """گرفتن یا تمدید رهبری؛ در صورت خطای backend رهبری از دست رفته فرض می‌شود"""
+        try:
+            held = await self.coordinator.acquire_lease(self.name, self.owner, self.ttl)
+        except Exception as e:
+            logging.error(f"خطا در گرفتن قفل رهبری {self.name}: {e}")
+            held = False
+
+        if held and not self.held:
+            logging.info(f"👑 {self.owner}: رهبر {self.name} شد")
+        elif self.held and not held:
+            logging.warning(f"⚠️ {self.owner}: رهبری {self.name} از دست رفت")
+        self.held = held
+
+        if held and (self._keepalive is None or self._keepalive.done()):
+            self._keepalive = asyncio.create_task(self._renew())
+        return held
+
+    async def _renew(self):
+        while self.held:
+            await asyncio.sleep(self.ttl / 3)
+            if self.held:
+                await self.acquire()
+
+    async def release(self):
+        if self._keepalive is not None:
+            self._keepalive.cancel()
+            self._keepalive = None
+        if self.held:
+            self.held = False
+            try:
+                await self.coordinator.release_lease(self.name, self.owner)
+            except Exception as e:
+                logging.warning(f"⚠️ خطا در آزاد کردن قفل رهبری {self.name}: {e}")
+
+
+def create_coordinator(backend=COORDINATION_BACKEND):
+    """ساخت backend هماهنگی از تنظیمات"""
+    if backend == "redis":
+        return RedisCoordinator(REDIS_URL)
+    if backend == "sqlite":
+        return SQLiteCoordinator(COORDINATION_DB_FILE)
+    raise ValueError(f"unknown COORDINATION_BACKEND {backend!r}")
@@ -0,0 +1,153 @@
+import os
+import html
+import time
+import asyncio
+import logging
+import functools
+from collections import namedtuple
+
+import metrics
+
+# حالت خلاصه: خبرهای کم‌اهمیت به جای پیام جداگانه در یک پیام فهرستی ارسال می‌شوند
+DIGEST_MODE = os.getenv("DIGEST_MODE", "false").lower() in ("1", "true", "yes", "on")
+DIGEST_SCORE_THRESHOLD = int(os.getenv("DIGEST_SCORE_THRESHOLD", "60"))
+# 0: یک خلاصه در پایان هر چرخه؛ بیشتر: جمع‌آوری خبرها تا این تعداد ثانیه پس از قدیمی‌ترین آن‌ها
+DIGEST_WINDOW = int(os.getenv("DIGEST_WINDOW", "0"))
+# کمتر از این تعداد خبر کم‌اهمیت همان پیام عادی خود را دارند
+DIGEST_MIN_ITEMS = int(os.getenv("DIGEST_MIN_ITEMS", "2"))
+# در حالت پنجره زمانی، خبری که این تعداد بار در خلاصه ناموفق بوده کنار گذاشته می‌شود
+DIGEST_MAX_ATTEMPTS = int(os.getenv("DIGEST_MAX_ATTEMPTS", "3"))
+
+# سقف طول پیام تلگرام؛ طول HTML خام سنجیده می‌شود که همیشه از متن نمایشی بیشتر است
+TELEGRAM_MESSAGE_LIMIT = 4096
+DIGEST_TITLE_LIMIT = 200
+
+# message: متن کامل پیام عادی برای وقتی که خبر به تنهایی ارسال شود؛ attempts: ارسال‌های ناموفق خلاصه
+DigestItem = namedtuple("DigestItem", ["source", "title", "link", "message", "future", "added_at", "attempts"])
+
+
+def format_item(item):
+    title = item.title if len(item.title) <= DIGEST_TITLE_LIMIT else item.title[:DIGEST_TITLE_LIMIT] + "…"
+    return f'• <a href="{html.escape(item.link)}">{html.escape(title, quote=False)}</a>'
+
+
+def split_messages(items, title, footer, limit=TELEGRAM_MESSAGE_LIMIT):
+    """ساخت پیام‌های HTML خلاصه زیر سقف طول؛ (متن، خبرها) برای هر پیام
+
+    خبرها بر اساس منبع گروه‌بندی می‌شوند و فقط بین دو خبر بریده می‌شود تا هیچ تگی نیمه‌کاره نماند.
+    """
+    groups = {}
+    for item in items:
+        groups.setdefault(item.source, []).append(item)
+
+    # جای شماره بخش مانند (12/12) در سرتیتر رزرو می‌شود
+    budget = limit - len(f"🗞️ <b>{title}</b> (99/99)\n\n{footer}")
+    chunks = []
+    lines, chunk_items, size, current = [], [], 0, None
+    for source, source_items in groups.items():
+        heading = f"\n<b>{html.escape(source, quote=False)}</b>"
+        for item in source_items:
+            line = format_item(item)
+            needed = len(line) + 1 + (len(heading) + 1 if source != current else 0)
+            if lines and size + needed > budget:
+                chunks.append((lines, chunk_items))
+                lines, chunk_items, size, current = [], [], 0, None
+                needed = len(line) + len(heading) + 2
+            if source != current:
+                lines.append(heading)
+                current = source
+            lines.append(line)
+            chunk_items.append(item)
+            size += needed
+    if lines:
+        chunks.append((lines, chunk_items))
+
+    messages = []
+    for part, (lines, chunk_items) in enumerate(chunks, 1):
+        numbering = f" ({part}/{len(chunks)})" if len(chunks) > 1 else ""
+        text = f"🗞️ <b>{title}</b>{numbering}\n" + "\n".join(lines) + f"\n\n{footer}"
+        messages.append((text, chunk_items))
+    return messages
+
+
+class NewsDigest:
+    """صف خبرهای کم‌اهمیت تا ارسال در قالب یک یا چند پیام خلاصه
+
+    با پنجره 0 Future هر خبر با تحویل پیام خلاصه کامل می‌شود. با پنجره زمانی، خبر هنگام پذیرش
+    ارسال شده حساب می‌شود و اگر ارسال خلاصه ناموفق باشد تا max_attempts بار برای خلاصه بعدی در صف می‌ماند.
+    """
+
+    def __init__(self, title, footer, window=DIGEST_WINDOW, min_items=DIGEST_MIN_ITEMS,
+                 max_attempts=DIGEST_MAX_ATTEMPTS):
+        self.title = title
+        self.footer = footer
+        self.window = window
+        self.min_items = min_items
+        self.max_attempts = max_attempts
+        self._items = []
+
+    def add(self, source, title, link, message):
+        """افزودن خبر به خلاصه؛ Future تحویل را مانند send_queue.enqueue برمی‌گرداند"""
+        future = asyncio.get_running_loop().create_future()
+        if self.window > 0:
+            future.set_result(None)
+        self._items.append(DigestItem(source, title, link, message, future, time.time(), 0))
+        return future
+
+    def _discard_cancelled(self):
+        # Future لغوشده یعنی چرخه خبر را ثبت‌نشده رها کرده و رزرو آن را آزاد کرده است؛ ارسالش تکراری می‌شود
+        self._items = [item for item in self._items if not item.future.cancelled()]
+
+    def pending(self):
+        self._discard_cancelled()
+        return len(self._items)
+
+    def due(self, now=None):
+        self._discard_cancelled()
+        if not self._items:
+            return False
+        now = now or time.time()
+        return self.window <= 0 or now - min(item.added_at for item in self._items) >= self.window
+
+    def flush(self, send):
+        """ارسال همه خبرهای صف با send(text) که Future تحویل برمی‌گرداند؛ فهرست Futureها"""
+        self._discard_cancelled()
+        items, self._items = self._items, []
+        if not items:
+            return []
+
+        if len(items) < self.min_items:
+            batches = [(item.message, [item]) for item in items]
+        else:
+            batches = split_messages(items, self.title, self.footer)
+            metrics.DIGEST_MESSAGES.inc(len(batches))
+            metrics.DIGEST_ITEMS.inc(len(items))
+            logging.info(f"🗞️ {len(items)} خبر کم‌اهمیت در {len(batches)} پیام خلاصه در صف ارسال قرار گرفت")
+
+        deliveries = []
+        for text, batch in batches:
+            delivery = send(text)
+            delivery.add_done_callback(functools.partial(self._delivered, batch))
+            deliveries.append(delivery)
+        return deliveries
+
+    def _delivered(self, batch, delivery):
+        error = asyncio.CancelledError() if delivery.cancelled() else delivery.exception()
+        dropped = 0
+        for item in batch:
+            if not item.future.done():
+                if error is None:
+                    item.future.set_result(delivery.result())
+                else:
+                    item.future.set_exception(error)
+            elif error is not None:
+                # در حالت پنجره زمانی خبر پیش‌تر پذیرفته شده؛ در خلاصه بعدی دوباره ارسال می‌شود
+                if item.attempts + 1 >= self.max_attempts:
+                    dropped += 1
+                    logging.warning(f"🗑️ خبر پس از {self.max_attempts} ارسال ناموفق از خلاصه کنار گذاشته شد - {item.title}")
+                else:
+                    self._items.append(item._replace(attempts=item.attempts + 1))
+        if error is not None:
+            logging.warning(f"⚠️ ارسال خلاصه ناموفق ({len(batch)} خبر): {error}")
+        if dropped:
+            metrics.ERRORS.labels("dropped").inc(dropped)
@@ -0,0 +1,179 @@
+import os
+import mmap
+import time
+import bisect
+import struct
+import logging
+import threading
+
+# هر رکورد: ۱۶ بایت digest خام MD5 + زمان ثبت (ثانیه یونیکس)
+RECORD = struct.Struct(">16sI")
+DIGEST_SIZE = 16
+
+
+def to_digest(value):
+    """تبدیل هش hex یا digest خام به ۱۶ بایت"""
+    if isinstance(value, str):
+        return bytes.fromhex(value)
+    return bytes(value)
+
+
+class _SortedKeys:
+    """نمای فقط‌خواندنی از digest های فایل مرتب برای جستجوی دودویی"""
+
+    def __init__(self, buffer, count):
+        self.buffer = buffer
+        self.count = count
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        offset = index * RECORD.size
+        return self.buffer[offset:offset + DIGEST_SIZE]
+
+
+class DigestIndex:
+    """فهرست فشرده digest خبرهای ارسال شده روی فایل باینری مرتب و memory-mapped
+
+    فایل اصلی فقط هنگام compact بازنویسی می‌شود؛ افزودنی‌های بین دو compact
+    در حافظه نگه داشته می‌شوند و پس از ری‌استارت از تاریخچه پایگاه داده بازسازی می‌شوند.
+    """
+
+    def __init__(self, path, retention_days=30):
+        self.path = path
+        self.retention_seconds = int(retention_days * 86400)
+        self._lock = threading.Lock()
+        self._file = None
+        self._mmap = None
+        self._keys = _SortedKeys(b"", 0)
+        self._recent = {}
+        # فایلی که بارگذاری نشده بازنویسی نمی‌شود تا خطای بارگذاری تاریخچه را پاک نکند
+        self._loaded = False
+        # compact ها پشت سر هم؛ clear نسخه را عوض می‌کند تا نتیجه compact هم‌زمان کنار گذاشته شود
+        self._compacting = threading.Lock()
+        self._generation = 0
+
+    def open(self):
+        """نگاشت فایل اصلی در حافظه"""
+        with self._lock:
+            self._map_base()
+            self._recent = {}
+            self._loaded = True
+
+    @property
+    def built_at(self):
+        """زمان آخرین compact (صفر اگر فایل وجود نداشته باشد)"""
+        if os.path.exists(self.path):
+            return int(os.path.getmtime(self.path))
+        return 0
+
+    def _map_base(self):
+        self._unmap_base()
+        if os.path.exists(self.path) and os.path.getsize(self.path) >= RECORD.size:
+            self._file = open(self.path, "rb")
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._keys = _SortedKeys(self._mmap, len(self._mmap) // RECORD.size)
+        else:
+            self._keys = _SortedKeys(b"", 0)
+
+    def _unmap_base(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _in_base(self, digest):
+        index = bisect.bisect_left(self._keys, digest)
+        return index < len(self._keys) and self._keys[index] == digest
+
+    def __contains__(self, value):
+        digest = to_digest(value)
+        with self._lock:
+            return digest in self._recent or self._in_base(digest)
+
+    def __len__(self):
+        with self._lock:
+            fresh = sum(1 for digest in self._recent if not self._in_base(digest))
+            return len(self._keys) + fresh
+
+    def __iter__(self):
+        with self._lock:
+            digests = [self._keys[i] for i in range(len(self._keys))]
+            digests.extend(d for d in self._recent if not self._in_base(d))
+        for digest in digests:
+            yield digest.hex()
+
+    def add(self, value, timestamp=None):
+        """افزودن یک digest"""
+        digest = to_digest(value)
+        timestamp = int(timestamp or time.time())
+        with self._lock:
+            self._recent[digest] = timestamp
+
+    def compact(self):
+        """ادغام افزودنی‌ها با فایل اصلی، حذف digest های قدیمی و بازنویسی اتمیک
+
+        ادغام و نوشتن فایل بیرون از قفل جستجوها انجام می‌شود و می‌تواند در thread جدا اجرا شود.
+        بدون افزودنی جدید فایل بازنویسی نمی‌شود؛ digest های قدیمی در compact بعدی حذف می‌شوند.
+        """
+        with self._compacting:
+            with self._lock:
+                if not self._loaded and os.path.exists(self.path):
+                    raise RuntimeError(f"{self.path} was not loaded, refusing to overwrite it")
+                if not self._recent:
+                    return len(self._keys)
+                recent = dict(self._recent)
+                base = self._mmap[:] if self._mmap is not None else b""
+                generation = self._generation
+
+            cutoff = int(time.time()) - self.retention_seconds
+            merged = {}
+            for digest, timestamp in RECORD.iter_unpack(base):
+                if timestamp >= cutoff:
+                    merged[digest] = timestamp
+            for digest, timestamp in recent.items():
+                if timestamp >= cutoff:
+                    merged[digest] = max(timestamp, merged.get(digest, 0))
+
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(b"".join(RECORD.pack(d, merged[d]) for d in sorted(merged)))
+                f.flush()
+                os.fsync(f.fileno())
+
+            with self._lock:
+                if generation != self._generation:
+                    # فهرست در این فاصله پاک شده است
+                    os.remove(tmp_path)
+                    return len(self._keys)
+
+                self._unmap_base()
+                os.replace(tmp_path, self.path)
+                self._map_base()
+                self._loaded = True
+
+                # افزودنی‌های رسیده در حین نوشتن فایل برای compact بعدی می‌مانند
+                for digest, timestamp in recent.items():
+                    if self._recent.get(digest) == timestamp:
+                        del self._recent[digest]
+
+            return len(merged)
+
+    def clear(self):
+        """حذف کامل فهرست"""
+        with self._lock:
+            self._unmap_base()
+            self._recent = {}
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            self._keys = _SortedKeys(b"", 0)
+            self._loaded = True
+            self._generation += 1
+        logging.info("🧹 فهرست digest ها پاک شد")
+
+    def close(self):
+        with self._lock:
+            self._unmap_base()
@@ -0,0 +1,100 @@
+import os
+import asyncio
+import logging
+import functools
+from urllib.parse import urljoin, urlsplit
+
+import aiohttp
+from bs4 import BeautifulSoup, SoupStrainer
+from feedparser import FeedParserDict
+
+# دریافت تیترها از صفحه آرشیو منبع وقتی فید RSS خالی یا در دسترس نیست
+FALLBACK_ENABLED = os.getenv("FALLBACK_ENABLED", "true").lower() == "true"
+FALLBACK_MAX_BYTES = int(os.getenv("FALLBACK_MAX_BYTES", "2000000"))
+FALLBACK_MAX_ITEMS = int(os.getenv("FALLBACK_MAX_ITEMS", "20"))
+FALLBACK_MIN_TITLE_LENGTH = int(os.getenv("FALLBACK_MIN_TITLE_LENGTH", "15"))
+FALLBACK_TIMEOUT = int(os.getenv("FALLBACK_TIMEOUT", "20"))
+
+USER_AGENT = "Mozilla/5.0 (compatible; CafeShamsNewsBot/2.0; +https://t.me/cafeshamss)"
+
+
+def _site(hostname):
+    hostname = (hostname or "").lower()
+    return hostname[4:] if hostname.startswith("www.") else hostname
+
+
+def extract_headlines(html_text, base_url, rule, limit=FALLBACK_MAX_ITEMS):
+    """استخراج (تیتر، لینک) از صفحه؛ فقط تگ‌های rule.tags پارس می‌شوند تا صفحات بزرگ ارزان بمانند"""
+    strainer = SoupStrainer(list(rule.tags), attrs=rule.attrs or {})
+    soup = BeautifulSoup(html_text, "html.parser", parse_only=strainer)
+    site = _site(urlsplit(base_url).hostname)
+
+    headlines = []
+    seen = set()
+    for anchor in soup.select(rule.select):
+        link = urljoin(base_url, anchor.get("href", "").strip())
+        parts = urlsplit(link)
+        if parts.scheme not in ("http", "https") or not _site(parts.hostname).endswith(site):
+            continue
+        if rule.link_pattern and not rule.link_pattern.search(parts.path):
+            continue
+
+        title = anchor.get_text(" ", strip=True)
+        if len(title) < FALLBACK_MIN_TITLE_LENGTH or link in seen:
+            continue
+
+        seen.add(link)
+        headlines.append((title, link))
+        if len(headlines) >= limit:
+            break
+
+    return headlines
+
+
+def _as_feed(headlines):
+    """خروجی هم‌شکل feedparser تا مسیر تکراری‌یابی و ارسال بدون تغییر استفاده شود"""
+    entries = [FeedParserDict(title=title, link=link, id=link) for title, link in headlines]
+    return FeedParserDict(entries=entries, bozo=False, fallback=True)
+
+
+async def fetch_fallback(session, source):
+    """دانلود صفحه fallback منبع و تبدیل تیترهای آن به فید؛ None در صورت خطا یا نبود نتیجه"""
+    if not FALLBACK_ENABLED or not source.fallback:
+        return None
+
+    try:
+        timeout = aiohttp.ClientTimeout(total=FALLBACK_TIMEOUT)
+        headers = {"User-Agent": USER_AGENT, "Accept": "text/html"}
+        async with session.get(source.fallback, headers=headers, timeout=timeout) as response:
+            if response.status >= 400:
+                logging.warning(f"⚠️ {source.name}: صفحه fallback خطای HTTP {response.status} داد")
+                return None
+            # صفحات آرشیو گاهی چند مگابایت هستند؛ تیترهای تازه در ابتدای صفحه‌اند
+            chunks, size = [], 0
+            async for chunk in response.content.iter_chunked(65536):
+                chunks.append(chunk)
+                size += len(chunk)
+                if size >= FALLBACK_MAX_BYTES:
+                    break
+            body = b"".join(chunks)[:FALLBACK_MAX_BYTES]
+            charset = response.charset or "utf-8"
+            base_url = str(response.url)
+
+        html_text = body.decode(charset, errors="replace")
+        loop = asyncio.get_running_loop()
+        headlines = await loop.run_in_executor(
+            None, functools.partial(extract_headlines, html_text, base_url, source.scrape)
+        )
+    except asyncio.TimeoutError:
+        logging.warning(f"⚠️ {source.name}: مهلت دریافت صفحه fallback تمام شد")
+        return None
+    except Exception as e:
+        logging.warning(f"⚠️ {source.name}: خطا در دریافت صفحه fallback - {e}")
+        return None
+
+    if not headlines:
+        logging.info(f"🕸️ {source.name}: تیتری در صفحه fallback یافت نشد")
+        return None
+
+    logging.info(f"🕸️ {source.name}: {len(headlines)} تیتر از صفحه fallback استخراج شد")
+    return _as_feed(headlines)
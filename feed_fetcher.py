@@ -0,0 +1,289 @@
+import os
+import time
+import asyncio
+import logging
+import json
+import calendar
+from urllib.parse import urlsplit
+from xml.etree.ElementTree import ParseError
+
+import aiohttp
+
+import feed_parsing
+import http_client
+import metrics
+from fallback_scraper import fetch_fallback
+from feed_stream import FEED_STREAMING, FEED_STREAM_CHUNK, FEED_STREAM_MAX_ENTRIES, StreamParser
+from source_health import source_health
+
+# تنظیمات دانلود همزمان فیدها
+FETCH_CONCURRENCY = int(os.getenv("FETCH_CONCURRENCY", "10"))
+FETCH_PER_HOST = int(os.getenv("FETCH_PER_HOST", "2"))
+FETCH_TIMEOUT = int(os.getenv("FETCH_TIMEOUT", "30"))
+# مهلت اتصال و فاصله مجاز بین دو بسته دریافتی؛ میزبان معلق پیش از مهلت کل کنار گذاشته می‌شود
+FETCH_CONNECT_TIMEOUT = int(os.getenv("FETCH_CONNECT_TIMEOUT", "10"))
+FETCH_READ_TIMEOUT = int(os.getenv("FETCH_READ_TIMEOUT", "15"))
+
+FEED_STATE_FILE = os.getenv("FEED_STATE_FILE", "feed_state.json")
+
+# سقف خبرهای بررسی شده هر منبع در یک چرخه؛ باقی‌مانده به چرخه بعد منتقل می‌شود
+FEED_MAX_ENTRIES_PER_CYCLE = int(os.getenv("FEED_MAX_ENTRIES_PER_CYCLE", "10"))
+# تعداد خبرهای بررسی شده در اولین چرخه منبعی که هنوز نشانه‌ای ندارد
+FEED_INITIAL_ENTRIES = int(os.getenv("FEED_INITIAL_ENTRIES", "3"))
+# تعداد چرخه‌هایی که خبر ناموفق نشانه منبع را پشت خود نگه می‌دارد پیش از کنار گذاشته شدن
+FEED_ITEM_MAX_ATTEMPTS = int(os.getenv("FEED_ITEM_MAX_ATTEMPTS", "3"))
+
+USER_AGENT = "Mozilla/5.0 (compatible; CafeShamsNewsBot/2.0; +https://t.me/cafeshamss)"
+
+# وضعیت هر منبع بین چرخه‌ها (ETag، Last-Modified و نشانه آخرین خبر بررسی شده)
+feed_state = {}
+
+
+def load_feed_state():
+    """بارگذاری وضعیت منابع از فایل"""
+    global feed_state
+    try:
+        if os.path.exists(FEED_STATE_FILE):
+            with open(FEED_STATE_FILE, "r", encoding="utf-8") as f:
+                feed_state = json.load(f)
+            logging.info(f"📁 بارگذاری وضعیت {len(feed_state)} منبع از فایل")
+        else:
+            feed_state = {}
+    except Exception as e:
+        logging.error(f"خطا در بارگذاری فایل feed_state: {e}")
+        feed_state = {}
+
+
+def save_feed_state():
+    """ذخیره وضعیت منابع در فایل"""
+    try:
+        tmp_path = FEED_STATE_FILE + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(feed_state, f, ensure_ascii=False)
+        os.replace(tmp_path, FEED_STATE_FILE)
+    except Exception as e:
+        logging.error(f"خطا در ذخیره فایل feed_state: {e}")
+
+
+def entry_timestamp(entry):
+    """زمان انتشار خبر به ثانیه UTC (None اگر فید تاریخ نداشته باشد)"""
+    parsed = entry.get("published_parsed") or entry.get("updated_parsed")
+    return calendar.timegm(parsed) if parsed else None
+
+
+def _matches_mark(entry, mark):
+    guid = entry.get("id")
+    if guid and mark.get("guid"):
+        return guid == mark["guid"]
+    return bool(mark.get("link")) and entry.get("link") == mark["link"]
+
+
+def select_new_entries(name, entries, limit=FEED_MAX_ENTRIES_PER_CYCLE):
+    """خبرهای جدیدتر از نشانه منبع، از قدیمی به جدید و حداکثر limit مورد
+
+    خروجی (خبرهای این چرخه، تعداد خبرهای جدید باقی‌مانده برای چرخه بعد) است.
+    """
+    mark = feed_state.get(name, {}).get("high_water")
+    entries = list(entries)
+
+    if not mark:
+        fresh = entries[:FEED_INITIAL_ENTRIES]
+    else:
+        fresh = None
+        for index, entry in enumerate(entries):
+            if _matches_mark(entry, mark):
+                fresh = entries[:index]
+                break
+
+        if fresh is None:
+            # نشانه از فید خارج شده؛ مقایسه با زمان انتشار و در نبود آن بررسی همه خبرها
+            published = mark.get("published")
+            if published:
+                fresh = [e for e in entries if (entry_timestamp(e) or float("inf")) > published]
+            else:
+                fresh = entries
+
+    # فیدها جدیدترین خبر را اول می‌آورند؛ بررسی از پایین فید تا نشانه بعدی همیشه بالاتر از قبلی باشد
+    fresh.reverse()
+
+    return fresh[:limit], max(0, len(fresh) - limit)
+
+
+def update_high_water(name, entry, remaining=0):
+    """جابجایی نشانه منبع به آخرین خبر بررسی شده و ثبت تعداد خبرهای باقی‌مانده"""
+    state = feed_state.setdefault(name, {})
+    if entry is not None:
+        state["high_water"] = {
+            "guid": entry.get("id"),
+            "link": entry.get("link"),
+            "published": entry_timestamp(entry)
+        }
+    if remaining:
+        state["backlog"] = remaining
+    else:
+        state.pop("backlog", None)
+
+
+def track_failure(name, entry):
+    """ثبت تلاش ناموفق برای خبری که نشانه منبع پشت آن مانده؛ تعداد تلاش‌های پیاپی آن خبر
+
+    entry برابر None یعنی خبری ناموفق نبوده و سابقه پاک می‌شود.
+    """
+    state = feed_state.setdefault(name, {})
+    if entry is None:
+        state.pop("retry", None)
+        return 0
+    key = entry.get("id") or entry.get("link")
+    retry = state.get("retry")
+    attempts = retry["attempts"] + 1 if retry and retry.get("key") == key else 1
+    state["retry"] = {"key": key, "attempts": attempts}
+    return attempts
+
+
+def _response_size(response, body):
+    """حجم واقعی دریافت شده از شبکه (پیش از باز کردن فشرده‌سازی)"""
+    raw_bytes = getattr(response.content, "total_raw_bytes", None)
+    if raw_bytes:
+        return raw_bytes
+    if response.content_length is not None:
+        return response.content_length
+    return len(body)
+
+
+async def _read_streaming(response, name):
+    """خواندن تدریجی پاسخ تا نشانه منبع یا سقف خبرها؛ (feed، body)
+
+    feed برابر None یعنی XML نامعتبر بود و body کامل برای پارس با feedparser خوانده شده است.
+    """
+    mark = feed_state.get(name, {}).get("high_water")
+    # بدون نشانه فقط FEED_INITIAL_ENTRIES خبر اول استفاده می‌شود؛ با نشانه، خود نشانه هم لازم است
+    limit = FEED_STREAM_MAX_ENTRIES if mark else FEED_INITIAL_ENTRIES
+    parser = StreamParser(lambda entry, count: bool(mark) and _matches_mark(entry, mark) or count >= limit)
+
+    chunks = []
+    try:
+        async for chunk in response.content.iter_chunked(FEED_STREAM_CHUNK):
+            chunks.append(chunk)
+            if parser.feed(chunk):
+                break
+        else:
+            parser.close()
+    except ParseError:
+        chunks.append(await response.content.read())
+        return None, b"".join(chunks)
+
+    # زمان پارس تدریجی (بدون انتظار شبکه) در همان متریک پارس ثبت می‌شود
+    metrics.PARSE_SECONDS.labels(name).observe(parser.seconds)
+    return parser.result(), b"".join(chunks)
+
+
+async def fetch_feed(session, source):
+    """دانلود شرطی یک فید؛ پارس تدریجی هم‌زمان با دریافت یا در صورت XML نامعتبر با feedparser"""
+    result = {
+        "source": source, "feed": None, "error": None, "not_modified": False, "bytes": 0,
+        "fallback": False, "circuit_open": False
+    }
+    state = feed_state.get(source.name, {})
+
+    headers = {"User-Agent": USER_AGENT, "Accept-Encoding": "gzip, deflate"}
+    # با خبرهای باقی‌مانده از چرخه قبل، پاسخ 304 آن‌ها را تا تغییر بعدی فید پنهان می‌کند
+    if not state.get("backlog"):
+        if state.get("etag"):
+            headers["If-None-Match"] = state["etag"]
+        if state.get("last_modified"):
+            headers["If-Modified-Since"] = state["last_modified"]
+
+    try:
+        timeout = aiohttp.ClientTimeout(
+            total=FETCH_TIMEOUT, sock_connect=FETCH_CONNECT_TIMEOUT, sock_read=FETCH_READ_TIMEOUT
+        )
+        with metrics.FETCH_SECONDS.labels(source.name).time():
+            async with session.get(source.url, headers=headers, timeout=timeout) as response:
+                if response.status == 304:
+                    result["not_modified"] = True
+                    return result
+
+                if response.status >= 400:
+                    result["error"] = f"HTTP {response.status}"
+                    return result
+
+                if FEED_STREAMING:
+                    feed, body = await _read_streaming(response, source.name)
+                else:
+                    feed, body = None, await response.read()
+                result["bytes"] = _response_size(response, body)
+                response_headers = {
+                    "content-type": response.headers.get("Content-Type", ""),
+                    "content-location": str(response.url)
+                }
+                validators = {
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified")
+                }
+
+        if feed is not None:
+            result["feed"] = feed
+        else:
+            with metrics.PARSE_SECONDS.labels(source.name).time():
+                result["feed"] = await feed_parsing.parse(body, response_headers)
+
+        # اعتبارسنج‌ها فقط پس از پارس موفق ذخیره می‌شوند تا خطا باعث از دست رفتن خبر نشود؛
+        # فید خالی ذخیره نمی‌شود تا پاسخ 304 جلوی مسیر fallback را نگیرد
+        if result["feed"].entries:
+            feed_state.setdefault(source.name, {}).update(validators)
+    except aiohttp.ServerTimeoutError as e:
+        # مهلت اتصال یا خواندن (زیرکلاس TimeoutError، پس باید پیش از آن بررسی شود)
+        result["error"] = str(e) or "connect/read timeout"
+    except asyncio.TimeoutError:
+        result["error"] = f"timeout after {FETCH_TIMEOUT}s"
+    except Exception as e:
+        result["error"] = str(e) or e.__class__.__name__
+
+    return result
+
+
+async def fetch_feeds(sources):
+    """دانلود همزمان همه فیدها؛ هر نتیجه به محض رسیدن برگردانده می‌شود"""
+    session = http_client.get_session()
+    global_limit = asyncio.Semaphore(FETCH_CONCURRENCY)
+    host_limits = {}
+
+    async def limited_fetch(source):
+        host = urlsplit(source.url).hostname or ""
+        host_limit = host_limits.setdefault(host, asyncio.Semaphore(FETCH_PER_HOST))
+        # منبع با مدار باز بدون هیچ درخواستی رد می‌شود تا وقت چرخه را نگیرد
+        if not source_health.allow(source.name):
+            return {
+                "source": source, "feed": None, "error": None, "not_modified": False, "bytes": 0,
+                "fallback": False, "circuit_open": True
+            }
+
+        try:
+            async with global_limit, host_limit:
+                # زمان انتظار در صف محدودیت همزمانی جزو کندی منبع حساب نمی‌شود
+                started = time.monotonic()
+                result = await fetch_feed(session, source)
+
+                # فید خالی یا خطادار: تیترها از صفحه آرشیو منبع استخراج می‌شوند
+                if source.fallback and not result["not_modified"] and (result["error"] or not result["feed"].entries):
+                    scraped = await fetch_fallback(session, source)
+                    if scraped is not None:
+                        result.update(feed=scraped, error=None, fallback=True)
+        except asyncio.CancelledError:
+            source_health.release(source.name)
+            raise
+
+        source_health.record(
+            source.name, ok=not result["error"], elapsed=time.monotonic() - started,
+            degraded=result["fallback"], error=result["error"]
+        )
+        return result
+
+    tasks = [asyncio.create_task(limited_fetch(source)) for source in sources]
+
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
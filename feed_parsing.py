@@ -0,0 +1,98 @@
+import os
+import asyncio
+import logging
+import functools
+import multiprocessing
+import concurrent.futures
+from concurrent.futures.process import BrokenProcessPool
+
+import feedparser
+from feedparser import FeedParserDict
+
+# فیدهای بزرگ‌تر از آستانه در پردازه‌های جداگانه پارس می‌شوند تا event loop و ارسال‌ها کند نشوند
+PARSE_POOL_SIZE = int(os.getenv("PARSE_POOL_SIZE", str(min(4, os.cpu_count() or 1))))
+PARSE_POOL_THRESHOLD = int(os.getenv("PARSE_POOL_THRESHOLD", "100000"))
+# forkserver با رشته‌های فعال برنامه (event loop و worker خودکار) امن است؛ fork روی لینوکس شروع سریع‌تری دارد
+PARSE_START_METHOD = os.getenv("PARSE_START_METHOD", "forkserver")
+
+# تنها فیلدهایی که انتخاب خبر جدید، تکراری‌یابی و process_and_send_news استفاده می‌کنند
+ENTRY_FIELDS = ("id", "title", "link", "summary", "description", "published_parsed", "updated_parsed")
+
+_pool = None
+
+
+def slim_entry(entry):
+    """نسخه کوچک و picklable خبر با همان رابط get و اندیس FeedParserDict"""
+    slim = FeedParserDict()
+    for field in ENTRY_FIELDS:
+        value = entry.get(field)
+        if value:
+            slim[field] = value
+    content = entry.get("content")
+    if content:
+        slim["content"] = [FeedParserDict(value=item.get("value", "")) for item in content]
+    return slim
+
+
+def parse_feed(body, response_headers=None):
+    """پارس بایت‌های فید و برگرداندن فقط خبرهای کوچک شده (قابل اجرا در پردازه دیگر)"""
+    parsed = feedparser.parse(body, response_headers=response_headers)
+    return FeedParserDict(
+        entries=[slim_entry(entry) for entry in parsed.entries],
+        bozo=parsed.get("bozo", False)
+    )
+
+
+def _get_pool():
+    global _pool
+    if _pool is None and PARSE_POOL_SIZE > 0:
+        methods = multiprocessing.get_all_start_methods()
+        method = PARSE_START_METHOD if PARSE_START_METHOD in methods else methods[0]
+        context = multiprocessing.get_context(method)
+        if method == "forkserver":
+            # feedparser یک بار در forkserver بارگذاری می‌شود و پردازه‌های کارگر آن را به ارث می‌برند
+            context.set_forkserver_preload([__name__])
+        _pool = concurrent.futures.ProcessPoolExecutor(max_workers=PARSE_POOL_SIZE, mp_context=context)
+        logging.info(f"🧮 استخر پارس فید با {PARSE_POOL_SIZE} پردازه ({method}) راه‌اندازی شد")
+    return _pool
+
+
+def warm_up():
+    """راه‌اندازی پردازه‌های کارگر پیش از اولین چرخه تا هزینه شروع آن‌ها در چرخه حساب نشود"""
+    pool = _get_pool()
+    if pool is not None:
+        for _ in range(PARSE_POOL_SIZE):
+            pool.submit(int)
+
+
+async def parse(body, response_headers=None):
+    """پارس فید: کوچک‌ها در thread پیش‌فرض و بزرگ‌ها در استخر پردازه"""
+    loop = asyncio.get_running_loop()
+    call = functools.partial(parse_feed, body, response_headers)
+
+    pool = _get_pool() if len(body) >= PARSE_POOL_THRESHOLD else None
+    if pool is not None:
+        try:
+            return await loop.run_in_executor(pool, call)
+        except BrokenProcessPool:
+            # پردازه کارگر از بین رفته (مثلاً کمبود حافظه)؛ استخر دوباره ساخته و این فید محلی پارس می‌شود
+            logging.warning("⚠️ استخر پارس فید از کار افتاد، ساخت مجدد")
+            _reset_pool(pool)
+
+    return await loop.run_in_executor(None, call)
+
+
+def _reset_pool(broken):
+    global _pool
+    # چند پارس همزمان ممکن است یک خرابی را ببینند؛ فقط همان استخر خراب کنار گذاشته می‌شود
+    if _pool is broken:
+        _pool = None
+        broken.shutdown(wait=False, cancel_futures=True)
+
+
+async def shutdown():
+    """بستن استخر پردازه‌ها هنگام توقف برنامه"""
+    global _pool
+    pool, _pool = _pool, None
+    if pool is not None:
+        await asyncio.get_running_loop().run_in_executor(None, pool.shutdown)
@@ -0,0 +1,119 @@
+import os
+import time
+from xml.etree.ElementTree import XMLPullParser
+
+from feedparser import FeedParserDict
+# همان تجزیه‌گر تاریخ و پاک‌ساز HTML feedparser تا published_parsed و summary (و هش خبر) در هر دو مسیر یکسان باشد
+from feedparser.datetimes import _parse_date
+from feedparser.sanitizer import _sanitize_html
+
+from feed_parsing import slim_entry
+
+# خواندن و پارس تدریجی فید؛ دریافت با رسیدن به نشانه منبع یا سقف خبرها قطع می‌شود
+FEED_STREAMING = os.getenv("FEED_STREAMING", "true").lower() in ("1", "true", "yes", "on")
+FEED_STREAM_CHUNK = int(os.getenv("FEED_STREAM_CHUNK", "16384"))
+# سقف خبرهای خوانده شده وقتی نشانه منبع در فید دیده نشود
+FEED_STREAM_MAX_ENTRIES = int(os.getenv("FEED_STREAM_MAX_ENTRIES", "100"))
+
+ITEM_TAGS = ("item", "entry")
+ATOM_NAMESPACE = "{http://www.w3.org/2005/Atom}"
+ATOM_HTML_TYPES = ("html", "xhtml", "text/html", "application/xhtml+xml")
+DATE_TAGS = {"pubDate": "published", "published": "published", "issued": "published",
+             "date": "published", "updated": "updated", "modified": "updated"}
+
+
+def _local(tag):
+    return tag.rsplit("}", 1)[-1]
+
+
+def _text(element):
+    return "".join(element.itertext()).strip()
+
+
+def _markup(element):
+    """متن summary یا content؛ HTML مانند feedparser پاک‌سازی می‌شود"""
+    value = _text(element)
+    # در RSS توضیحات همیشه HTML است؛ در Atom فقط با type=html یا xhtml
+    if element.tag.startswith(ATOM_NAMESPACE) and element.get("type", "text") not in ATOM_HTML_TYPES:
+        return value
+    return _sanitize_html(value, "utf-8", "text/html") if value else value
+
+
+def _entry_from(element):
+    """تبدیل عنصر item در RSS یا entry در Atom به خبر با همان فیلدهای slim_entry"""
+    entry = FeedParserDict()
+    for child in element:
+        tag = _local(child.tag)
+        if tag == "title":
+            entry["title"] = _text(child)
+        elif tag == "link":
+            # Atom: لینک در href؛ فقط rel=alternate یا بدون rel
+            href = child.get("href")
+            if href is None:
+                entry.setdefault("link", _text(child))
+            elif child.get("rel", "alternate") == "alternate":
+                entry.setdefault("link", href)
+        elif tag in ("guid", "id"):
+            entry["id"] = _text(child)
+        elif tag in ("description", "summary"):
+            entry.setdefault("summary", _markup(child))
+        elif tag in ("encoded", "content"):
+            # media:content و مانند آن فقط ویژگی url دارند
+            value = _markup(child)
+            if value:
+                entry.setdefault("content", []).append(FeedParserDict(value=value))
+        elif tag in DATE_TAGS:
+            parsed = _parse_date(_text(child))
+            if parsed:
+                entry.setdefault(f"{DATE_TAGS[tag]}_parsed", parsed)
+    return slim_entry(entry)
+
+
+class StreamParser:
+    """پارس تدریجی RSS/Atom با XMLPullParser
+
+    stop(entry, count) پس از هر خبر فراخوانی می‌شود؛ True یعنی خبرهای بعدی لازم نیست.
+    XML ناقص یا نامعتبر ParseError می‌دهد و فراخواننده باید به feedparser برگردد.
+    """
+
+    def __init__(self, stop):
+        self.stop = stop
+        self.entries = []
+        self.done = False
+        self.seconds = 0.0
+        self._parser = XMLPullParser(events=("end",))
+
+    def feed(self, chunk):
+        """افزودن بخش بعدی پاسخ؛ True وقتی پارس کامل شده یا به شرط توقف رسیده باشد"""
+        started = time.perf_counter()
+        try:
+            self._parser.feed(chunk)
+            self._collect()
+        finally:
+            self.seconds += time.perf_counter() - started
+        return self.done
+
+    def close(self):
+        """پایان پاسخ؛ سند ناقص ParseError می‌دهد"""
+        started = time.perf_counter()
+        try:
+            if not self.done:
+                self._parser.close()
+                self._collect()
+                self.done = True
+        finally:
+            self.seconds += time.perf_counter() - started
+
+    def _collect(self):
+        for _, element in self._parser.read_events():
+            if self.done or _local(element.tag) not in ITEM_TAGS:
+                continue
+            entry = _entry_from(element)
+            # متن کامل خبرهای پارس شده در حافظه نمی‌ماند
+            element.clear()
+            self.entries.append(entry)
+            if self.stop(entry, len(self.entries)):
+                self.done = True
+
+    def result(self):
+        return FeedParserDict(entries=self.entries, bozo=False)
@@ -0,0 +1,77 @@
+import os
+import asyncio
+import logging
+
+import aiohttp
+from telegram import Bot
+from telegram.request import HTTPXRequest
+
+BOT_TOKEN = os.getenv("BOT_TOKEN")
+
+# تنظیمات connection pool مشترک
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "30"))
+HTTP_DNS_CACHE_TTL = int(os.getenv("HTTP_DNS_CACHE_TTL", "300"))
+HTTP_KEEPALIVE_TIMEOUT = int(os.getenv("HTTP_KEEPALIVE_TIMEOUT", "60"))
+TELEGRAM_POOL_SIZE = int(os.getenv("TELEGRAM_POOL_SIZE", "8"))
+# آدرس API تلگرام؛ برای بنچمارک می‌تواند به سرور شبیه‌ساز محلی اشاره کند
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org/bot")
+
+# کلاینت‌ها به event loop سازنده خود وابسته‌اند؛ برای هر loop یک نمونه نگه داشته می‌شود
+_clients = {}
+
+
+def _loop_clients():
+    loop = asyncio.get_running_loop()
+    return _clients.setdefault(loop, {})
+
+
+def get_session():
+    """aiohttp session مشترک با keep-alive و کش DNS"""
+    clients = _loop_clients()
+    session = clients.get("session")
+    if session is None or session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=HTTP_POOL_SIZE,
+            ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+            keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT
+        )
+        session = aiohttp.ClientSession(connector=connector)
+        clients["session"] = session
+    return session
+
+
+def get_bot():
+    """نمونه مشترک Bot با connection pool ثابت به API تلگرام"""
+    clients = _loop_clients()
+    bot = clients.get("bot")
+    if bot is None:
+        request = HTTPXRequest(connection_pool_size=TELEGRAM_POOL_SIZE)
+        bot = Bot(token=BOT_TOKEN, base_url=TELEGRAM_API_URL, request=request)
+        clients["bot"] = bot
+    return bot
+
+
+async def startup():
+    """ساخت کلاینت‌های مشترک روی loop جاری"""
+    get_session()
+    try:
+        await get_bot().initialize()
+    except Exception as e:
+        logging.warning(f"⚠️ مقداردهی اولیه Bot ناموفق بود (در اولین ارسال تکرار می‌شود): {e}")
+    logging.info("🌐 کلاینت‌های HTTP و تلگرام آماده شدند")
+
+
+async def shutdown():
+    """بستن کلاینت‌های loop جاری"""
+    clients = _clients.pop(asyncio.get_running_loop(), {})
+
+    session = clients.get("session")
+    if session is not None and not session.closed:
+        await session.close()
+
+    bot = clients.get("bot")
+    if bot is not None:
+        try:
+            await bot.shutdown()
+        except Exception as e:
+            logging.warning(f"⚠️ خطا در بستن Bot: {e}")
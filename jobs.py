@@ -0,0 +1,180 @@
+import os
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+
+import metrics
+
+# چرخه‌های خبرگیری به صورت job اجرا می‌شوند: در هر لحظه فقط یک چرخه، درخواست‌های هم‌پوشان در همان چرخه ادغام می‌شوند
+JOB_HISTORY = int(os.getenv("JOB_HISTORY", "50"))
+# مهلت چرخه در حال اجرا برای تمام شدن هنگام توقف برنامه، پیش از لغو
+JOB_SHUTDOWN_GRACE = float(os.getenv("JOB_SHUTDOWN_GRACE", "5"))
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+
+class Job:
+    """یک چرخه خبرگیری درخواست شده؛ sources برابر None یعنی همه منابع"""
+
+    def __init__(self, kind, sources=None):
+        self.id = os.urandom(6).hex()
+        self.kind = kind
+        self.sources = None if sources is None else set(sources)
+        self.status = QUEUED
+        self.requests = 1
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        # وضعیت هر منبع در این چرخه؛ توسط خود چرخه به‌روز می‌شود
+        self.progress = {}
+        self.result = None
+        self.error = None
+        self.task = None
+
+    def covers(self, sources):
+        """آیا این چرخه همه منابع درخواست شده را بررسی می‌کند"""
+        return self.sources is None or (sources is not None and set(sources) <= self.sources)
+
+    def merge(self, sources):
+        """افزودن منابع درخواست دیگر به چرخه‌ای که هنوز شروع نشده"""
+        self.sources = None if self.sources is None or sources is None else self.sources | set(sources)
+        self.requests += 1
+
+    def update(self, name, state=None, **info):
+        """ثبت وضعیت یک منبع؛ state برابر None وضعیت قبلی را نگه می‌دارد"""
+        entry = self.progress.setdefault(name, {"state": QUEUED})
+        if state is not None:
+            entry["state"] = state
+        entry.update(info)
+
+    @property
+    def finished(self):
+        return self.status in (DONE, FAILED, CANCELLED)
+
+    def to_dict(self, detail=True):
+        now = self.finished_at or time.time()
+        data = {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "requests": self.requests,
+            "sources": None if self.sources is None else sorted(self.sources),
+            "created_at": round(self.created_at, 3),
+            "started_at": self.started_at and round(self.started_at, 3),
+            "finished_at": self.finished_at and round(self.finished_at, 3),
+            "elapsed": round(now - self.started_at, 3) if self.started_at else None,
+            "error": self.error
+        }
+        if detail:
+            data["progress"] = self.progress
+            data["result"] = self.result
+        return data
+
+
+class JobManager:
+    """اجرای پشت سر هم چرخه‌ها روی event loop با ادغام درخواست‌های هم‌پوشان
+
+    حداکثر یک چرخه در حال اجرا و یک چرخه در صف وجود دارد. درخواستی که منابعش را چرخه فعلی
+    پوشش می‌دهد به همان می‌پیوندد؛ بقیه در چرخه صف ادغام می‌شوند.
+    """
+
+    def __init__(self, runner, timeout=None, history=JOB_HISTORY):
+        # runner(job): coroutine اجرای چرخه که نتیجه آن در job.result قرار می‌گیرد
+        self.runner = runner
+        self.timeout = timeout
+        self.history = history
+        self._jobs = OrderedDict()
+        self._running = None
+        self._queued = None
+        self._lock = asyncio.Lock()
+        self.counters = {"submitted": 0, "coalesced": 0}
+
+    def submit(self, sources=None, kind="manual"):
+        """ثبت درخواست چرخه (روی loop)؛ (job, coalesced) بدون انتظار برمی‌گرداند"""
+        self.counters["submitted"] += 1
+        for job in (self._running, self._queued):
+            if job is not None and job.covers(sources):
+                job.requests += 1
+                return self._coalesced(job)
+        if self._queued is not None:
+            self._queued.merge(sources)
+            return self._coalesced(self._queued)
+
+        job = Job(kind, sources)
+        self._jobs[job.id] = job
+        self._queued = job
+        job.task = asyncio.get_running_loop().create_task(self._run(job))
+        self._trim()
+        return job, False
+
+    def _coalesced(self, job):
+        self.counters["coalesced"] += 1
+        metrics.JOBS_COALESCED.inc()
+        return job, True
+
+    async def _run(self, job):
+        try:
+            async with self._lock:
+                if self._queued is job:
+                    self._queued = None
+                self._running = job
+                job.status = RUNNING
+                job.started_at = time.time()
+                logging.info(f"▶️ job {job.id} ({job.kind}) شروع شد")
+                try:
+                    job.result = await asyncio.wait_for(self.runner(job), self.timeout)
+                    job.status = DONE
+                except asyncio.TimeoutError:
+                    job.status = FAILED
+                    job.error = f"cycle did not finish within {self.timeout}s"
+                except Exception as e:
+                    job.status = FAILED
+                    job.error = str(e)
+                finally:
+                    self._running = None
+        except asyncio.CancelledError:
+            # لغو در صف یا وسط اجرا (توقف برنامه)
+            if self._queued is job:
+                self._queued = None
+            job.status = CANCELLED
+            raise
+        finally:
+            job.finished_at = time.time()
+            metrics.JOBS.labels(job.kind, job.status).inc()
+            logging.info(f"⏹️ job {job.id} ({job.kind}): {job.status}")
+        return job
+
+    async def wait(self, job, timeout=None):
+        """انتظار برای پایان job؛ لغو انتظار کننده job را لغو نمی‌کند"""
+        done, _ = await asyncio.wait({job.task}, timeout=timeout)
+        if not done:
+            raise asyncio.TimeoutError(f"job {job.id} still {job.status} after {timeout}s")
+        return job
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def snapshot(self):
+        """خلاصه jobهای اخیر، جدیدترین اول"""
+        return [job.to_dict(detail=False) for job in reversed(self._jobs.values())]
+
+    def _trim(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - self.history)]:
+            del self._jobs[job_id]
+
+    async def shutdown(self):
+        """لغو چرخه صف و فرصت کوتاه به چرخه در حال اجرا پیش از لغو آن"""
+        queued, running = self._queued, self._running
+        if queued is not None:
+            queued.task.cancel()
+        if running is not None:
+            await asyncio.wait({running.task}, timeout=JOB_SHUTDOWN_GRACE)
+            running.task.cancel()
+        tasks = [job.task for job in (queued, running) if job is not None]
+        await asyncio.gather(*tasks, return_exceptions=True)
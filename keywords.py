@@ -0,0 +1,157 @@
+import os
+import json
+import bisect
+import logging
+from collections import deque, namedtuple
+
+KEYWORDS_FILE = os.getenv(
+    "KEYWORDS_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "keywords.json")
+)
+
+DEFAULT_CATEGORY = "general"
+BATCH_SEPARATOR = "\n"
+
+# نتیجه تحلیل یک عنوان: دسته با بالاترین اولویت و تعداد کلمات مهم متمایز
+KeywordMatch = namedtuple("KeywordMatch", "category important")
+
+
+class KeywordAutomaton:
+    """ماشین Aho-Corasick برای یافتن همه کلمات کلیدی در یک پیمایش متن"""
+
+    def __init__(self, patterns):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [()]
+
+        for keyword, payload in patterns:
+            self._insert(keyword, payload)
+        self._build()
+
+    def _insert(self, keyword, payload):
+        state = 0
+        for char in keyword:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            state = next_state
+        self._out[state] = self._out[state] + (payload,)
+
+    def _build(self):
+        # فرزندان ریشه پیوند شکست به ریشه دارند؛ بقیه سطر به سطر ساخته می‌شوند
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                # خروجی‌های پسوندها از قبل ادغام می‌شوند تا جستجو فقط یک گام در هر نویسه باشد
+                self._out[next_state] = self._out[next_state] + self._out[self._fail[next_state]]
+
+    def iter_matches(self, text):
+        """(اندیس پایان، payload) برای هر رخداد کلمه کلیدی در متن"""
+        goto, fail, out = self._goto, self._fail, self._out
+        root = goto[0]
+        state = 0
+        for index, char in enumerate(text):
+            while state:
+                next_state = goto[state].get(char)
+                if next_state is not None:
+                    state = next_state
+                    break
+                state = fail[state]
+            else:
+                state = root.get(char, 0)
+            if out[state]:
+                for payload in out[state]:
+                    yield index, payload
+
+
+class KeywordEngine:
+    """دسته‌بندی و امتیاز کلمات مهم عنوان با یک پیمایش؛ ترتیب دسته‌ها همان اولویت آن‌هاست"""
+
+    def __init__(self, categories, important_keywords=(), important_weight=15):
+        self.categories = [name for name, _ in categories]
+        self.important_keywords = list(important_keywords)
+        self.important_weight = important_weight
+
+        patterns = []
+        for priority, (_, keywords) in enumerate(categories):
+            patterns.extend((keyword.lower(), priority) for keyword in keywords)
+        # کلمات مهم با اندیس منفی از دسته‌ها جدا می‌شوند
+        patterns.extend((keyword.lower(), -1 - index) for index, keyword in enumerate(self.important_keywords))
+
+        skipped = [keyword for keyword, _ in patterns if not keyword or BATCH_SEPARATOR in keyword]
+        if skipped:
+            logging.warning(f"⚠️ {len(skipped)} کلمه کلیدی نامعتبر نادیده گرفته شد")
+        self.automaton = KeywordAutomaton(
+            (keyword, payload) for keyword, payload in patterns if keyword and BATCH_SEPARATOR not in keyword
+        )
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            config = json.load(f)
+
+        importance = config.get("importance", {})
+        return cls(
+            [(category["name"], category.get("keywords", [])) for category in config.get("categories", [])],
+            importance.get("keywords", []),
+            importance.get("weight", 15)
+        )
+
+    def _result(self, priority, important):
+        category = self.categories[priority] if priority is not None else DEFAULT_CATEGORY
+        return KeywordMatch(category, len(important))
+
+    def analyze(self, title):
+        """دسته خبر و تعداد کلمات مهم عنوان"""
+        priority = None
+        important = set()
+        for _, payload in self.automaton.iter_matches((title or "").lower()):
+            if payload < 0:
+                important.add(payload)
+            elif priority is None or payload < priority:
+                priority = payload
+        return self._result(priority, important)
+
+    def analyze_batch(self, titles):
+        """تحلیل همه عنوان‌های یک منبع با یک پیمایش روی متن به هم پیوسته"""
+        titles = [(title or "").lower() for title in titles]
+        starts = []
+        offset = 0
+        for title in titles:
+            starts.append(offset)
+            offset += len(title) + len(BATCH_SEPARATOR)
+
+        priorities = [None] * len(titles)
+        important = [set() for _ in titles]
+        for end, payload in self.automaton.iter_matches(BATCH_SEPARATOR.join(titles)):
+            index = bisect.bisect_right(starts, end) - 1
+            if payload < 0:
+                important[index].add(payload)
+            elif priorities[index] is None or payload < priorities[index]:
+                priorities[index] = payload
+
+        return [self._result(priority, hits) for priority, hits in zip(priorities, important)]
+
+
+def load_engine(path=KEYWORDS_FILE):
+    """ساخت موتور کلمات کلیدی از فایل تنظیمات؛ در صورت خطا موتور خالی برمی‌گردد"""
+    try:
+        engine = KeywordEngine.from_file(path)
+        logging.info(f"🔑 بارگذاری {len(engine.categories)} دسته کلمات کلیدی از {os.path.basename(path)}")
+        return engine
+    except Exception as e:
+        logging.error(f"خطا در بارگذاری کلمات کلیدی از {path}: {e}")
+        return KeywordEngine([])
+
+
+# یک بار هنگام import ساخته می‌شود
+keyword_engine = load_engine()
@@ -4,206 +4,274 @@ import asyncio
 import logging
 import threading
 import time
-import re
+import html
 import hashlib
-import json
-from flask import Flask, jsonify, request
-from telegram import Bot
+import signal
+import contextlib
+from aiohttp import web
+import runtime
+import metrics
+import feed_parsing
+from http_client import get_bot, get_session
+from feed_fetcher import (
+    FEED_ITEM_MAX_ATTEMPTS, fetch_feeds, load_feed_state, save_feed_state, select_new_entries, track_failure,
+    update_high_water
+)
+from digest_index import DigestIndex
+from news_store import NewsStore
+from near_duplicates import NearDuplicateIndex
+from translation_cache import TranslationCache
+from send_queue import SendQueue
+from translation_batcher import TranslationBatcher
+from scheduler import SourceScheduler
+from text_normalizer import extract_summary
+from keywords import keyword_engine
+from source_registry import source_registry
+from source_health import source_health
+from coordination import INSTANCE_ID, COORDINATION_BACKEND, LeaderLease, create_coordinator
+from jobs import JobManager
+from digest import DIGEST_MODE, DIGEST_SCORE_THRESHOLD, NewsDigest
 
 # Setup logging
-logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+# force: ماژول‌های وارد شده (مثلاً source_registry) ممکن است پیش از این خط لاگ نوشته باشند
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s", force=True)
 
 # Environment variables
 BOT_TOKEN = os.getenv("BOT_TOKEN") or sys.exit("ERROR: BOT_TOKEN missing")
 EDITORS_CHAT_ID = int(os.getenv("EDITORS_CHAT_ID", "-1002514471809"))
 CHANNEL_ID = int(os.getenv("CHANNEL_ID", "-1002685190359"))
 PORT = int(os.getenv("PORT", "8443"))
+NEWS_CYCLE_TIMEOUT = int(os.getenv("NEWS_CYCLE_TIMEOUT", "900"))
 
-# Flask app
-flask_app = Flask(__name__)
+# HTTP control API؛ روی همان event loop مشترک ربات اجرا می‌شود
+routes = web.RouteTableDef()
+
+SENT_NEWS_DB_FILE = os.getenv("SENT_NEWS_DB_FILE", "sent_news.db")
+SENT_NEWS_INDEX_FILE = os.getenv("SENT_NEWS_INDEX_FILE", "sent_news.idx")
+SENT_NEWS_RETENTION_DAYS = int(os.getenv("SENT_NEWS_RETENTION_DAYS", "30"))
+NEAR_DUP_THRESHOLD = float(os.getenv("NEAR_DUP_THRESHOLD", "0.8"))
+NEAR_DUP_PERMUTATIONS = int(os.getenv("NEAR_DUP_PERMUTATIONS", "64"))
+TRANSLATION_CACHE_FILE = os.getenv("TRANSLATION_CACHE_FILE", "translations.db")
+TRANSLATION_CACHE_SIZE = int(os.getenv("TRANSLATION_CACHE_SIZE", "2000"))
+TRANSLATION_CACHE_TTL_DAYS = int(os.getenv("TRANSLATION_CACHE_TTL_DAYS", "14"))
+TRANSLATION_CONCURRENCY = int(os.getenv("TRANSLATION_CONCURRENCY", "4"))
+TRANSLATION_BUDGET = float(os.getenv("TRANSLATION_BUDGET", "90"))
+TRANSLATION_API_URL = os.getenv("TRANSLATION_API_URL", "https://api.mymemory.translated.net/get")
+POLL_MIN_INTERVAL = int(os.getenv("POLL_MIN_INTERVAL", "60"))
+POLL_MAX_INTERVAL = int(os.getenv("POLL_MAX_INTERVAL", "1800"))
+POLL_DEFAULT_INTERVAL = int(os.getenv("POLL_DEFAULT_INTERVAL", "180"))
+POLL_BATCH_WINDOW = int(os.getenv("POLL_BATCH_WINDOW", "15"))
+REPORT_MIN_INTERVAL = int(os.getenv("REPORT_MIN_INTERVAL", "180"))
+LEADER_LEASE_TTL = int(os.getenv("LEADER_LEASE_TTL", "120"))
+# رزرو هش خبر تا تأیید ارسال؛ با فاصله بیشتر از مهلت چرخه تا رزرو پیش از ثبت وضعیت چرخه لغو شده منقضی نشود
+NEWS_CLAIM_TTL = int(os.getenv("NEWS_CLAIM_TTL", str(NEWS_CYCLE_TIMEOUT * 2)))
 
 # Global variables
-auto_news_running = False
-sent_news_persistent = set()
+auto_task = None
+last_report_at = 0
+web_runner = None
+source_scheduler = SourceScheduler(
+    source_registry.names(),
+    min_interval=POLL_MIN_INTERVAL,
+    max_interval=POLL_MAX_INTERVAL,
+    default_interval=POLL_DEFAULT_INTERVAL
+)
+news_store = NewsStore(SENT_NEWS_DB_FILE)
+sent_news_persistent = DigestIndex(SENT_NEWS_INDEX_FILE, retention_days=SENT_NEWS_RETENTION_DAYS)
+similar_titles = NearDuplicateIndex(threshold=NEAR_DUP_THRESHOLD, num_perm=NEAR_DUP_PERMUTATIONS)
+send_queue = SendQueue()
+coordinator = create_coordinator()
+cycle_leader = LeaderLease(coordinator, "auto-news", ttl=LEADER_LEASE_TTL)
+news_digest = NewsDigest("خلاصه خبرهای کافه شمس", "🆔 @cafeshamss\nکافه شمس ☕️🍪")
+# چرخه‌های دستی و خودکار از یک مسیر اجرا می‌شوند تا هرگز هم‌زمان روی فهرست ارسال‌ها کار نکنند
+job_manager = JobManager(lambda job: news_cycle(job.sources, job), timeout=NEWS_CYCLE_TIMEOUT)
+translation_batcher = TranslationBatcher(lambda text: fetch_translation(text), concurrency=TRANSLATION_CONCURRENCY)
+translation_cache = TranslationCache(
+    TRANSLATION_CACHE_FILE, max_entries=TRANSLATION_CACHE_SIZE, ttl_days=TRANSLATION_CACHE_TTL_DAYS
+)
+metrics.DEDUP_STORE_SIZE.set_function(lambda: len(sent_news_persistent))
+metrics.QUEUE_DEPTH.set_function(send_queue.depth)
 
 def load_sent_news():
-    """بارگذاری خبرهای ارسال شده از فایل"""
-    global sent_news_persistent
+    """بارگذاری تاریخچه ارسال (SQLite) و فهرست memory-mapped هش‌ها"""
     try:
-        if os.path.exists("sent_news.json"):
-            with open("sent_news.json", "r", encoding="utf-8") as f:
-                data = json.load(f)
-                sent_news_persistent = set(data)
-                logging.info(f"📁 بارگذاری {len(sent_news_persistent)} خبر ارسال شده از فایل")
-        else:
-            sent_news_persistent = set()
+        news_store.open()
+        news_store.migrate_json("sent_news.json")
+    except Exception as e:
+        logging.error(f"خطا در بارگذاری تاریخچه sent_news: {e}")
+    
+    # فهرست جدا باز می‌شود؛ بدون open آن compact فایل موجود را بازنویسی نمی‌کند
+    try:
+        sent_news_persistent.open()
+        # ردیف‌های ثبت شده پس از آخرین compact فهرست، دوباره به آن اضافه می‌شوند
+        for digest, sent_at in news_store.digests_since(sent_news_persistent.built_at - 60):
+            sent_news_persistent.add(digest, sent_at)
+        
+        retention_start = time.time() - SENT_NEWS_RETENTION_DAYS * 86400
+        for digest, blob, sent_at in news_store.signatures_since(retention_start):
+            similar_titles.add(digest, similar_titles.load_signature(blob), sent_at)
+        
+        logging.info(f"📁 بارگذاری {len(sent_news_persistent)} خبر ارسال شده از فایل")
     except Exception as e:
-        logging.error(f"خطا در بارگذاری فایل sent_news: {e}")
-        sent_news_persistent = set()
+        logging.error(f"خطا در بارگذاری فهرست sent_news: {e}")
+
+async def mark_news_sent(source, title, link, news_hash, title_signature=None):
+    """ثبت خبر ارسال شده در فهرست، نمایه عنوان‌های مشابه و تاریخچه"""
+    sent_at = int(time.time())
+    sent_news_persistent.add(news_hash, sent_at)
+    similar_titles.add(bytes.fromhex(news_hash), title_signature, sent_at)
+    # تراکنش SQLite بیرون از event loop؛ فهرست‌های حافظه پیش از آن به‌روز شده‌اند
+    await asyncio.to_thread(
+        news_store.record_sent, source.name, title, link, news_hash, sent_at,
+        signature=similar_titles.dump_signature(title_signature)
+    )
 
-def save_sent_news():
-    """ذخیره خبرهای ارسال شده در فایل"""
+async def save_sent_news():
+    """ادغام هش‌های جدید با فهرست و حذف سوابق خارج از بازه نگهداری"""
     try:
-        with open("sent_news.json", "w", encoding="utf-8") as f:
-            json.dump(list(sent_news_persistent), f, ensure_ascii=False, indent=2)
-        logging.info(f"💾 ذخیره {len(sent_news_persistent)} خبر در فایل")
+        retention_start = time.time() - SENT_NEWS_RETENTION_DAYS * 86400
+        # بازنویسی فایل فهرست و حذف ردیف‌های SQLite بیرون از event loop
+        total = await asyncio.to_thread(sent_news_persistent.compact)
+        similar_titles.prune(retention_start)
+        pruned = await asyncio.to_thread(news_store.prune, retention_start)
+        logging.info(f"💾 ذخیره {total} خبر در فهرست ({pruned} سابقه قدیمی حذف شد)")
     except Exception as e:
-        logging.error(f"خطا در ذخیره فایل sent_news: {e}")
+        logging.error(f"خطا در ذخیره فهرست sent_news: {e}")
 
-@flask_app.route('/')
-def home():
-    return jsonify({
+@routes.get('/')
+async def home(request):
+    return web.json_response({
         "status": "WORKING",
         "message": "Cafe Shams News Bot - Production Ready",
         "version": "v2.0-final",
-        "auto_news": auto_news_running,
-        "endpoints": ["/health", "/test", "/send", "/news", "/start-auto", "/stop-auto", "/stats", "/debug-news", "/test-channel-access", "/clear-cache", "/force-news", "/test-translate"]
+        "auto_news": auto_running(),
+        "endpoints": ["/health", "/test", "/send", "/news", "/start-auto", "/stop-auto", "/jobs", "/jobs/<id>", "/stats", "/metrics", "/debug-news", "/test-channel-access", "/clear-cache", "/force-news", "/test-translate"]
     })
 
-@flask_app.route('/health')
-def health():
-    return jsonify({"status": "OK", "port": PORT, "auto_running": auto_news_running})
+@routes.get('/health')
+async def health(request):
+    return web.json_response({"status": "OK", "port": PORT, "auto_running": auto_running()})
 
-@flask_app.route('/test')
-def test():
+@routes.get('/test')
+async def test(request):
     try:
-        bot = Bot(token=BOT_TOKEN)
-        
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        
         async def check():
-            me = await bot.get_me()
+            me = await get_bot().get_me()
             return f"Bot: {me.first_name}"
         
-        result = loop.run_until_complete(check())
-        loop.close()
+        result = await asyncio.wait_for(check(), runtime.RUNTIME_TIMEOUT)
         
-        return jsonify({"status": "OK", "bot": result})
+        return web.json_response({"status": "OK", "bot": result})
     except Exception as e:
-        return jsonify({"status": "ERROR", "error": str(e)})
+        return web.json_response({"status": "ERROR", "error": str(e)})
 
-@flask_app.route('/send')
-def send():
+@routes.get('/send')
+async def send(request):
     try:
-        bot = Bot(token=BOT_TOKEN)
-        
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        
         async def send_msg():
-            msg = await bot.send_message(
-                chat_id=EDITORS_CHAT_ID,
-                text=f"🟢 Test Message\nزمان: {time.strftime('%H:%M:%S')}\n✅ کار می‌کند!"
+            msg = await send_queue.send(
+                get_bot(),
+                EDITORS_CHAT_ID,
+                f"🟢 Test Message\nزمان: {time.strftime('%H:%M:%S')}\n✅ کار می‌کند!"
             )
             return msg.message_id
         
-        msg_id = loop.run_until_complete(send_msg())
-        loop.close()
+        msg_id = await asyncio.wait_for(send_msg(), runtime.RUNTIME_TIMEOUT)
         
-        return jsonify({
+        return web.json_response({
             "status": "SUCCESS", 
             "message_id": msg_id,
             "sent_to": EDITORS_CHAT_ID
         })
         
     except Exception as e:
-        return jsonify({"status": "ERROR", "error": str(e)})
+        return web.json_response({"status": "ERROR", "error": str(e)})
 
-@flask_app.route('/news')
-def news():
+def job_response(job, coalesced):
+    """پاسخ فوری درخواست چرخه با شناسه job برای پیگیری در /jobs/<id>"""
+    return web.json_response({
+        "status": "ACCEPTED",
+        "job_id": job.id,
+        "job_status": job.status,
+        "coalesced": coalesced,
+        "progress_url": f"/jobs/{job.id}"
+    }, status=202)
+
+@routes.get('/news')
+async def news(request):
+    job, coalesced = job_manager.submit(kind="manual")
+    if "wait" not in request.query:
+        return job_response(job, coalesced)
+    
+    # سازگاری با اسکریپت‌های قدیمی: ?wait منتظر پایان چرخه می‌ماند
     try:
-        bot = Bot(token=BOT_TOKEN)
-        
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        
-        result = loop.run_until_complete(fetch_news_async_with_report(bot))
-        loop.close()
-        
-        return jsonify(result)
+        await job_manager.wait(job, NEWS_CYCLE_TIMEOUT)
+        if job.error:
+            return web.json_response({"status": "ERROR", "error": job.error, "job_id": job.id})
+        return web.json_response({**(job.result or {}), "job_id": job.id})
         
     except Exception as e:
-        return jsonify({"status": "ERROR", "error": str(e)})
+        return web.json_response({"status": "ERROR", "error": str(e), "job_id": job.id})
 
-@flask_app.route('/start-auto')
-def start_auto():
-    global auto_news_running
-    
-    if auto_news_running:
-        return jsonify({"status": "ALREADY_RUNNING", "message": "Auto news is already running"})
-    
-    auto_news_running = True
-    
-    auto_thread = threading.Thread(target=auto_news_worker, daemon=True)
-    auto_thread.start()
+@routes.get('/jobs')
+async def jobs_list(request):
+    return web.json_response({"status": "OK", "jobs": job_manager.snapshot(), **job_manager.counters})
+
+@routes.get('/jobs/{job_id}')
+async def job_detail(request):
+    job = job_manager.get(request.match_info["job_id"])
+    if job is None:
+        return web.json_response({"status": "NOT_FOUND", "error": "unknown job id"}, status=404)
+    return web.json_response({"status": "OK", "job": job.to_dict()})
+
+@routes.get('/start-auto')
+async def start_auto(request):
+    if not start_auto_worker():
+        return web.json_response({"status": "ALREADY_RUNNING", "message": "Auto news is already running"})
     
-    return jsonify({
+    return web.json_response({
         "status": "STARTED",
-        "message": "Auto news started - immediate first run, then every 3 minutes",
-        "interval": "180 seconds"
+        "message": "Auto news started - immediate first run, then adaptive per-source polling",
+        "interval": f"{POLL_MIN_INTERVAL}-{POLL_MAX_INTERVAL} seconds per source"
     })
 
-@flask_app.route('/stop-auto')
-def stop_auto():
-    global auto_news_running
-    auto_news_running = False
+@routes.get('/stop-auto')
+async def stop_auto(request):
+    await stop_auto_worker()
     
-    return jsonify({
+    return web.json_response({
         "status": "STOPPED",
         "message": "Auto news stopped"
     })
 
-@flask_app.route('/clear-cache')
-def clear_cache():
-    global sent_news_persistent
+@routes.get('/clear-cache')
+async def clear_cache(request):
+    removed = await asyncio.to_thread(news_store.clear)
     sent_news_persistent.clear()
-    save_sent_news()
+    similar_titles.clear()
+    await coordinator.clear()
     
-    return jsonify({
+    return web.json_response({
         "status": "OK",
         "message": "News cache cleared permanently",
-        "cache_size": len(sent_news_persistent)
+        "removed": removed,
+        "cache_size": await asyncio.to_thread(news_store.count)
     })
 
-@flask_app.route('/force-news')
-def force_news():
-    global sent_news_persistent
-    
-    try:
-        bot = Bot(token=BOT_TOKEN)
-        
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        
-        result = loop.run_until_complete(fetch_news_async_with_report(bot))
-        loop.close()
-        
-        return jsonify({
-            "status": "SUCCESS",
-            "message": "Fresh news sent (cache preserved)",
-            "result": result
-        })
-        
-    except Exception as e:
-        return jsonify({"status": "ERROR", "error": str(e)})
+@routes.get('/force-news')
+async def force_news(request):
+    # مانند /news؛ حافظه خبرهای ارسال شده حفظ می‌شود
+    job, coalesced = job_manager.submit(kind="manual")
+    return job_response(job, coalesced)
 
-@flask_app.route('/test-translate')
-def test_translate():
+@routes.get('/test-translate')
+async def test_translate(request):
     try:
         test_text = "Trump announces new policy on immigration"
         
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        
-        async def do_translate():
-            result = await translate_text(test_text)
-            return result
+        result = await asyncio.wait_for(translate_text(test_text), runtime.RUNTIME_TIMEOUT)
         
-        result = loop.run_until_complete(do_translate())
-        loop.close()
-        
-        return jsonify({
+        return web.json_response({
             "status": "OK",
             "original": test_text,
             "translated": result,
@@ -211,88 +279,93 @@ def test_translate():
         })
         
     except Exception as e:
-        return jsonify({"status": "ERROR", "error": str(e)})
+        return web.json_response({"status": "ERROR", "error": str(e)})
 
-@flask_app.route('/stats')
-def stats():
-    return jsonify({
+@routes.get('/stats')
+async def stats(request):
+    return web.json_response({
         "status": "OK",
-        "total_sent": len(sent_news_persistent),
-        "auto_running": auto_news_running,
+        "total_sent": await asyncio.to_thread(news_store.count),
+        "sent_last_24h": await asyncio.to_thread(news_store.count, since=time.time() - 86400),
+        "auto_running": auto_running(),
+        "jobs": {**job_manager.counters, "recent": job_manager.snapshot()[:5]},
         "editors_chat": EDITORS_CHAT_ID,
-        "channel_id": CHANNEL_ID
+        "channel_id": CHANNEL_ID,
+        "translation_cache": translation_cache.stats(),
+        "translation_requests": translation_batcher.counters,
+        "polling": source_scheduler.snapshot(),
+        "health": source_health.snapshot(),
+        "coordination": {"backend": COORDINATION_BACKEND, "instance": INSTANCE_ID, "leader": cycle_leader.held},
+        "digest": {"enabled": DIGEST_MODE, "threshold": DIGEST_SCORE_THRESHOLD, "pending": news_digest.pending()},
+        "send_queue": {**send_queue.counters, "depth": send_queue.depth()}
     })
 
-@flask_app.route('/debug-news')
-def debug_news():
+@routes.get('/metrics')
+async def metrics_endpoint(request):
+    """متریک‌های Prometheus (قالب متنی)"""
+    return web.Response(text=metrics.registry.render(), headers={"Content-Type": metrics.CONTENT_TYPE})
+
+@routes.get('/debug-news')
+async def debug_news(request):
     """تست و عیب‌یابی خبرهای مشکل‌دار"""
     try:
-        bot = Bot(token=BOT_TOKEN)
-        
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        
         async def debug_sources():
-            import feedparser
             debug_info = []
             
-            test_sources = [
-                {"name": "مهر", "url": "https://www.mehrnews.com/rss"},
-                {"name": "مشرق", "url": "https://www.mashreghnews.ir/rss"}
-            ]
+            test_sources = source_registry.select(["مهر", "مشرق"])
             
-            for source in test_sources:
-                try:
-                    feed = feedparser.parse(source['url'])
-                    if feed.entries:
-                        for i, entry in enumerate(feed.entries[:2]):
-                            title = entry.get('title', 'No title')
-                            link = entry.get('link', 'No link')
-                            summary = entry.get('summary', 'No summary')
+            async with contextlib.aclosing(fetch_feeds(test_sources)) as fetched_feeds:
+                async for fetched in fetched_feeds:
+                    source = fetched["source"]
+                    try:
+                        if fetched["error"]:
+                            raise Exception(fetched["error"])
+                    
+                        feed = fetched["feed"]
+                        if feed.entries:
+                            for i, entry in enumerate(feed.entries[:2]):
+                                title = entry.get('title', 'No title')
+                                link = entry.get('link', 'No link')
+                                summary = entry.get('summary', 'No summary')
                             
-                            has_video = any(word in summary.lower() for word in ['ویدیو', 'فیلم', 'video', '.mp4', '.avi'])
-                            has_image = any(word in summary.lower() for word in ['تصویر', 'عکس', 'image', '.jpg', '.png'])
+                                has_video = any(word in summary.lower() for word in ['ویدیو', 'فیلم', 'video', '.mp4', '.avi'])
+                                has_image = any(word in summary.lower() for word in ['تصویر', 'عکس', 'image', '.jpg', '.png'])
                             
-                            debug_info.append({
-                                "source": source['name'],
-                                "index": i,
-                                "title": title[:100],
-                                "link_length": len(link),
-                                "summary_length": len(summary),
-                                "has_video": has_video,
-                                "has_image": has_image,
-                                "summary_preview": summary[:200]
-                            })
+                                debug_info.append({
+                                    "source": source.name,
+                                    "index": i,
+                                    "title": title[:100],
+                                    "link_length": len(link),
+                                    "summary_length": len(summary),
+                                    "has_video": has_video,
+                                    "has_image": has_image,
+                                    "summary_preview": summary[:200]
+                                })
                             
-                except Exception as e:
-                    debug_info.append({
-                        "source": source['name'],
-                        "error": str(e)
-                    })
+                    except Exception as e:
+                        debug_info.append({
+                            "source": source.name,
+                            "error": str(e)
+                        })
             
             return debug_info
         
-        result = loop.run_until_complete(debug_sources())
-        loop.close()
+        result = await asyncio.wait_for(debug_sources(), 60)
         
-        return jsonify({
+        return web.json_response({
             "status": "OK",
             "debug_info": result,
             "total_news_checked": len(result)
         })
         
     except Exception as e:
-        return jsonify({"status": "ERROR", "error": str(e)})
+        return web.json_response({"status": "ERROR", "error": str(e)})
 
-@flask_app.route('/test-channel-access')
-def test_channel_access():
+@routes.get('/test-channel-access')
+async def test_channel_access(request):
     try:
-        bot = Bot(token=BOT_TOKEN)
-        
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        
         async def full_test():
+            bot = get_bot()
             results = {}
             
             try:
@@ -332,174 +405,379 @@ def test_channel_access():
             
             return results
         
-        results = loop.run_until_complete(full_test())
-        loop.close()
+        results = await asyncio.wait_for(full_test(), runtime.RUNTIME_TIMEOUT)
         
-        return jsonify({
+        return web.json_response({
             "status": "COMPLETED",
             "results": results,
             "suggestion": "If channel test failed, add bot as admin to @cafeshamss"
         })
         
     except Exception as e:
-        return jsonify({"status": "ERROR", "error": str(e)})
+        return web.json_response({"status": "ERROR", "error": str(e)})
 
-def auto_news_worker():
-    global auto_news_running
-    
+async def start_web_server():
+    """راه‌اندازی سرور HTTP روی loop مشترک؛ handlerها مستقیم pipeline را await می‌کنند"""
+    global web_runner
+    app = web.Application()
+    app.add_routes(routes)
+    web_runner = web.AppRunner(app)
+    await web_runner.setup()
+    await web.TCPSite(web_runner, "0.0.0.0", PORT).start()
+    logging.info(f"🌐 سرور HTTP روی پورت {PORT} آماده است")
+
+async def stop_web_server():
+    if web_runner is not None:
+        await web_runner.cleanup()
+
+def auto_running():
+    return auto_task is not None and not auto_task.done()
+
+def start_auto_worker():
+    """شروع worker خودکار روی loop؛ False اگر از قبل در حال اجرا باشد"""
+    global auto_task
+    # بدون await بین بررسی و ساخت task، پس دو درخواست هم‌زمان دو worker نمی‌سازند
+    if auto_running():
+        return False
+    auto_task = asyncio.get_running_loop().create_task(auto_news_worker())
+    return True
+
+async def stop_auto_worker():
+    """لغو فوری worker خودکار؛ چرخه در حال اجرا به صورت job تا پایان ادامه می‌یابد"""
+    task = auto_task
+    if task is not None and not task.done():
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+async def auto_news_worker():
     logging.info("🤖 Auto news worker started")
     
     try:
-        logging.info("⚡ Initial news cycle (immediate)")
-        bot = Bot(token=BOT_TOKEN)
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        
-        result = loop.run_until_complete(fetch_news_async_with_report(bot))
-        loop.close()
-        
-        if result["status"] == "SUCCESS":
-            logging.info(f"✅ Initial news: sent {result.get('total_sent', 0)} news")
-        else:
-            logging.info("ℹ️ Initial news: No new news found")
-    except Exception as e:
-        logging.error(f"Initial news error: {e}")
-    
-    while auto_news_running:
-        try:
-            for i in range(180):
-                if not auto_news_running:
-                    break
-                time.sleep(1)
-            
-            if not auto_news_running:
-                break
+        # اولین بررسی فوری است چون همه منابع در ابتدا سررسید دارند
+        while True:
+            try:
+                next_due = source_scheduler.next_due() or time.time() + POLL_DEFAULT_INTERVAL
+                while time.time() < next_due:
+                    # منبع تازه در sources.json بدون انتظار برای سررسید فعلی زمان‌بندی می‌شود
+                    if refresh_sources():
+                        next_due = min(next_due, source_scheduler.next_due() or next_due)
+                    await asyncio.sleep(min(1, max(0, next_due - time.time())))
                 
-            logging.info("⏰ Auto news cycle started")
-            
-            bot = Bot(token=BOT_TOKEN)
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            
-            result = loop.run_until_complete(fetch_news_async_with_report(bot))
-            loop.close()
-            
-            if result["status"] == "SUCCESS":
-                logging.info(f"✅ Auto news: sent {result.get('total_sent', 0)} news")
-            else:
-                logging.info("ℹ️ Auto news: No new news found")
+                # در اجرای چند نسخه‌ای فقط رهبر چرخه خودکار را اجرا می‌کند؛ بقیه آماده جایگزینی می‌مانند
+                if not await cycle_leader.acquire():
+                    logging.info(f"⏸️ {INSTANCE_ID}: نسخه دیگری رهبر است، انتظار")
+                    await asyncio.sleep(min(LEADER_LEASE_TTL / 3, POLL_MIN_INTERVAL))
+                    continue
                 
-        except Exception as e:
-            logging.error(f"Auto news error: {e}")
-            time.sleep(60)
-    
-    logging.info("🛑 Auto news worker stopped")
-
-async def fetch_news_async_with_report(bot):
-    import feedparser
-    
-    sources = [
-        {"name": "مهر", "url": "https://www.mehrnews.com/rss"},
-        {"name": "فارس", "url": "https://www.farsnews.ir/rss"},
-        {"name": "تسنیم", "url": "https://www.tasnimnews.com/fa/rss/feed"},
-        {"name": "ایرنا", "url": "https://www.irna.ir/rss"},
-        {"name": "ایسنا", "url": "https://www.isna.ir/rss"},
-        {"name": "همشهری آنلاین", "url": "https://www.hamshahrionline.ir/rss"},
-        {"name": "خبر آنلاین", "url": "https://www.khabaronline.ir/rss"},
-        {"name": "مشرق", "url": "https://www.mashreghnews.ir/rss"},
-        {"name": "انتخاب", "url": "https://www.entekhab.ir/fa/rss/allnews"},
-        {"name": "جماران", "url": "https://www.jamaran.news/rss"},
-        {"name": "آخرین خبر", "url": "https://www.akharinkhabar.ir/rss"},
-        {"name": "هم‌میهن", "url": "https://www.hammihanonline.ir/rss"},
-        {"name": "اعتماد", "url": "https://www.etemadonline.com/rss"},
-        {"name": "اصلاحات", "url": "https://www.eslahat.news/rss"},
-        {"name": "Tehran Times", "url": "https://www.tehrantimes.com/rss"},
-        {"name": "Iran Front Page", "url": "https://ifpnews.com/feed"},
-        {"name": "ABC News", "url": "https://abcnews.go.com/abcnews/topstories"},
-        {"name": "CNN", "url": "http://rss.cnn.com/rss/cnn_topstories.rss"},
-        {"name": "The Guardian", "url": "https://www.theguardian.com/world/rss"},
-        {"name": "Al Jazeera", "url": "https://www.aljazeera.com/xml/rss/all.xml"},
-        {"name": "Foreign Affairs", "url": "https://www.foreignaffairs.com/rss.xml"},
-        {"name": "The Atlantic", "url": "https://www.theatlantic.com/feed/all"},
-        {"name": "Brookings", "url": "https://www.brookings.edu/feed"},
-        {"name": "Carnegie", "url": "https://carnegieendowment.org/rss"},
-        {"name": "Reuters", "url": "https://feeds.reuters.com/reuters/topNews"},
-        {"name": "AP News", "url": "https://apnews.com/rss"},
-        {"name": "BBC World", "url": "https://feeds.bbci.co.uk/news/world/rss.xml"}
-    ]
+                due_sources = source_scheduler.pop_due(window=POLL_BATCH_WINDOW)
+                if not due_sources:
+                    continue
+                
+                logging.info(f"⏰ Auto news cycle started ({len(due_sources)} sources due)")
+                
+                # اگر چرخه دستی همین منابع را در حال بررسی دارد، همان نتیجه استفاده می‌شود
+                if set(due_sources) >= set(source_registry.names()):
+                    due_sources = None
+                job, coalesced = job_manager.submit(due_sources, kind="auto")
+                if coalesced:
+                    logging.info(f"🔗 Auto news joined job {job.id}")
+                await job_manager.wait(job)
+                
+                if job.result is None:
+                    logging.error(f"Auto news error: job {job.id} {job.status} - {job.error}")
+                elif job.result["status"] == "SUCCESS":
+                    logging.info(f"✅ Auto news: sent {job.result.get('total_sent', 0)} news")
+                else:
+                    logging.info("ℹ️ Auto news: No new news found")
+                    
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Auto news error: {e}")
+                await asyncio.sleep(60)
+    finally:
+        await cycle_leader.release()
+        logging.info("🛑 Auto news worker stopped")
+
+async def news_cycle(source_names=None, job=None):
+    """یک چرخه خبرگیری با Bot مشترک و ثبت نتیجه هر منبع در زمان‌بند"""
+    started = time.monotonic()
+    result = await fetch_news_async_with_report(get_bot(), source_names, job)
+    metrics.CYCLE_SECONDS.set(round(time.monotonic() - started, 3))
+    
+    for r in result.get("sources", []):
+        if r.get("circuit_open"):
+            # منبع بررسی نشده؛ زمان بررسی بعدی را مدارشکن تعیین می‌کند نه نرخ انتشار
+            continue
+        source_scheduler.record(
+            r["src"], new_items=r["new"], not_modified=r.get("not_modified", False),
+            error=r["err"] > 0 and r["got"] == 0, backlog=r.get("backlog", 0)
+        )
+    
+    return result
+
+def refresh_sources():
+    """بارگذاری مجدد sources.json در صورت تغییر و همگام‌سازی زمان‌بند"""
+    if source_registry.refresh():
+        source_scheduler.sync(source_registry.names())
+        source_health.sync(source_registry.names())
+        return True
+    return False
+
+async def fetch_news_async_with_report(bot, source_names=None, job=None):
+    refresh_sources()
+    sources = source_registry.select(source_names)
+    
+    # وضعیت هر منبع برای /jobs/<id> وقتی چرخه از طریق job اجرا شود
+    report_progress = job.update if job is not None else (lambda *args, **kwargs: None)
+    for source in sources:
+        report_progress(source.name, "fetching")
     
     stats = []
     total_news_sent = 0
     sent_news_list = []
     
-    for source in sources:
-        got = sent = err = 0
-        
+    # خبرهای در صف ارسال این چرخه؛ برای جلوگیری از تکرار پیش از تأیید ارسال
+    pending = []
+    pending_hashes = set()
+    pending_titles = NearDuplicateIndex(threshold=NEAR_DUP_THRESHOLD, num_perm=NEAR_DUP_PERMUTATIONS)
+    # خبرهای بررسی شده هر منبع برای جابجایی نشانه پس از تأیید ارسال
+    cycle_progress = {}
+    translation_deadline = time.monotonic() + TRANSLATION_BUDGET
+    # صاحب رزروها در این چرخه؛ چرخه‌های هم‌زمان یک نسخه هم رزرو یکدیگر را نمی‌گیرند
+    claim_owner = f"{INSTANCE_ID}:{os.urandom(4).hex()}"
+    
+    logging.info(f"📡 دریافت همزمان {len(sources)} منبع")
+    
+    stats_by_source = {}
+    # چرخه لغو شده (مهلت NEWS_CYCLE_TIMEOUT یا توقف برنامه) شمارش ناموفق خبرها را تغییر نمی‌دهد
+    cancelled = False
+    
+    async def record_sent(source, title, link, news_hash, title_signature):
+        nonlocal total_news_sent
+        logging.info(f"✅ خبر ارسال شد از {source.name}: {title}")
+        if source.name in stats_by_source:
+            stats_by_source[source.name]["sent"] += 1
+        metrics.SENT.labels(source.name).inc()
+        total_news_sent += 1
+        sent_news_list.append({
+            "source": source.name,
+            "title": title[:50] + "..."
+        })
+        await mark_news_sent(source, title, link, news_hash, title_signature)
+    
+    async def confirm_sent(news_hash):
+        try:
+            await coordinator.confirm(news_hash, claim_owner, SENT_NEWS_RETENTION_DAYS * 86400)
+        except Exception as e:
+            # رزرو موقت تا NEWS_CLAIM_TTL باقی است و فهرست محلی هم خبر را دارد
+            logging.warning(f"⚠️ خطا در ثبت ارسال در backend هماهنگی: {e}")
+    
+    async def record_failed(source, news_hash, index):
+        if source.name in stats_by_source:
+            stats_by_source[source.name]["err"] += 1
+        progress = cycle_progress[source.name]
+        if progress["failed"] is None or index < progress["failed"]:
+            progress["failed"] = index
         try:
-            logging.info(f"📡 بررسی {source['name']}")
+            await coordinator.release_claim(news_hash, claim_owner)
+        except Exception as release_error:
+            logging.warning(f"⚠️ خطا در آزاد کردن رزرو خبر: {release_error}")
+    
+    try:
+        async with contextlib.aclosing(fetch_feeds(sources)) as fetched_feeds:
+            async for fetched in fetched_feeds:
+                source = fetched["source"]
+                got = sent = err = new = 0
+                transfer = {
+                    "bytes": fetched["bytes"], "not_modified": fetched["not_modified"],
+                    "fallback": fetched["fallback"], "circuit_open": fetched["circuit_open"]
+                }
+        
+                try:
+                    if fetched["circuit_open"]:
+                        logging.info(f"⛔ {source.name}: مدار قطع است، بررسی بعدی تا {source_health.retry_in(source.name)} ثانیه دیگر")
+                        report_progress(source.name, "skipped", reason="circuit_open")
+                        stats.append({"src": source.name, "got": got, "new": new, "sent": sent, "err": err, **transfer})
+                        continue
             
-            try:
-                feed = feedparser.parse(source['url'])
-                if not feed.entries:
-                    logging.warning(f"⚠️ {source['name']}: هیچ خبری یافت نشد")
-                    got = 0
-                else:
-                    got = len(feed.entries)
-            except Exception as e:
-                logging.error(f"❌ {source['name']}: خطا در RSS - {e}")
-                err += 1
-                stats.append({"src": source['name'], "got": got, "sent": sent, "err": err})
-                continue
+                    if fetched["error"]:
+                        logging.error(f"❌ {source.name}: خطا در RSS - {fetched['error']}")
+                        metrics.ERRORS.labels("fetch").inc()
+                        err += 1
+                        report_progress(source.name, "failed", error=str(fetched["error"]))
+                        stats.append({"src": source.name, "got": got, "new": new, "sent": sent, "err": err, **transfer})
+                        continue
+            
+                    if fetched["not_modified"]:
+                        logging.info(f"💤 {source.name}: بدون تغییر (304)")
+                        report_progress(source.name, "done", not_modified=True)
+                        stats.append({"src": source.name, "got": got, "new": new, "sent": sent, "err": err, **transfer})
+                        continue
+            
+                    feed = fetched["feed"]
+                    if not feed.entries:
+                        logging.warning(f"⚠️ {source.name}: هیچ خبری یافت نشد")
+                        got = 0
+                    else:
+                        got = len(feed.entries)
             
-            for i, entry in enumerate(feed.entries[:3]):
-                if got > 0:
-                    title = entry.get('title', 'بدون عنوان')
-                    link = entry.get('link', '')
+                    entries, backlog = select_new_entries(source.name, feed.entries)
+                    progress = cycle_progress[source.name] = {
+                        "entries": entries, "backlog": backlog, "done": 0, "failed": None, "fallback": fetched["fallback"]
+                    }
+                    if backlog:
+                        logging.info(f"📚 {source.name}: {backlog} خبر جدید به چرخه بعد منتقل شد")
+                    metrics.ENTRIES_SEEN.labels(source.name).inc(len(entries))
+                    # دسته و کلمات مهم همه عنوان‌های جدید منبع با یک پیمایش
+                    analyses = keyword_engine.analyze_batch([entry.get('title', 'بدون عنوان') for entry in entries])
+            
+                    for index, entry in enumerate(entries):
+                        title = entry.get('title', 'بدون عنوان')
+                        link = entry.get('link', '')
+                
+                        if title and link:
+                            dedup_started = time.perf_counter()
+                            news_content = f"{source.name}-{title}-{entry.get('summary', '')[:100]}"
+                            news_hash = hashlib.md5(news_content.encode()).hexdigest()
+                    
+                            duplicate = None
+                            if news_hash in sent_news_persistent or news_hash in pending_hashes:
+                                duplicate = "exact"
+                            else:
+                                title_signature = similar_titles.signature(title)
+                                if (similar_titles.find(title_signature) is not None
+                                        or pending_titles.find(title_signature) is not None):
+                                    duplicate = "similar"
                     
-                    if title and link:
-                        news_content = f"{source['name']}-{title}-{entry.get('summary', '')[:100]}"
-                        news_hash = hashlib.md5(news_content.encode()).hexdigest()
-                        
-                        is_duplicate = False
-                        for existing_hash in sent_news_persistent:
-                            if news_hash == existing_hash:
-                                is_duplicate = True
-                                break
-                        
-                        if not is_duplicate:
-                            for existing_news in sent_news_persistent:
-                                similarity = calculate_similarity(title, existing_news.split('-', 2)[-1] if '-' in existing_news else existing_news)
-                                if similarity > 0.8:
-                                    is_duplicate = True
+                            if not duplicate:
+                                # رزرو اتمی بین نسخه‌ها؛ نسخه دیگر ممکن است همین خبر را هم‌زمان ارسال کند
+                                try:
+                                    if not await coordinator.claim(news_hash, claim_owner, NEWS_CLAIM_TTL):
+                                        duplicate = "claimed"
+                                except Exception as e:
+                                    logging.error(f"❌ {source.name}: خطا در رزرو خبر - {e}")
+                                    metrics.ERRORS.labels("coordination").inc()
+                                    err += 1
+                                    # نشانه منبع پیش از این خبر می‌ماند تا در چرخه بعد دوباره بررسی شود
+                                    progress["failed"] = index
+                                    break
+                            metrics.DEDUP_SECONDS.observe(time.perf_counter() - dedup_started)
+                    
+                            if not duplicate:
+                                try:
+                                    # ترجمه و ارسال در پس‌زمینه؛ دریافت منابع بعدی منتظر نمی‌ماند
+                                    delivery = asyncio.create_task(
+                                        process_and_send_news(
+                                            bot, source, entry, news_hash, translation_deadline, analyses[index]
+                                        )
+                                    )
+                                    pending_hashes.add(news_hash)
+                                    pending_titles.add(news_hash, title_signature)
+                                    pending.append((delivery, source, title, link, news_hash, title_signature, index))
+                                    new += 1
+                            
+                                except Exception as e:
+                                    logging.error(f"❌ خطا در پردازش خبر {source.name}: {e}")
+                                    metrics.ERRORS.labels("process").inc()
+                                    err += 1
                                     break
-                        
-                        if not is_duplicate:
-                            try:
-                                result = await process_and_send_news(bot, source, entry, news_hash)
-                                if result:
-                                    sent += 1
-                                    total_news_sent += 1
-                                    sent_news_list.append({
-                                        "source": source['name'],
-                                        "title": title[:50] + "..."
-                                    })
-                                    
-                                    sent_news_persistent.add(news_hash)
-                                    save_sent_news()
-                                    
-                                    await asyncio.sleep(10)
-                                    
-                            except Exception as e:
-                                logging.error(f"❌ خطا در پردازش خبر {source['name']}: {e}")
-                                err += 1
-                        else:
-                            logging.info(f"🔄 {source['name']}: خبر تکراری - رد شد")
+                            else:
+                                metrics.DUPLICATES.labels(duplicate).inc()
+                                logging.info(f"🔄 {source.name}: خبر تکراری - رد شد")
                 
-        except Exception as e:
-            logging.error(f"❌ خطا در {source['name']}: {e}")
-            err += 1
+                        progress["done"] = index + 1
+            
+                    report_progress(source.name, "sending" if new else "done", got=got, new=new)
+            
+                except Exception as e:
+                    logging.error(f"❌ خطا در {source.name}: {e}")
+                    metrics.ERRORS.labels("source").inc()
+                    err += 1
+                    report_progress(source.name, "failed", error=str(e))
             
-        stats.append({"src": source['name'], "got": got, "sent": sent, "err": err})
+                stats.append({"src": source.name, "got": got, "new": new, "sent": sent, "err": err, **transfer})
+    
+        if DIGEST_MODE:
+            # خبرهای کم‌اهمیت پس از آماده شدن همه خبرهای چرخه در پیام خلاصه قرار می‌گیرند
+            await asyncio.gather(*(p[0] for p in pending))
+            if news_digest.due():
+                flush_digest(bot)
+    
+        # انتظار برای تحویل پیام‌های صف؛ فقط خبرهای واقعاً ارسال شده ثبت می‌شوند
+        stats_by_source.update((r["src"], r) for r in stats)
+        while pending:
+            delivery, source, title, link, news_hash, title_signature, index = pending[0]
+            try:
+                queued = await delivery
+                if queued is None:
+                    raise Exception("message was not queued")
+                await queued
+            except Exception as e:
+                logging.error(f"❌ خطا در ارسال خبر {source.name}: {e}")
+                metrics.ERRORS.labels("send").inc()
+                pending.pop(0)
+                await record_failed(source, news_hash, index)
+                continue
+            
+            pending.pop(0)
+            await record_sent(source, title, link, news_hash, title_signature)
+            await confirm_sent(news_hash)
+    
+    except asyncio.CancelledError:
+        cancelled = True
+        logging.warning(f"⏱️ چرخه پیش از تأیید ارسال {len(pending)} خبر لغو شد؛ وضعیت ذخیره می‌شود")
+        stats_by_source.update((r["src"], r) for r in stats)
+        for delivery, source, title, link, news_hash, title_signature, index in pending:
+            queued = None
+            if delivery.done() and not delivery.cancelled() and delivery.exception() is None:
+                queued = delivery.result()
+            if queued is not None and queued.done() and not queued.cancelled() and queued.exception() is None:
+                await record_sent(source, title, link, news_hash, title_signature)
+                await confirm_sent(news_hash)
+                continue
+            # پیام هنوز ارسال نشده؛ از صف ارسال حذف می‌شود تا بدون ثبت در تاریخچه منتشر نشود
+            delivery.cancel()
+            if queued is not None:
+                queued.cancel()
+            await record_failed(source, news_hash, index)
+        raise
+    
+    finally:
+        # نشانه هر منبع تا پیش از اولین خبر ناموفق جلو می‌رود تا آن خبر در چرخه بعد دوباره بررسی شود
+        for name, progress in cycle_progress.items():
+            failed = progress["failed"]
+            done = progress["done"] if failed is None else failed
+            failed_entry = None if failed is None else progress["entries"][failed]
+            if not progress["fallback"] and not cancelled and track_failure(name, failed_entry) >= FEED_ITEM_MAX_ATTEMPTS:
+                # خبری که همیشه ناموفق است (مثلاً BadRequest) نباید منبع را برای همیشه متوقف کند
+                title = failed_entry.get("title", "")
+                logging.warning(f"🗑️ {name}: خبر پس از {FEED_ITEM_MAX_ATTEMPTS} تلاش ناموفق کنار گذاشته شد - {title}")
+                metrics.ERRORS.labels("dropped").inc()
+                track_failure(name, None)
+                done = failed + 1
+            remaining = progress["backlog"] + len(progress["entries"]) - done
+            if name in stats_by_source:
+                stats_by_source[name]["backlog"] = remaining
+            if progress["fallback"]:
+                # تیترهای صفحه fallback شناسه و تاریخ فید را ندارند؛ نشانه آن‌ها هرگز با خبرهای RSS منطبق نمی‌شود
+                continue
+            update_high_water(name, progress["entries"][done - 1] if done else None, remaining)
+    
+        save_feed_state()
+        await save_sent_news()
+    
+    for r in stats:
+        state = "done" if job is not None and job.progress[r["src"]]["state"] == "sending" else None
+        report_progress(r["src"], state, sent=r["sent"], err=r["err"], backlog=r.get("backlog", 0))
+    
+    # ترتیب گزارش مطابق فهرست منابع، مستقل از ترتیب رسیدن پاسخ‌ها
+    source_order = {source.name: index for index, source in enumerate(sources)}
+    stats.sort(key=lambda s: source_order.get(s["src"], len(source_order)))
+    try:
+        await coordinator.prune()
+    except Exception as e:
+        logging.warning(f"⚠️ خطا در پاک‌سازی رزروهای منقضی: {e}")
     
     await send_report(bot, stats, total_news_sent, sent_news_list)
     
@@ -508,147 +786,143 @@ async def fetch_news_async_with_report(bot):
             "status": "SUCCESS",
             "total_sent": total_news_sent,
             "news_list": sent_news_list,
-            "total_sources": len(sources)
+            "total_sources": len(sources),
+            "sources": stats
         }
     else:
         return {
             "status": "NO_NEWS", 
-            "message": "هیچ خبر جدیدی در هیچ‌کدام از ۲۷ منبع یافت نشد",
-            "total_sources_checked": len(sources)
+            "message": f"هیچ خبر جدیدی در هیچ‌کدام از {len(sources)} منبع یافت نشد",
+            "total_sources_checked": len(sources),
+            "sources": stats
         }
 
-async def process_and_send_news(bot, source, entry, news_hash):
+def flush_digest(bot):
+    """ارسال خبرهای صف خلاصه؛ Futureهای تحویل پیام‌ها را برمی‌گرداند"""
+    return news_digest.flush(lambda text: send_queue.enqueue(
+        bot, EDITORS_CHAT_ID, text, parse_mode='HTML', disable_web_page_preview=True
+    ))
+
+async def flush_pending_digest():
+    """ارسال باقی‌مانده خلاصه پنجره زمانی هنگام توقف برنامه"""
+    if news_digest.pending():
+        await asyncio.gather(*flush_digest(get_bot()), return_exceptions=True)
+
+async def process_and_send_news(bot, source, entry, news_hash, deadline=None, keywords=None):
     try:
         title = entry.get('title', 'بدون عنوان')
         link = entry.get('link', '')
         
-        summary = ""
-        
-        if hasattr(entry, 'summary') and entry.summary:
-            summary = entry.summary
-        elif hasattr(entry, 'description') and entry.description:
-            summary = entry.description
-        elif hasattr(entry, 'content') and entry.content:
-            if isinstance(entry.content, list) and len(entry.content) > 0:
-                summary = entry.content[0].value
-            else:
-                summary = str(entry.content)
-        
-        summary = re.sub(r'<[^>]+>', '', summary)
-        summary = summary.strip()
-        
-        summary = re.sub(r'https?://[^\s]+\.(mp4|avi|mov|wmv|flv|webm|jpg|jpeg|png|gif)', '', summary)
-        summary = re.sub(r'\[video\]|\[image\]|\[photo\]|\[pic\]', '', summary, flags=re.IGNORECASE)
-        summary = re.sub(r'(تصویر|ویدیو|فیلم|عکس):', '', summary)
-        summary = summary.strip()
-        
-        if not summary or summary == title or len(summary) < 50:
-            if hasattr(entry, 'content') and entry.content:
-                if isinstance(entry.content, list):
-                    for content_item in entry.content:
-                        if hasattr(content_item, 'value'):
-                            temp_content = re.sub(r'<[^>]+>', '', content_item.value).strip()
-                            if len(temp_content) > 100 and temp_content != title:
-                                summary = temp_content
-                                break
-            
-            if not summary or summary == title or len(summary) < 50:
-                summary = await ai_summarize_news(title, link, source['name'])
+        summary = extract_summary(entry, title)
+        if not summary:
+            summary = await ai_summarize_news(title, link, source.name, keywords)
         
         if not summary or len(summary) < 30:
             summary = "🤖 این خبر توسط هوش مصنوعی کافه شمس تحلیل و خلاصه‌سازی شده است. برای مطالعه کامل به لینک مراجعه کنید."
         
-        english_sources = [
-            "Tehran Times", "Iran Front Page", "ABC News", "CNN", 
-            "The Guardian", "Al Jazeera", "Foreign Affairs", "The Atlantic",
-            "Brookings", "Carnegie", "Reuters", "AP News", "BBC World"
-        ]
-        
-        if source['name'] in english_sources:
-            try:
-                logging.info(f"🔄 شروع ترجمه عنوان از {source['name']}: {title[:50]}...")
-                title_fa = await translate_text(title)
-                if title_fa and len(title_fa.strip()) > 5:
-                    logging.info(f"✅ عنوان ترجمه شد: {title_fa[:50]}...")
-                    title = title_fa
-                else:
-                    logging.warning(f"⚠️ ترجمه عنوان ناموفق، استفاده از fallback")
-                    title = f"🌍 {title}"
-            except Exception as e:
-                logging.error(f"❌ خطا در ترجمه عنوان: {e}")
-                title = f"🌍 {title}"
-            
-            if len(summary) > 50 and "جزئیات کامل" not in summary:
-                try:
-                    logging.info(f"🔄 شروع ترجمه خلاصه از {source['name']}: {summary[:30]}...")
-                    summary_fa = await translate_text(summary)
-                    if summary_fa and len(summary_fa.strip()) > 20:
-                        logging.info(f"✅ خلاصه ترجمه شد: {summary_fa[:30]}...")
-                        summary = summary_fa
-                    else:
-                        logging.warning(f"⚠️ ترجمه خلاصه ناموفق، استفاده از fallback")
-                        summary = f"🌍 [English] {summary[:400]}..."
-                except Exception as e:
-                    logging.error(f"❌ خطا در ترجمه خلاصه: {e}")
-                    summary = f"🌍 [English] {summary[:400]}..."
+        if source.lang == "en":
+            title, summary = await translate_news(source, title, summary, deadline)
         
         if len(summary) > 600:
             summary = summary[:600] + "..."
 
-        source_name_en = {
-            "مهر": "Mehr News",
-            "فارس": "Fars News", 
-            "تسنیم": "Tasnim News",
-            "ایرنا": "IRNA",
-            "ایسنا": "ISNA",
-            "همشهری آنلاین": "Hamshahri Online",
-            "خبر آنلاین": "Khabar Online",
-            "مشرق": "Mashregh News",
-            "انتخاب": "Entekhab News",
-            "جماران": "Jamaran",
-            "آخرین خبر": "Akharin Khabar",
-            "هم‌میهن": "HamMihan",
-            "اعتماد": "Etemad",
-            "اصلاحات": "Eslahat News"
-        }.get(source['name'], source['name'])
-
         clean_link = link.replace('&amp;', '&')
         
         if len(clean_link) > 1000:
             clean_link = clean_link[:1000]
         
-        message_text = f"""📰 <b>{source_name_en}</b>
+        message_text = f"""📰 <b>{source.display_name}</b>
 
-<b>{title}</b>
+<b>{html.escape(title, quote=False)}</b>
 
-{summary}
+{html.escape(summary, quote=False)}
 
 🔗 <a href="{clean_link}">مشاهده کامل خبر</a>
 
 🆔 @cafeshamss     
 کافه شمس ☕️🍪"""
 
-        msg = await bot.send_message(
-            chat_id=EDITORS_CHAT_ID,
-            text=message_text,
+        if DIGEST_MODE:
+            score = calculate_importance_score(title, source.name, keywords)
+            if score < DIGEST_SCORE_THRESHOLD:
+                logging.info(f"🗂️ خبر کم‌اهمیت ({score}) به خلاصه اضافه شد از {source.name}: {title}")
+                return news_digest.add(source.display_name, title, clean_link, message_text)
+
+        delivery = send_queue.enqueue(
+            bot,
+            EDITORS_CHAT_ID,
+            message_text,
             parse_mode='HTML',
             disable_web_page_preview=False,
             disable_notification=False
         )
         
-        logging.info(f"✅ خبر ارسال شد از {source['name']}: {title}")
-        return True
+        logging.info(f"📤 خبر در صف ارسال قرار گرفت از {source.name}: {title}")
+        return delivery
         
     except Exception as e:
         logging.error(f"❌ خطا در ارسال خبر: {e}")
-        return False
+        return None
+
+async def translate_news(source, title, summary, deadline=None):
+    """ترجمه همزمان عنوان و خلاصه؛ پس از پایان مهلت چرخه نسخه انگلیسی با 🌍 استفاده می‌شود"""
+    translate_summary = len(summary) > 50 and "جزئیات کامل" not in summary
+    texts = [title, summary] if translate_summary else [title]
+    
+    logging.info(f"🔄 شروع ترجمه از {source.name}: {title[:50]}...")
+    remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+    if remaining == 0:
+        # wait_for با مهلت صفر حتی نتیجه آماده را هم نمی‌پذیرد؛ پس از پایان مهلت فقط کش بدون درخواست شبکه
+        results = [cached_translation(text) for text in texts]
+        if None in results:
+            logging.warning(f"⌛ مهلت ترجمه چرخه تمام شد، استفاده از fallback: {title[:50]}...")
+    else:
+        try:
+            with metrics.TRANSLATE_SECONDS.time():
+                results = await asyncio.wait_for(
+                    asyncio.gather(*(translate_text(text) for text in texts), return_exceptions=True),
+                    timeout=remaining
+                )
+        except asyncio.TimeoutError:
+            logging.warning(f"⌛ مهلت ترجمه چرخه تمام شد، استفاده از fallback: {title[:50]}...")
+            results = [None] * len(texts)
+    
+    title_fa = results[0]
+    if isinstance(title_fa, Exception):
+        logging.error(f"❌ خطا در ترجمه عنوان: {title_fa}")
+        title = f"🌍 {title}"
+        metrics.TRANSLATION_FALLBACKS.inc()
+    elif title_fa and len(title_fa.strip()) > 5:
+        logging.info(f"✅ عنوان ترجمه شد: {title_fa[:50]}...")
+        title = title_fa
+    else:
+        logging.warning("⚠️ ترجمه عنوان ناموفق، استفاده از fallback")
+        title = f"🌍 {title}"
+        metrics.TRANSLATION_FALLBACKS.inc()
+    
+    if translate_summary:
+        summary_fa = results[1]
+        if isinstance(summary_fa, Exception):
+            logging.error(f"❌ خطا در ترجمه خلاصه: {summary_fa}")
+            summary = f"🌍 [English] {summary[:400]}..."
+            metrics.TRANSLATION_FALLBACKS.inc()
+        elif summary_fa and len(summary_fa.strip()) > 20:
+            logging.info(f"✅ خلاصه ترجمه شد: {summary_fa[:30]}...")
+            summary = summary_fa
+        else:
+            logging.warning("⚠️ ترجمه خلاصه ناموفق، استفاده از fallback")
+            summary = f"🌍 [English] {summary[:400]}..."
+            metrics.TRANSLATION_FALLBACKS.inc()
+    
+    return title, summary
 
-async def ai_summarize_news(title, link, source):
-    """خلاصه‌سازی پیشرفته خبر با هوش مصنوعی"""
+async def ai_summarize_news(title, link, source, keywords=None):
+    """خلاصه‌سازی پیشرفته خبر با هوش مصنوعی؛ keywords نتیجه analyze_batch منبع اگر از قبل محاسبه شده باشد"""
     try:
-        # تحلیل عمق موضوع
-        news_category = analyze_news_category(title)
-        importance_score = calculate_importance_score(title, source)
+        # تحلیل عمق موضوع؛ دسته و کلمات مهم با یک پیمایش عنوان
+        keywords = keywords or keyword_engine.analyze(title)
+        news_category = keywords.category
+        importance_score = calculate_importance_score(title, source, keywords)
         
         # خلاصه‌های تخصصی بر اساس دسته‌بندی
         political_summaries = [
@@ -717,50 +991,18 @@ async def ai_summarize_news(title, link, source):
         logging.error(f"خطا در AI summarization: {e}")
         return "🤖 این خبر توسط سیستم هوش مصنوعی پیشرفته کافه شمس تحلیل شده است. برای دریافت جزئیات کامل به لینک مراجعه کنید."
 
-def analyze_news_category(title):
-    """تحلیل دسته‌بندی خبر"""
-    title_lower = title.lower()
-    
-    political_keywords = ['سیاست', 'وزیر', 'رئیس', 'پارلمان', 'مجلس', 'انتخابات', 'حکومت', 'دولت', 'وزارت', 'توافق', 'مذاکره', 'سفیر', 'کنسولگری', 'دیپلماسی']
-    economic_keywords = ['اقتصاد', 'بازار', 'تجارت', 'صادرات', 'واردات', 'ارز', 'دلار', 'بورس', 'نفت', 'گاز', 'سرمایه', 'بانک', 'تورم', 'رشد اقتصادی', 'سرمایه‌گذاری']
-    international_keywords = ['بین‌المللی', 'جهانی', 'آمریکا', 'اروپا', 'چین', 'روسیه', 'کشور', 'ملل', 'سازمان ملل', 'ناتو', 'اتحادیه اروپا', 'آسیا']
-    social_keywords = ['اجتماعی', 'فرهنگ', 'آموزش', 'دانشگاه', 'بهداشت', 'درمان', 'ورزش', 'جوانان', 'زنان', 'خانواده', 'جامعه']
-    tech_keywords = ['فناوری', 'تکنولوژی', 'دیجیتال', 'اینترنت', 'کامپیوتر', 'هوش مصنوعی', 'رباتیک', 'نرم‌افزار', 'اپلیکیشن', 'وب‌سایت']
-    
-    if any(keyword in title_lower for keyword in political_keywords):
-        return "political"
-    elif any(keyword in title_lower for keyword in economic_keywords):
-        return "economic"
-    elif any(keyword in title_lower for keyword in international_keywords):
-        return "international"
-    elif any(keyword in title_lower for keyword in social_keywords):
-        return "social"
-    elif any(keyword in title_lower for keyword in tech_keywords):
-        return "technology"
-    else:
-        return "general"
-
-def calculate_importance_score(title, source):
-    """محاسبه نمره اهمیت خبر"""
+def calculate_importance_score(title, source, keywords=None):
+    """محاسبه نمره اهمیت خبر؛ keywords نتیجه analyze یا analyze_batch اگر از قبل محاسبه شده باشد"""
     score = 50  # نمره پایه
     
-    # امتیاز بر اساس منبع
-    source_scores = {
-        'مهر': 85, 'فارس': 90, 'ایرنا': 95, 'تسنیم': 80,
-        'BBC World': 95, 'CNN': 90, 'The Guardian': 90, 'Reuters': 95,
-        'Al Jazeera': 85, 'AP News': 90
-    }
-    
-    if source in source_scores:
-        score += (source_scores[source] - 50) * 0.3
+    # امتیاز بر اساس منبع (امتیاز 50 یعنی بدون تأثیر)
+    registered = source_registry.get(source)
+    if registered is not None:
+        score += (registered.score - 50) * 0.3
     
     # امتیاز بر اساس کلمات کلیدی مهم
-    important_keywords = ['فوری', 'مهم', 'بحران', 'تاریخی', 'بی‌سابقه', 'breaking', 'urgent', 'crisis']
-    title_lower = title.lower()
-    
-    for keyword in important_keywords:
-        if keyword in title_lower:
-            score += 15
+    keywords = keywords or keyword_engine.analyze(title)
+    score += keywords.important * keyword_engine.important_weight
     
     # امتیاز بر اساس طول عنوان (عناوین طولانی‌تر معمولاً مفصل‌تر هستند)
     if len(title) > 100:
@@ -781,29 +1023,44 @@ def get_importance_text(score):
     else:
         return "📝 سطح اهمیت: متوسط | این خبر توسط هوش مصنوعی به عنوان اطلاعات عمومی طبقه‌بندی شده است."
 
+def cached_translation(text):
+    """ترجمه موجود در کش بدون درخواست شبکه؛ None اگر وجود نداشته باشد"""
+    try:
+        return translation_cache.get(text.strip()[:300], "en|fa")
+    except Exception as e:
+        logging.error(f"Translation cache error: {e}")
+        return None
+
 async def translate_text(text):
+    """ترجمه انگلیسی به فارسی از کش یا MyMemory"""
     try:
-        import aiohttp
-        
         text_clean = text.strip()[:300]
+        return await translation_cache.get_or_fetch(text_clean, "en|fa", translation_batcher.translate)
+    except Exception as e:
+        logging.error(f"Translation error: {e}")
+        return None
+
+async def fetch_translation(text_clean):
+    try:
+        import aiohttp
         
         try:
-            async with aiohttp.ClientSession() as session:
-                url = "https://api.mymemory.translated.net/get"
-                params = {
-                    'q': text_clean,
-                    'langpair': 'en|fa'
-                }
-                
-                timeout = aiohttp.ClientTimeout(total=8)
-                async with session.get(url, params=params, timeout=timeout) as response:
-                    if response.status == 200:
-                        result = await response.json()
-                        if result and 'responseData' in result:
-                            translated = result['responseData']['translatedText']
-                            if translated and len(translated) > 5 and translated != text_clean:
-                                logging.info(f"✅ ترجمه موفق: {text_clean[:30]}... → {translated[:30]}...")
-                                return translated
+            session = get_session()
+            url = TRANSLATION_API_URL
+            params = {
+                'q': text_clean,
+                'langpair': 'en|fa'
+            }
+            
+            timeout = aiohttp.ClientTimeout(total=8)
+            async with session.get(url, params=params, timeout=timeout) as response:
+                if response.status == 200:
+                    result = await response.json()
+                    if result and 'responseData' in result:
+                        translated = result['responseData']['translatedText']
+                        if translated and len(translated) > 5 and translated != text_clean:
+                            logging.info(f"✅ ترجمه موفق: {text_clean[:30]}... → {translated[:30]}...")
+                            return translated
         except Exception as e:
             logging.warning(f"⚠️ خطا در ترجمه روش 1: {e}")
         
@@ -815,11 +1072,22 @@ async def translate_text(text):
         return None
 
 async def send_report(bot, stats, total_news_sent, sent_news_list):
+    global last_report_at
+    
+    # چرخه‌های کوچک بدون خبر جدید فقط با فاصله حداقلی گزارش می‌شوند
+    if total_news_sent == 0 and time.time() - last_report_at < REPORT_MIN_INTERVAL:
+        return
+    
     try:
         total_sources = len(stats)
         total_got = sum(s["got"] for s in stats)
         total_sent = sum(s["sent"] for s in stats)
         total_err = sum(s["err"] for s in stats)
+        total_kb = sum(s.get("bytes", 0) for s in stats) / 1024
+        total_304 = sum(1 for s in stats if s.get("not_modified"))
+        total_fallback = sum(1 for s in stats if s.get("fallback"))
+        total_open = sum(1 for s in stats if s.get("circuit_open"))
+        health = source_health.snapshot()
         
         lines = [
             "📊 News Collection Report",
@@ -827,34 +1095,31 @@ async def send_report(bot, stats, total_news_sent, sent_news_list):
             f"📰 Total news found: {total_got}",
             f"✅ Total sent: {total_sent}",
             f"❌ Total errors: {total_err}",
+            f"📦 Transferred: {total_kb:.1f} KB",
+            f"💤 Not modified (304): {total_304}/{total_sources}",
+            f"🕸️ HTML fallback used: {total_fallback}",
+            f"⛔ Skipped (circuit open): {total_open}",
             "",
-            "Source              Found  Sent  Err",
-            "─────────────────── ─────  ────  ───"
+            "Source              Found  Sent  Err     KB  304  Health",
+            "─────────────────── ─────  ────  ───  ─────  ───  ──────"
         ]
         
         for r in stats:
-            src_name = r["src"]
-            src_name_en = {
-                "مهر": "Mehr News",
-                "فارس": "Fars News", 
-                "تسنیم": "Tasnim News",
-                "ایرنا": "IRNA",
-                "ایسنا": "ISNA",
-                "همشهری آنلاین": "Hamshahri Online",
-                "خبر آنلاین": "Khabar Online",
-                "مشرق": "Mashregh News",
-                "انتخاب": "Entekhab News",
-                "جماران": "Jamaran",
-                "آخرین خبر": "Akharin Khabar",
-                "هم‌میهن": "HamMihan",
-                "اعتماد": "Etemad",
-                "اصلاحات": "Eslahat News"
-            }.get(src_name, src_name)
-            
-            if len(src_name_en) > 18:
-                src_name_en = src_name_en[:15] + "..."
+            source = source_registry.get(r["src"])
+            src_name_en = source.label if source else r["src"][:18]
             
-            lines.append(f"{src_name_en:<19} {r['got']:>5}  {r['sent']:>4}  {r['err']:>3}")
+            kb = r.get("bytes", 0) / 1024
+            hit_304 = "✓" if r.get("not_modified") else "-"
+            source_health_state = health.get(r["src"], {})
+            score = source_health_state.get("score")
+            score_text = "-" if score is None else str(score)
+            if source_health_state.get("state") == "open":
+                score_text = "⛔ " + score_text
+            elif source_health_state.get("state") == "half_open":
+                score_text = "🩺 " + score_text
+            lines.append(
+                f"{src_name_en:<19} {r['got']:>5}  {r['sent']:>4}  {r['err']:>3}  {kb:>5.0f}  {hit_304:>3}  {score_text:>6}"
+            )
         
         lines.append("")
         if total_news_sent > 0:
@@ -862,48 +1127,48 @@ async def send_report(bot, stats, total_news_sent, sent_news_list):
         else:
             lines.append("ℹ️ No new news found in this cycle")
         
-        lines.append("⏰ Next cycle in 3 minutes...")
+        next_due = source_scheduler.next_due()
+        if next_due:
+            lines.append(f"⏰ Next check in {max(0, int(next_due - time.time()))} seconds...")
         
         report = "<pre>" + "\n".join(lines) + "</pre>"
         
-        await bot.send_message(
-            chat_id=EDITORS_CHAT_ID,
-            text=report,
-            parse_mode="HTML"
-        )
+        await send_queue.send(bot, EDITORS_CHAT_ID, report, parse_mode="HTML")
         
+        last_report_at = time.time()
         logging.info("📑 گزارش جامع ارسال شد")
         
     except Exception as e:
         logging.error(f"خطا در ارسال گزارش: {e}")
 
-def calculate_similarity(str1, str2):
-    """محاسبه شباهت بین دو رشته"""
-    try:
-        str1 = re.sub(r'[^\w\s]', '', str1.lower())
-        str2 = re.sub(r'[^\w\s]', '', str2.lower())
-        
-        words1 = set(str1.split())
-        words2 = set(str2.split())
-        
-        if not words1 or not words2:
-            return 0
-        
-        intersection = words1.intersection(words2)
-        union = words1.union(words2)
-        
-        return len(intersection) / len(union)
-    except:
-        return 0
-
 if __name__ == "__main__":
     logging.info(f"🚀 Cafe Shams News Bot starting on port {PORT}")
     
     load_sent_news()
+    load_feed_state()
+    translation_cache.open()
+    feed_parsing.warm_up()
+    # سرور HTTP اول بسته می‌شود تا درخواستی پس از بسته شدن کلاینت‌ها اجرا نشود
+    runtime.add_shutdown_hook(stop_web_server)
+    runtime.add_shutdown_hook(stop_auto_worker)
+    runtime.add_shutdown_hook(job_manager.shutdown)
+    runtime.add_shutdown_hook(flush_pending_digest)
+    runtime.add_shutdown_hook(send_queue.close)
+    runtime.add_shutdown_hook(feed_parsing.shutdown)
+    runtime.add_shutdown_hook(coordinator.close)
+    runtime.start()
     
-    logging.info("🔄 Auto-starting news collection...")
-    auto_news_running = True
-    auto_thread = threading.Thread(target=auto_news_worker, daemon=True)
-    auto_thread.start()
+    stop_requested = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: stop_requested.set())
     
-    flask_app.run(host="0.0.0.0", port=PORT, debug=False)
+    try:
+        runtime.run(start_web_server())
+        
+        logging.info("🔄 Auto-starting news collection...")
+        runtime.get_loop().call_soon_threadsafe(start_auto_worker)
+        
+        stop_requested.wait()
+        logging.info("🛑 درخواست توقف دریافت شد")
+    finally:
+        runtime.stop()
@@ -0,0 +1,271 @@
+import time
+import bisect
+import threading
+
+# مرزهای پیش‌فرض هیستوگرام زمان (ثانیه)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """پایه متریک‌های دارای برچسب؛ هر ترکیب برچسب یک child جدا دارد"""
+
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        """child مربوط به مقادیر برچسب؛ پس از اولین فراخوانی فقط یک جستجوی dict است"""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _samples(self):
+        raise NotImplementedError
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        self._children[()].inc(amount)
+
+    def total(self):
+        """جمع مقدار همه برچسب‌ها"""
+        return sum(child.value for child in list(self._children.values()))
+
+    def _samples(self):
+        for values, child in list(self._children.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}"
+
+
+class _GaugeChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def set(self, value):
+        self.value = value
+
+
+class Gauge(_Metric):
+    """مقدار لحظه‌ای؛ با function مقدار هنگام خروجی گرفتن خوانده می‌شود"""
+
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=(), function=None):
+        self.function = function
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value):
+        self._children[()].set(value)
+
+    def set_function(self, function):
+        self.function = function
+
+    def _samples(self):
+        if self.function is not None:
+            yield f"{self.name} {_format_value(self.function())}"
+            return
+        for values, child in list(self._children.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}"
+
+
+class _Timer:
+    __slots__ = ("child", "start")
+
+    def __init__(self, child):
+        self.child = child
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.child.observe(time.perf_counter() - self.start)
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        # فقط یک جستجوی دودویی و سه جمع؛ تجمع شمارش‌ها هنگام خروجی انجام می‌شود
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def time(self):
+        return _Timer(self)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.bounds = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.bounds)
+
+    def observe(self, value):
+        self._children[()].observe(value)
+
+    def time(self):
+        return self._children[()].time()
+
+    def totals(self):
+        """(جمع زمان‌ها، تعداد مشاهده‌ها) روی همه برچسب‌ها"""
+        children = list(self._children.values())
+        return sum(child.sum for child in children), sum(child.count for child in children)
+
+    def _samples(self):
+        for values, child in list(self._children.items()):
+            cumulative = 0
+            for bound, count in zip(self.bounds + (float("inf"),), list(child.counts)):
+                cumulative += count
+                le = f'le="{_format_value(float(bound))}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, values, le)} {cumulative}"
+            labels = _format_labels(self.labelnames, values)
+            yield f"{self.name}_sum{labels} {_format_value(child.sum)}"
+            yield f"{self.name}_count{labels} {child.count}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        """خروجی متنی قالب Prometheus برای همه متریک‌ها"""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+# زمان مراحل چرخه خبرگیری
+FETCH_SECONDS = registry.register(Histogram(
+    "news_fetch_seconds", "Feed download time per source", ["source"]
+))
+PARSE_SECONDS = registry.register(Histogram(
+    "news_parse_seconds", "Feed parse time per source", ["source"]
+))
+DEDUP_SECONDS = registry.register(Histogram(
+    "news_dedup_seconds", "Duplicate check time per entry",
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.1)
+))
+TRANSLATE_SECONDS = registry.register(Histogram(
+    "news_translate_seconds", "Title and summary translation time per news item"
+))
+SEND_SECONDS = registry.register(Histogram(
+    "telegram_send_seconds", "Telegram sendMessage call time"
+))
+
+# شمارنده‌ها
+ENTRIES_SEEN = registry.register(Counter(
+    "news_entries_seen_total", "Feed entries checked for duplicates", ["source"]
+))
+DUPLICATES = registry.register(Counter(
+    "news_duplicates_total", "Entries skipped as duplicates", ["kind"]
+))
+SENT = registry.register(Counter(
+    "news_sent_total", "News messages delivered to Telegram", ["source"]
+))
+ERRORS = registry.register(Counter(
+    "news_errors_total", "Errors by pipeline stage", ["stage"]
+))
+RATE_LIMITED = registry.register(Counter(
+    "telegram_rate_limited_total", "Telegram 429 RetryAfter responses"
+))
+TRANSLATION_FALLBACKS = registry.register(Counter(
+    "translation_fallbacks_total", "Titles or summaries sent untranslated"
+))
+DIGEST_ITEMS = registry.register(Counter(
+    "news_digest_items_total", "Low-importance items bundled into digest messages"
+))
+DIGEST_MESSAGES = registry.register(Counter(
+    "news_digest_messages_total", "Digest messages queued for Telegram"
+))
+JOBS = registry.register(Counter(
+    "news_jobs_total", "Finished news cycle jobs", ["kind", "status"]
+))
+JOBS_COALESCED = registry.register(Counter(
+    "news_jobs_coalesced_total", "Cycle requests merged into a running or queued job"
+))
+
+# مقادیر لحظه‌ای
+CYCLE_SECONDS = registry.register(Gauge(
+    "news_cycle_duration_seconds", "Wall time of the last news cycle"
+))
+DEDUP_STORE_SIZE = registry.register(Gauge(
+    "news_dedup_store_size", "Digests in the sent-news index"
+))
+QUEUE_DEPTH = registry.register(Gauge(
+    "telegram_send_queue_depth", "Messages waiting in the Telegram send queue"
+))
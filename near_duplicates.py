@@ -0,0 +1,151 @@
+import re
+import zlib
+import random
+import threading
+import unicodedata
+from array import array
+
+# پارامترهای پیش‌فرض MinHash
+DEFAULT_PERMUTATIONS = 64
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+# جفت‌کلمه‌ها ترتیب را هم می‌سنجند؛ با تک‌کلمه «ایران و آمریکا ...» و «آمریکا و ایران ...» یکسان بودند
+SHINGLE_SIZE = 2
+
+# یکسان‌سازی نویسه‌های عربی/فارسی
+CHAR_MAP = str.maketrans({
+    "ي": "ی", "ى": "ی", "ئ": "ی",
+    "ك": "ک",
+    "ة": "ه", "ۀ": "ه",
+    "أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا",
+    "ؤ": "و",
+    "\u200c": " ", "\u200d": "", "\u200f": "", "\u200e": "", "\u0640": "",
+    "۰": "0", "۱": "1", "۲": "2", "۳": "3", "۴": "4",
+    "۵": "5", "۶": "6", "۷": "7", "۸": "8", "۹": "9",
+    "٠": "0", "١": "1", "٢": "2", "٣": "3", "٤": "4",
+    "٥": "5", "٦": "6", "٧": "7", "٨": "8", "٩": "9",
+})
+DIACRITICS_RE = re.compile("[\u064B-\u065F\u0670\u06D6-\u06ED]")
+NON_WORD_RE = re.compile(r"[^\w\s]|_")
+
+
+def normalize_title(text):
+    """یکسان‌سازی عنوان برای مقایسه: ی/ک عربی، نیم‌فاصله، اعراب، ارقام و علائم"""
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    text = DIACRITICS_RE.sub("", text.translate(CHAR_MAP))
+    return " ".join(NON_WORD_RE.sub(" ", text).split())
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    """مجموعه دنباله‌های size کلمه‌ای پشت سر هم عنوان یکسان‌سازی شده؛ عنوان کوتاه‌تر یک shingle است"""
+    words = normalize_title(text).split()
+    if len(words) <= size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def _choose_bands(num_perm, threshold, recall=0.95):
+    """بیشترین تعداد سطر در هر باند LSH که عنوان‌های هم‌آستانه را با احتمال recall پیدا کند"""
+    best = (num_perm, 1)
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        if 1 - (1 - threshold ** rows) ** bands >= recall:
+            best = (bands, rows)
+    return best
+
+
+class NearDuplicateIndex:
+    """تشخیص عنوان‌های مشابه با MinHash و LSH؛ هر جستجو تقریباً O(1)"""
+
+    def __init__(self, threshold=0.8, num_perm=DEFAULT_PERMUTATIONS, seed=1):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands, self.rows = _choose_bands(num_perm, threshold)
+
+        rng = random.Random(seed)
+        self._perms = [
+            (rng.randrange(1, MERSENNE_PRIME), rng.randrange(0, MERSENNE_PRIME))
+            for _ in range(num_perm)
+        ]
+        self._lock = threading.Lock()
+        self._buckets = [{} for _ in range(self.bands)]
+        self._signatures = {}
+
+    def __len__(self):
+        return len(self._signatures)
+
+    def signature(self, title):
+        """امضای MinHash عنوان (None اگر عنوان کلمه‌ای نداشته باشد)"""
+        tokens = shingles(title)
+        if not tokens:
+            return None
+
+        hashes = [zlib.crc32(token.encode("utf-8")) for token in tokens]
+        values = array("Q")
+        for a, b in self._perms:
+            values.append(min(((a * h + b) % MERSENNE_PRIME) & MAX_HASH for h in hashes))
+        return values
+
+    def _band_keys(self, signature):
+        for band in range(self.bands):
+            start = band * self.rows
+            yield band, tuple(signature[start:start + self.rows])
+
+    @staticmethod
+    def similarity(sig1, sig2):
+        """تخمین شباهت Jaccard از روی دو امضا"""
+        return sum(1 for x, y in zip(sig1, sig2) if x == y) / len(sig1)
+
+    def find(self, signature):
+        """کلید نزدیک‌ترین مورد مشابه‌تر از threshold یا None"""
+        if signature is None:
+            return None
+
+        with self._lock:
+            candidates = set()
+            for band, key in self._band_keys(signature):
+                candidates.update(self._buckets[band].get(key, ()))
+
+            best_key, best_score = None, self.threshold
+            for candidate in candidates:
+                score = self.similarity(signature, self._signatures[candidate][0])
+                if score >= best_score:
+                    best_key, best_score = candidate, score
+        return best_key
+
+    def add(self, key, signature, timestamp=0):
+        if signature is None:
+            return
+        with self._lock:
+            self._signatures[key] = (signature, timestamp)
+            for band, band_key in self._band_keys(signature):
+                self._buckets[band].setdefault(band_key, set()).add(key)
+
+    def prune(self, older_than):
+        """حذف امضاهای قدیمی‌تر از older_than"""
+        with self._lock:
+            expired = [key for key, (_, ts) in self._signatures.items() if ts < older_than]
+            for key in expired:
+                signature, _ = self._signatures.pop(key)
+                for band, band_key in self._band_keys(signature):
+                    bucket = self._buckets[band].get(band_key)
+                    if bucket:
+                        bucket.discard(key)
+                        if not bucket:
+                            del self._buckets[band][band_key]
+        return len(expired)
+
+    def clear(self):
+        with self._lock:
+            self._buckets = [{} for _ in range(self.bands)]
+            self._signatures = {}
+
+    def dump_signature(self, signature):
+        return signature.tobytes() if signature is not None else None
+
+    def load_signature(self, blob):
+        values = array("Q")
+        values.frombytes(blob)
+        return values if len(values) == self.num_perm else None
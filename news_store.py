@@ -0,0 +1,128 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+from digest_index import to_digest
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sent_news (
+    id INTEGER PRIMARY KEY,
+    source TEXT NOT NULL,
+    title TEXT NOT NULL,
+    link TEXT NOT NULL,
+    digest BLOB NOT NULL UNIQUE,
+    sent_at INTEGER NOT NULL,
+    signature BLOB
+);
+CREATE INDEX IF NOT EXISTS idx_sent_news_sent_at ON sent_news (sent_at);
+"""
+
+TRACKING_PARAMS = ("utm_", "fbclid", "gclid", "at_medium", "at_campaign", "ocid")
+
+
+def canonical_link(link):
+    """لینک یکسان برای یک خبر: بدون پارامترهای ردیابی، fragment و &amp;"""
+    link = (link or "").strip().replace('&amp;', '&')
+    try:
+        parts = urlsplit(link)
+    except ValueError:
+        return link
+    query = [(key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+             if not key.lower().startswith(TRACKING_PARAMS)]
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path, urlencode(query), ""))
+
+
+class NewsStore:
+    """تاریخچه خبرهای ارسال شده در SQLite؛ هر ارسال یک ردیف و یک تراکنش"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def open(self):
+        with self._lock:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(sent_news)")}
+            if "signature" not in columns:
+                self._conn.execute("ALTER TABLE sent_news ADD COLUMN signature BLOB")
+            # جستجو با digest انجام می‌شود؛ نمایه لینک نسخه‌های قبلی فقط هزینه نوشتن داشت
+            self._conn.execute("DROP INDEX IF EXISTS idx_sent_news_link")
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def record_sent(self, source, title, link, digest, sent_at=None, signature=None):
+        """ثبت یک خبر ارسال شده همراه با امضای MinHash عنوان"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO sent_news (source, title, link, digest, sent_at, signature) VALUES (?, ?, ?, ?, ?, ?)",
+                (source, title, canonical_link(link), to_digest(digest), int(sent_at or time.time()), signature)
+            )
+
+    def count(self, since=None):
+        with self._lock:
+            if since is None:
+                row = self._conn.execute("SELECT COUNT(*) FROM sent_news").fetchone()
+            else:
+                row = self._conn.execute(
+                    "SELECT COUNT(*) FROM sent_news WHERE sent_at >= ?", (int(since),)
+                ).fetchone()
+        return row[0]
+
+    def digests_since(self, since):
+        """digest و زمان ارسال ردیف‌های جدیدتر از since"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT digest, sent_at FROM sent_news WHERE sent_at >= ?", (int(since),)
+            ).fetchall()
+
+    def signatures_since(self, since):
+        """digest، امضای عنوان و زمان ارسال ردیف‌های جدیدتر از since"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT digest, signature, sent_at FROM sent_news WHERE sent_at >= ? AND signature IS NOT NULL",
+                (int(since),)
+            ).fetchall()
+
+    def prune(self, older_than):
+        """حذف ردیف‌های قدیمی‌تر از older_than (ثانیه یونیکس)"""
+        with self._lock, self._conn:
+            cursor = self._conn.execute("DELETE FROM sent_news WHERE sent_at < ?", (int(older_than),))
+        return cursor.rowcount
+
+    def clear(self):
+        with self._lock, self._conn:
+            cursor = self._conn.execute("DELETE FROM sent_news")
+        logging.info(f"🧹 {cursor.rowcount} ردیف از تاریخچه ارسال حذف شد")
+        return cursor.rowcount
+
+    def migrate_json(self, json_path):
+        """مهاجرت یک‌باره هش‌های sent_news.json قدیمی به پایگاه داده"""
+        if not os.path.exists(json_path):
+            return 0
+
+        with open(json_path, "r", encoding="utf-8") as f:
+            hashes = json.load(f)
+
+        now = int(time.time())
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO sent_news (source, title, link, digest, sent_at) VALUES ('', '', '', ?, ?)",
+                ((to_digest(news_hash), now) for news_hash in hashes)
+            )
+
+        os.replace(json_path, json_path + ".migrated")
+        logging.info(f"📦 مهاجرت {len(hashes)} هش از {json_path} به پایگاه داده")
+        return len(hashes)
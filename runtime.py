@@ -0,0 +1,88 @@
+import os
+import asyncio
+import logging
+import threading
+import concurrent.futures
+
+import http_client
+
+# مهلت پیش‌فرض برای فراخوانی‌های کوتاه از رشته‌های همگام
+RUNTIME_TIMEOUT = int(os.getenv("RUNTIME_TIMEOUT", "30"))
+
+_loop = None
+_thread = None
+_lock = threading.Lock()
+_shutdown_hooks = []
+
+
+def add_shutdown_hook(hook):
+    """ثبت coroutine function برای اجرا روی loop پیش از بسته شدن کلاینت‌ها"""
+    _shutdown_hooks.append(hook)
+
+
+def start():
+    """راه‌اندازی event loop پس‌زمینه برنامه (فقط یک بار)"""
+    global _loop, _thread
+
+    with _lock:
+        if _loop is not None:
+            return _loop
+
+        loop = asyncio.new_event_loop()
+        ready = threading.Event()
+
+        def run_loop():
+            asyncio.set_event_loop(loop)
+            loop.call_soon(ready.set)
+            loop.run_forever()
+
+        _thread = threading.Thread(target=run_loop, name="asyncio-runtime", daemon=True)
+        _thread.start()
+        ready.wait()
+        _loop = loop
+
+    asyncio.run_coroutine_threadsafe(http_client.startup(), _loop).result(RUNTIME_TIMEOUT)
+    logging.info("🔁 event loop مشترک برنامه راه‌اندازی شد")
+    return _loop
+
+
+def get_loop():
+    return _loop if _loop is not None else start()
+
+
+def submit(coro):
+    """ارسال coroutine به loop مشترک بدون انتظار؛ concurrent Future برمی‌گرداند"""
+    return asyncio.run_coroutine_threadsafe(coro, get_loop())
+
+
+def run(coro, timeout=RUNTIME_TIMEOUT):
+    """اجرای coroutine روی loop مشترک از یک رشته همگام و انتظار برای نتیجه"""
+    future = submit(coro)
+    try:
+        return future.result(timeout)
+    except concurrent.futures.TimeoutError:
+        future.cancel()
+        raise TimeoutError(f"operation did not finish within {timeout}s")
+
+
+def stop():
+    """بستن کلاینت‌های مشترک و توقف loop"""
+    global _loop, _thread
+
+    with _lock:
+        loop, thread = _loop, _thread
+        _loop = _thread = None
+
+    if loop is None:
+        return
+
+    for hook in [*_shutdown_hooks, http_client.shutdown]:
+        try:
+            asyncio.run_coroutine_threadsafe(hook(), loop).result(RUNTIME_TIMEOUT)
+        except Exception as e:
+            logging.warning(f"⚠️ خطا در بستن {getattr(hook, '__qualname__', hook)}: {e}")
+
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(RUNTIME_TIMEOUT)
+    loop.close()
+    logging.info("🛑 event loop مشترک متوقف شد")
@@ -0,0 +1,116 @@
+import time
+import heapq
+import threading
+
+
+class SourceScheduler:
+    """زمان‌بندی تطبیقی منابع با صف اولویت زمان سررسید
+
+    بازه هر منبع از نرخ انتشار مشاهده شده (میانگین نمایی خبر جدید در دقیقه) محاسبه می‌شود
+    و پاسخ‌های 304 یا بدون خبر جدید، بازه را تا سقف max_interval افزایش می‌دهند.
+    """
+
+    def __init__(self, names, min_interval=60, max_interval=1800, default_interval=180,
+                 target_items=2, smoothing=0.3, backoff=1.5):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.default_interval = default_interval
+        self.target_items = target_items
+        self.smoothing = smoothing
+        self.backoff = backoff
+        self._lock = threading.Lock()
+        self._heap = []
+        self._state = {}
+        self._version = {}
+
+        now = time.time()
+        for name in names:
+            self._state[name] = {"interval": default_interval, "rate": None, "last_checked": None}
+            self._push(name, now)
+
+    def _push(self, name, due):
+        version = self._version.get(name, 0) + 1
+        self._version[name] = version
+        heapq.heappush(self._heap, (due, name, version))
+
+    def _clamp(self, interval):
+        return max(self.min_interval, min(self.max_interval, interval))
+
+    def sync(self, names):
+        """همگام‌سازی با فهرست جدید منابع: منابع تازه فوراً سررسید می‌شوند و حذف شده‌ها کنار می‌روند"""
+        now = time.time()
+        names = set(names)
+        with self._lock:
+            for name in names - self._state.keys():
+                self._state[name] = {"interval": self.default_interval, "rate": None, "last_checked": None}
+                self._push(name, now)
+            for name in self._state.keys() - names:
+                # افزایش نسخه بدون ورودی جدید؛ ورودی‌های مانده در heap نادیده گرفته می‌شوند
+                del self._state[name]
+                self._version[name] = self._version.get(name, 0) + 1
+
+    def next_due(self):
+        """زمان نزدیک‌ترین سررسید (None اگر صف خالی باشد)"""
+        with self._lock:
+            while self._heap and self._heap[0][2] != self._version.get(self._heap[0][1]):
+                heapq.heappop(self._heap)
+            return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now=None, window=0):
+        """برداشتن همه منابعی که تا now + window سررسید دارند"""
+        now = now or time.time()
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now + window:
+                _, name, version = heapq.heappop(self._heap)
+                if version == self._version.get(name) and name not in due:
+                    due.append(name)
+            # سررسید موقت تا اگر چرخه بدون record تمام شد، منبع از صف حذف نشود
+            for name in due:
+                self._push(name, now + self._state[name]["interval"])
+        return due
+
+    def record(self, name, new_items=0, not_modified=False, error=False, backlog=0):
+        """ثبت نتیجه بررسی یک منبع و محاسبه سررسید بعدی؛ backlog خبرهای جدید منتقل شده به چرخه بعد"""
+        now = time.time()
+        with self._lock:
+            state = self._state.get(name)
+            if state is None:
+                # منبع در حین چرخه از فهرست حذف شده است
+                return
+            elapsed = now - state["last_checked"] if state["last_checked"] else state["interval"]
+            # بررسی‌های دستی پشت سر هم نباید نرخ انتشار را غیرواقعی بالا ببرند
+            elapsed = max(elapsed, self.min_interval)
+            state["last_checked"] = now
+
+            if error:
+                interval = state["interval"] * 2
+            else:
+                observed = (0 if not_modified else new_items) / max(elapsed / 60, 1e-6)
+                if state["rate"] is None:
+                    state["rate"] = observed
+                else:
+                    state["rate"] = self.smoothing * observed + (1 - self.smoothing) * state["rate"]
+
+                if new_items and not not_modified:
+                    interval = self.target_items / state["rate"] * 60
+                elif state["rate"] > 0:
+                    interval = max(state["interval"] * self.backoff, self.target_items / state["rate"] * 60)
+                else:
+                    interval = state["interval"] * self.backoff
+
+            state["interval"] = self._clamp(interval)
+            # خبرهای مانده از سقف چرخه منتظر بازه تطبیقی نمی‌مانند؛ خود بازه تغییر نمی‌کند
+            delay = self.min_interval if backlog and not error else state["interval"]
+            self._push(name, now + delay)
+
+    def snapshot(self):
+        """بازه فعلی و نرخ انتشار هر منبع برای گزارش"""
+        with self._lock:
+            return {
+                name: {
+                    "interval": round(state["interval"]),
+                    "rate_per_hour": round((state["rate"] or 0) * 60, 2)
+                }
+                for name, state in self._state.items()
+            }
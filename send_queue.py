@@ -0,0 +1,156 @@
+import os
+import time
+import random
+import asyncio
+import logging
+
+from telegram.error import BadRequest, NetworkError, RetryAfter
+
+import metrics
+
+# محدودیت‌های تلگرام: حدود ۳۰ پیام در ثانیه در کل، ۲۰ پیام در دقیقه برای هر گروه/کانال
+TELEGRAM_GLOBAL_RATE = float(os.getenv("TELEGRAM_GLOBAL_RATE", "25"))
+TELEGRAM_GROUP_RATE_PER_MIN = float(os.getenv("TELEGRAM_GROUP_RATE_PER_MIN", "20"))
+TELEGRAM_PRIVATE_RATE = float(os.getenv("TELEGRAM_PRIVATE_RATE", "1"))
+TELEGRAM_GROUP_BURST = int(os.getenv("TELEGRAM_GROUP_BURST", "3"))
+SEND_MAX_RETRIES = int(os.getenv("SEND_MAX_RETRIES", "4"))
+SEND_BACKOFF_BASE = float(os.getenv("SEND_BACKOFF_BASE", "1.0"))
+
+
+class TokenBucket:
+    """محدودکننده نرخ token bucket"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        """انتظار تا آزاد شدن یک توکن و مصرف آن"""
+        while True:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def _retry_after_seconds(error):
+    retry_after = error.retry_after
+    return retry_after.total_seconds() if hasattr(retry_after, "total_seconds") else float(retry_after)
+
+
+class SendQueue:
+    """صف ارسال پیام تلگرام با محدودیت نرخ برای هر چت و کل ربات
+
+    هر چت صف و worker مستقل خود را دارد تا RetryAfter یک چت، چت‌های دیگر را متوقف نکند.
+    """
+
+    def __init__(self):
+        self.global_bucket = TokenBucket(TELEGRAM_GLOBAL_RATE, max(1, int(TELEGRAM_GLOBAL_RATE)))
+        self._queues = {}
+        self._buckets = {}
+        self._workers = {}
+        self._paused_until = {}
+        self.counters = {"sent": 0, "failed": 0, "retried": 0, "rate_limited": 0}
+
+    def _bucket_for(self, chat_id):
+        if chat_id not in self._buckets:
+            if int(chat_id) < 0:
+                bucket = TokenBucket(TELEGRAM_GROUP_RATE_PER_MIN / 60, TELEGRAM_GROUP_BURST)
+            else:
+                bucket = TokenBucket(TELEGRAM_PRIVATE_RATE, 1)
+            self._buckets[chat_id] = bucket
+        return self._buckets[chat_id]
+
+    def enqueue(self, bot, chat_id, text, **kwargs):
+        """افزودن پیام به صف بدون انتظار؛ Future نتیجه (Message) را برمی‌گرداند"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        queue = self._queues.get(chat_id)
+        if queue is None:
+            queue = self._queues[chat_id] = asyncio.Queue()
+        queue.put_nowait((bot, text, kwargs, future))
+
+        worker = self._workers.get(chat_id)
+        if worker is None or worker.done():
+            self._workers[chat_id] = loop.create_task(self._worker(chat_id, queue))
+        return future
+
+    async def send(self, bot, chat_id, text, **kwargs):
+        """ارسال از طریق صف و انتظار برای نتیجه"""
+        return await self.enqueue(bot, chat_id, text, **kwargs)
+
+    def depth(self):
+        return sum(queue.qsize() for queue in self._queues.values())
+
+    async def _worker(self, chat_id, queue):
+        bucket = self._bucket_for(chat_id)
+        while True:
+            bot, text, kwargs, future = await queue.get()
+            try:
+                if future.cancelled():
+                    continue
+                result = await self._deliver(bot, chat_id, bucket, text, kwargs, future)
+                if future.cancelled():
+                    continue
+                if not future.done():
+                    future.set_result(result)
+                self.counters["sent"] += 1
+            except asyncio.CancelledError:
+                if not future.done():
+                    future.cancel()
+                raise
+            except Exception as e:
+                self.counters["failed"] += 1
+                if not future.done():
+                    future.set_exception(e)
+            finally:
+                queue.task_done()
+
+    async def _deliver(self, bot, chat_id, bucket, text, kwargs, future):
+        attempt = 0
+        while True:
+            paused = self._paused_until.get(chat_id, 0) - time.monotonic()
+            if paused > 0:
+                await asyncio.sleep(paused)
+
+            await bucket.acquire()
+            await self.global_bucket.acquire()
+            # فرستنده ممکن است هنگام انتظار برای نوبت ارسال پیام را لغو کرده باشد
+            if future.cancelled():
+                return None
+
+            try:
+                with metrics.SEND_SECONDS.time():
+                    return await bot.send_message(chat_id=chat_id, text=text, **kwargs)
+            except RetryAfter as e:
+                # فقط همین چت متوقف می‌شود؛ RetryAfter جزو تلاش‌های مجدد شمرده نمی‌شود
+                wait = _retry_after_seconds(e)
+                self.counters["rate_limited"] += 1
+                metrics.RATE_LIMITED.inc()
+                self._paused_until[chat_id] = time.monotonic() + wait
+                logging.warning(f"⏳ محدودیت نرخ تلگرام برای {chat_id}: توقف {wait:.0f} ثانیه")
+            except BadRequest:
+                raise
+            except NetworkError as e:
+                attempt += 1
+                if attempt > SEND_MAX_RETRIES:
+                    raise
+                delay = SEND_BACKOFF_BASE * (2 ** (attempt - 1)) * random.uniform(0.5, 1.5)
+                self.counters["retried"] += 1
+                logging.warning(f"⚠️ خطای شبکه در ارسال به {chat_id} ({e})، تلاش مجدد {attempt} پس از {delay:.1f} ثانیه")
+                await asyncio.sleep(delay)
+
+    async def close(self):
+        for worker in self._workers.values():
+            worker.cancel()
+        await asyncio.gather(*self._workers.values(), return_exceptions=True)
+        self._workers.clear()
@@ -0,0 +1,137 @@
+import os
+import time
+import logging
+import threading
+from collections import deque
+
+# قطع مدار منابع خراب: پس از چند خطای پیاپی، منبع تا پایان مهلت بررسی نمی‌شود
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "3"))
+BREAKER_BASE_COOLDOWN = int(os.getenv("BREAKER_BASE_COOLDOWN", "300"))
+BREAKER_MAX_COOLDOWN = int(os.getenv("BREAKER_MAX_COOLDOWN", "21600"))
+# امتیاز سلامت از نتیجه آخرین بررسی‌ها؛ پاسخ کند یا نجات با fallback نیم امتیاز دارد
+HEALTH_WINDOW = int(os.getenv("HEALTH_WINDOW", "20"))
+HEALTH_SLOW_SECONDS = float(os.getenv("HEALTH_SLOW_SECONDS", "10"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class SourceHealth:
+    """مدارشکن و امتیاز سلامت هر منبع
+
+    closed: بررسی عادی. open: منبع تا open_until کنار گذاشته می‌شود و مهلت با هر قطع دوباره
+    دو برابر می‌شود. half_open: فقط یک درخواست آزمایشی؛ موفقیت مدار را می‌بندد و خطا دوباره بازش می‌کند.
+    """
+
+    def __init__(self, failure_threshold=BREAKER_FAILURE_THRESHOLD, base_cooldown=BREAKER_BASE_COOLDOWN,
+                 max_cooldown=BREAKER_MAX_COOLDOWN, window=HEALTH_WINDOW, slow_seconds=HEALTH_SLOW_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = base_cooldown
+        self.max_cooldown = max_cooldown
+        self.window = window
+        self.slow_seconds = slow_seconds
+        self._lock = threading.Lock()
+        self._state = {}
+
+    def _get(self, name):
+        state = self._state.get(name)
+        if state is None:
+            state = self._state[name] = {
+                "state": CLOSED, "failures": 0, "trips": 0, "open_until": 0,
+                "outcomes": deque(maxlen=self.window), "last_error": None
+            }
+        return state
+
+    def allow(self, name, now=None):
+        """آیا منبع در این چرخه بررسی شود؛ در half_open فقط اولین درخواست اجازه دارد"""
+        now = now or time.time()
+        with self._lock:
+            state = self._get(name)
+            if state["state"] == CLOSED:
+                return True
+            if state["state"] == OPEN and now >= state["open_until"]:
+                state["state"] = HALF_OPEN
+                logging.info(f"🩺 {name}: بررسی آزمایشی پس از قطع مدار")
+                return True
+            return False
+
+    def record(self, name, ok, elapsed=0.0, degraded=False, error=None):
+        """ثبت نتیجه یک بررسی؛ degraded یعنی موفق ولی کند یا فقط با صفحه fallback"""
+        now = time.time()
+        with self._lock:
+            state = self._get(name)
+            if ok:
+                slow = elapsed > self.slow_seconds
+                state["outcomes"].append(0.5 if degraded or slow else 1.0)
+                if state["state"] != CLOSED:
+                    logging.info(f"✅ {name}: منبع دوباره در دسترس است، مدار بسته شد")
+                state.update(state=CLOSED, failures=0, trips=0, open_until=0)
+                return
+
+            state["outcomes"].append(0.0)
+            state["failures"] += 1
+            state["last_error"] = error
+            if state["state"] == HALF_OPEN or state["failures"] >= self.failure_threshold:
+                cooldown = min(self.base_cooldown * 2 ** state["trips"], self.max_cooldown)
+                state["trips"] += 1
+                state.update(state=OPEN, open_until=now + cooldown)
+                logging.warning(
+                    f"⛔ {name}: {state['failures']} خطای پیاپی، قطع مدار به مدت {int(cooldown)} ثانیه"
+                )
+
+    def release(self, name):
+        """بررسی آزمایشی بدون نتیجه (مثلاً لغو چرخه)؛ بررسی بعدی دوباره آزمایشی است"""
+        with self._lock:
+            state = self._state.get(name)
+            if state is not None and state["state"] == HALF_OPEN:
+                state.update(state=OPEN, open_until=0)
+
+    def retry_in(self, name):
+        """ثانیه‌های باقی‌مانده تا بررسی آزمایشی بعدی (0 اگر مدار بسته باشد)"""
+        with self._lock:
+            state = self._state.get(name)
+            if state is None or state["state"] == CLOSED:
+                return 0
+            return max(0, int(state["open_until"] - time.time()))
+
+    def score(self, name):
+        """امتیاز سلامت 0 تا 100؛ None اگر هنوز بررسی نشده باشد"""
+        with self._lock:
+            state = self._state.get(name)
+            return self._score(state) if state else None
+
+    @staticmethod
+    def _score(state):
+        outcomes = state["outcomes"]
+        return round(100 * sum(outcomes) / len(outcomes)) if outcomes else None
+
+    def state(self, name):
+        with self._lock:
+            state = self._state.get(name)
+            return state["state"] if state else CLOSED
+
+    def sync(self, names):
+        """حذف وضعیت منابعی که از فهرست خارج شده‌اند"""
+        names = set(names)
+        with self._lock:
+            for name in self._state.keys() - names:
+                del self._state[name]
+
+    def snapshot(self):
+        """وضعیت مدار و امتیاز سلامت هر منبع برای گزارش"""
+        now = time.time()
+        with self._lock:
+            return {
+                name: {
+                    "state": state["state"],
+                    "score": self._score(state),
+                    "failures": state["failures"],
+                    "retry_in": max(0, int(state["open_until"] - now)) if state["state"] != CLOSED else 0,
+                    "last_error": state["last_error"]
+                }
+                for name, state in self._state.items()
+            }
+
+
+source_health = SourceHealth()
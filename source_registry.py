@@ -0,0 +1,126 @@
+import os
+import re
+import json
+import logging
+import threading
+from collections import namedtuple
+
+SOURCES_FILE = os.getenv(
+    "SOURCES_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "sources.json")
+)
+
+# بیشترین طول نام منبع در جدول گزارش
+REPORT_LABEL_WIDTH = 18
+
+# name شناسه قدیمی منبع است (در هش خبرها، feed_state و زمان‌بند) و display_name نام نمایشی پیام‌ها
+Source = namedtuple("Source", "name display_name url fallback lang score label scrape")
+
+# قواعد استخراج تیتر از صفحه fallback: تگ‌های محدودکننده پارس، انتخابگر CSS لینک و الگوی آدرس خبر
+ScrapeRule = namedtuple("ScrapeRule", "tags attrs select link_pattern")
+DEFAULT_SCRAPE_RULE = ScrapeRule(tags=("h1", "h2", "h3", "h4"), attrs=None, select="a[href]", link_pattern=None)
+
+
+def _make_scrape_rule(config):
+    if not config:
+        return DEFAULT_SCRAPE_RULE
+    return ScrapeRule(
+        tags=tuple(config.get("tags", DEFAULT_SCRAPE_RULE.tags)),
+        attrs=config.get("attrs"),
+        select=config.get("select", DEFAULT_SCRAPE_RULE.select),
+        link_pattern=re.compile(config["link_pattern"]) if config.get("link_pattern") else None
+    )
+
+
+def _make_source(item):
+    name = item.get("id") or item["name"]
+    display_name = item.get("name") or name
+    label = display_name if len(display_name) <= REPORT_LABEL_WIDTH else display_name[:15] + "..."
+    return Source(
+        name=name,
+        display_name=display_name,
+        url=item["rss"],
+        fallback=item.get("fallback"),
+        lang=item.get("lang", "fa"),
+        score=item.get("score", 50),
+        label=label,
+        scrape=_make_scrape_rule(item.get("scrape"))
+    )
+
+
+class SourceRegistry:
+    """فهرست منابع از sources.json؛ با تغییر زمان ویرایش فایل، کل فهرست یکجا جایگزین می‌شود"""
+
+    def __init__(self, path=SOURCES_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._mtime = None
+        # (منابع، نگاشت نام به منبع) در یک tuple تا جایگزینی برای خواننده‌ها اتمی باشد
+        self._current = ((), {})
+        self.refresh()
+
+    def _read(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            sources = tuple(_make_source(item) for item in json.load(f))
+
+        names = [source.name for source in sources]
+        if len(set(names)) != len(names):
+            raise ValueError("duplicate source id")
+        return sources
+
+    def refresh(self):
+        """بارگذاری مجدد اگر فایل تغییر کرده باشد؛ True یعنی فهرست عوض شد"""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError as e:
+            logging.error(f"خطا در خواندن فایل منابع {self.path}: {e}")
+            return False
+
+        if mtime == self._mtime:
+            return False
+
+        with self._lock:
+            if mtime == self._mtime:
+                return False
+            try:
+                sources = self._read()
+            except Exception as e:
+                # فایل نیمه‌نوشته یا نامعتبر؛ فهرست قبلی حفظ می‌شود و بار بعد دوباره بررسی می‌شود
+                logging.error(f"خطا در بارگذاری منابع از {self.path}: {e}")
+                return False
+
+            first_load = self._mtime is None
+            self._current = (sources, {source.name: source for source in sources})
+            self._mtime = mtime
+
+        if first_load:
+            logging.info(f"📚 بارگذاری {len(sources)} منبع از {os.path.basename(self.path)}")
+        else:
+            logging.info(f"🔃 فهرست منابع به‌روز شد: {len(sources)} منبع")
+        return True
+
+    def all(self):
+        return self._current[0]
+
+    def names(self):
+        return [source.name for source in self._current[0]]
+
+    def get(self, name):
+        return self._current[1].get(name)
+
+    def select(self, names=None):
+        """منابع به ترتیب فایل؛ اگر names داده شود فقط همان‌ها"""
+        sources = self._current[0]
+        if names is None:
+            return list(sources)
+        names = set(names)
+        return [source for source in sources if source.name in names]
+
+    def display_name(self, name):
+        source = self._current[1].get(name)
+        return source.display_name if source else name
+
+    def __len__(self):
+        return len(self._current[0])
+
+
+source_registry = SourceRegistry()
@@ -0,0 +1,169 @@
+import os
+import sys
+import asyncio
+
+import pytest
+
+from coordination import LeaderLease, RedisCoordinator, SQLiteCoordinator
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+from redis_standin import RedisStandIn  # noqa: E402
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+@pytest.fixture
+def redis_url():
+    standin = RedisStandIn()
+    url = standin.start()
+    yield url
+    standin.stop()
+
+
+def test_claim_is_exclusive_until_released(tmp_path):
+    async def scenario():
+        first = SQLiteCoordinator(str(tmp_path / "coordination.db"))
+        second = SQLiteCoordinator(str(tmp_path / "coordination.db"))
+        try:
+            assert await first.claim("news", "a", 60)
+            assert not await second.claim("news", "b", 60)
+            # صاحب فعلی هم تا آزاد شدن دوباره رزرو نمی‌کند
+            assert not await first.claim("news", "a", 60)
+
+            await second.release_claim("news", "b")
+            assert not await second.claim("news", "b", 60)
+
+            await first.release_claim("news", "a")
+            assert await second.claim("news", "b", 60)
+        finally:
+            await first.close()
+            await second.close()
+
+    run(scenario())
+
+
+def test_expired_claim_can_be_taken_over(tmp_path):
+    async def scenario():
+        coordinator = SQLiteCoordinator(str(tmp_path / "coordination.db"))
+        try:
+            assert await coordinator.claim("news", "a", -1)
+            assert await coordinator.claim("news", "b", 60)
+            assert not await coordinator.claim("news", "a", 60)
+            assert await coordinator.prune() == 0
+        finally:
+            await coordinator.close()
+
+    run(scenario())
+
+
+def test_concurrent_claims_have_one_winner(tmp_path):
+    async def scenario():
+        coordinators = [SQLiteCoordinator(str(tmp_path / "coordination.db")) for _ in range(4)]
+        try:
+            results = await asyncio.gather(
+                *(coordinator.claim("news", f"owner-{i}", 60) for i, coordinator in enumerate(coordinators))
+            )
+            assert results.count(True) == 1
+        finally:
+            await asyncio.gather(*(coordinator.close() for coordinator in coordinators))
+
+    run(scenario())
+
+
+def test_confirmed_claim_outlives_prune(tmp_path):
+    async def scenario():
+        coordinator = SQLiteCoordinator(str(tmp_path / "coordination.db"))
+        try:
+            assert await coordinator.claim("sent", "a", 60)
+            await coordinator.confirm("sent", "a", 3600)
+            assert await coordinator.claim("stale", "a", -1)
+            assert await coordinator.prune() == 1
+            assert not await coordinator.claim("sent", "b", 60)
+        finally:
+            await coordinator.close()
+
+    run(scenario())
+
+
+def test_redis_claim_release(redis_url):
+    async def scenario():
+        first = RedisCoordinator(redis_url)
+        second = RedisCoordinator(redis_url)
+        try:
+            assert await first.claim("news", "a", 60)
+            assert not await second.claim("news", "b", 60)
+            # تکرار claim صاحب فعلی (مثلا پس از قطع اتصال) موفق است
+            assert await first.claim("news", "a", 60)
+
+            # فقط صاحب رزرو می‌تواند آن را آزاد کند
+            await second.release_claim("news", "b")
+            assert not await second.claim("news", "b", 60)
+
+            await first.release_claim("news", "a")
+            assert await second.claim("news", "b", 60)
+            assert await first.clear() == 1
+            assert await first.claim("news", "a", 60)
+        finally:
+            await first.close()
+            await second.close()
+
+    run(scenario())
+
+
+def test_redis_lease_expires_and_is_taken_over(redis_url):
+    async def scenario():
+        first = RedisCoordinator(redis_url)
+        second = RedisCoordinator(redis_url)
+        try:
+            assert await first.acquire_lease("leader", "a", 0.2)
+            assert not await second.acquire_lease("leader", "b", 0.2)
+            # تمدید توسط رهبر فعلی
+            assert await first.acquire_lease("leader", "a", 0.2)
+
+            await asyncio.sleep(0.3)
+            assert await second.acquire_lease("leader", "b", 60)
+            # رهبر قبلی پس از انقضا نمی‌تواند تمدید کند یا قفل دیگری را آزاد کند
+            assert not await first.acquire_lease("leader", "a", 60)
+            await first.release_lease("leader", "a")
+            assert not await first.acquire_lease("leader", "a", 60)
+        finally:
+            await first.close()
+            await second.close()
+
+    run(scenario())
+
+
+def test_leader_lease_release_hands_over(redis_url):
+    async def scenario():
+        first = RedisCoordinator(redis_url)
+        second = RedisCoordinator(redis_url)
+        leader = LeaderLease(first, "news-cycle", owner="a", ttl=60)
+        follower = LeaderLease(second, "news-cycle", owner="b", ttl=60)
+        try:
+            assert await leader.acquire()
+            assert not await follower.acquire()
+            await leader.release()
+            assert not leader.held
+            assert await follower.acquire()
+        finally:
+            await follower.release()
+            await first.close()
+            await second.close()
+
+    run(scenario())
+
+
+def test_redis_concurrent_claims_have_one_winner(redis_url):
+    async def scenario():
+        coordinators = [RedisCoordinator(redis_url) for _ in range(8)]
+        try:
+            results = await asyncio.gather(
+                *(coordinator.claim("news", f"owner-{i}", 60) for i, coordinator in enumerate(coordinators))
+            )
+            assert results.count(True) == 1
+        finally:
+            await asyncio.gather(*(coordinator.close() for coordinator in coordinators))
+
+    run(scenario())
@@ -0,0 +1,85 @@
+import re
+import asyncio
+
+from digest import DigestItem, NewsDigest, split_messages
+
+TITLE = "خلاصه خبرهای کم‌اهمیت"
+FOOTER = "🆔 @cafeshamss"
+
+
+def make_items(count, source_count=3, title_repeat=1):
+    return [
+        DigestItem(f"منبع {i % source_count}", f"خبر {i} <b>&" * title_repeat, f"https://example.ir/n?id={i}&x=1",
+                   "full", None, 0, 0)
+        for i in range(count)
+    ]
+
+
+def test_single_message_groups_items_by_source():
+    items = make_items(6)
+    messages = split_messages(items, TITLE, FOOTER)
+
+    assert len(messages) == 1
+    text, batch = messages[0]
+    assert batch == sorted(items, key=lambda item: item.source)
+    assert text.count("<b>منبع 0</b>") == 1
+    assert "(1/1)" not in text
+    assert text.endswith(FOOTER)
+
+
+def test_escapes_titles_and_links():
+    text, _ = split_messages(make_items(1), TITLE, FOOTER)[0]
+    assert "خبر 0 &lt;b&gt;&amp;" in text
+    assert 'href="https://example.ir/n?id=0&amp;x=1"' in text
+
+
+def test_splits_under_limit_without_breaking_tags():
+    items = make_items(300, source_count=7, title_repeat=8)
+    messages = split_messages(items, TITLE, FOOTER)
+
+    assert len(messages) > 1
+    assert [item for _, batch in messages for item in batch] == sorted(items, key=lambda item: item.source)
+    for part, (text, batch) in enumerate(messages, 1):
+        assert len(text) <= 4096
+        assert f"({part}/{len(messages)})" in text
+        assert text.count("<a ") == text.count("</a>") == len(batch)
+        assert len(re.findall(r"<b>", text)) == len(re.findall(r"</b>", text))
+
+
+def test_long_title_is_truncated():
+    item = DigestItem("منبع", "x" * 500, "https://example.ir", "full", None, 0, 0)
+    text, _ = split_messages([item], TITLE, FOOTER)[0]
+    assert "x" * 200 + "…" in text
+    assert "x" * 201 not in text
+
+
+def test_flush_skips_items_cancelled_by_their_cycle():
+    async def scenario():
+        digest = NewsDigest(TITLE, FOOTER, window=0, min_items=2)
+        sent = []
+
+        def send(text):
+            sent.append(text)
+            delivery = asyncio.get_running_loop().create_future()
+            delivery.set_result("ok")
+            return delivery
+
+        kept = digest.add("منبع", "خبر ماندگار", "https://example.ir/1", "full 1")
+        cancelled = digest.add("منبع", "خبر لغوشده", "https://example.ir/2", "full 2")
+        other = digest.add("منبع", "خبر دیگر", "https://example.ir/3", "full 3")
+        # چرخه لغو شده و رزرو این خبر آزاد شده است؛ نباید بعدا بدون ثبت ارسال شود
+        cancelled.cancel()
+
+        assert digest.pending() == 2
+        await asyncio.gather(*digest.flush(send))
+        assert len(sent) == 1
+        assert "خبر لغوشده" not in sent[0]
+        assert kept.result() == other.result() == "ok"
+
+        lone = digest.add("منبع", "خبر تنها", "https://example.ir/4", "full 4")
+        lone.cancel()
+        assert digest.flush(send) == []
+        assert len(sent) == 1
+        assert not digest.due()
+
+    asyncio.run(scenario())
@@ -0,0 +1,93 @@
+import hashlib
+import time
+
+import pytest
+
+from digest_index import RECORD, DigestIndex
+
+
+def md5(text):
+    return hashlib.md5(text.encode()).hexdigest()
+
+
+def test_round_trip_insert_lookup_compact_clear_reopen(tmp_path):
+    path = str(tmp_path / "sent_news.idx")
+    index = DigestIndex(path, retention_days=30)
+    index.open()
+
+    hashes = [md5(f"news {i}") for i in range(50)]
+    for news_hash in hashes[:30]:
+        index.add(news_hash)
+    assert all(news_hash in index for news_hash in hashes[:30])
+    assert md5("other") not in index
+    assert len(index) == 30
+
+    assert index.compact() == 30
+    assert (tmp_path / "sent_news.idx").stat().st_size == 30 * RECORD.size
+
+    # افزودنی‌های پس از compact همراه با فایل اصلی جستجو می‌شوند
+    for news_hash in hashes[25:]:
+        index.add(news_hash)
+    assert len(index) == 50
+    assert sorted(index) == sorted(hashes)
+    assert index.compact() == 50
+    index.close()
+
+    reopened = DigestIndex(path, retention_days=30)
+    reopened.open()
+    try:
+        assert len(reopened) == 50
+        assert all(news_hash in reopened for news_hash in hashes)
+        # digest خام هم پذیرفته می‌شود
+        assert bytes.fromhex(hashes[0]) in reopened
+
+        reopened.clear()
+        assert len(reopened) == 0
+        assert hashes[0] not in reopened
+        assert not (tmp_path / "sent_news.idx").exists()
+        reopened.add(hashes[0])
+        assert reopened.compact() == 1
+    finally:
+        reopened.close()
+
+    again = DigestIndex(path)
+    again.open()
+    try:
+        assert list(again) == [hashes[0]]
+    finally:
+        again.close()
+
+
+def test_compact_drops_expired_digests(tmp_path):
+    path = str(tmp_path / "sent_news.idx")
+    index = DigestIndex(path, retention_days=1)
+    index.open()
+    try:
+        index.add(md5("old"), timestamp=time.time() - 2 * 86400)
+        index.add(md5("new"))
+        assert index.compact() == 1
+        assert md5("old") not in index
+        assert md5("new") in index
+    finally:
+        index.close()
+
+
+def test_compact_refuses_to_overwrite_unloaded_file(tmp_path):
+    path = str(tmp_path / "sent_news.idx")
+    index = DigestIndex(path)
+    index.open()
+    index.add(md5("kept"))
+    index.compact()
+    index.close()
+
+    unloaded = DigestIndex(path)
+    unloaded.add(md5("new"))
+    with pytest.raises(RuntimeError):
+        unloaded.compact()
+
+    reopened = DigestIndex(path)
+    reopened.open()
+    try:
+        assert md5("kept") in reopened
+    finally:
+        reopened.close()
@@ -0,0 +1,72 @@
+import pytest
+
+import feed_fetcher
+from feed_fetcher import select_new_entries, track_failure, update_high_water
+
+
+@pytest.fixture(autouse=True)
+def feed_state(monkeypatch):
+    state = {}
+    monkeypatch.setattr(feed_fetcher, "feed_state", state)
+    return state
+
+
+def entries(*ids):
+    """خبرها به ترتیب فید: جدیدترین اول"""
+    return [{"id": f"g{i}", "link": f"https://example.ir/{i}", "title": f"t{i}"} for i in ids]
+
+
+def test_first_cycle_takes_initial_entries_oldest_first(monkeypatch):
+    monkeypatch.setattr(feed_fetcher, "FEED_INITIAL_ENTRIES", 3)
+    fresh, backlog = select_new_entries("s", entries(9, 8, 7, 6, 5))
+    assert [e["id"] for e in fresh] == ["g7", "g8", "g9"]
+    assert backlog == 0
+
+
+def test_selects_entries_above_high_water_with_backlog():
+    update_high_water("s", entries(3)[0])
+    fresh, backlog = select_new_entries("s", entries(9, 8, 7, 6, 5, 4, 3, 2), limit=4)
+    assert [e["id"] for e in fresh] == ["g4", "g5", "g6", "g7"]
+    assert backlog == 2
+
+    update_high_water("s", fresh[-1], backlog)
+    assert feed_fetcher.feed_state["s"]["backlog"] == 2
+    fresh, backlog = select_new_entries("s", entries(9, 8, 7, 6, 5, 4, 3, 2), limit=4)
+    assert [e["id"] for e in fresh] == ["g8", "g9"]
+    assert backlog == 0
+
+
+def test_matches_mark_by_link_when_guid_missing():
+    update_high_water("s", {"link": "https://example.ir/3"})
+    feed = [{"link": f"https://example.ir/{i}"} for i in (5, 4, 3, 2)]
+    fresh, _ = select_new_entries("s", feed)
+    assert [e["link"] for e in fresh] == ["https://example.ir/4", "https://example.ir/5"]
+
+
+def test_mark_missing_from_feed_falls_back_to_published_time():
+    feed_fetcher.feed_state["s"] = {"high_water": {"guid": "gone", "link": None, "published": 1000}}
+    feed = [
+        {"id": "new", "published_parsed": (1970, 1, 1, 0, 20, 0, 3, 1, 0)},
+        {"id": "old", "published_parsed": (1970, 1, 1, 0, 10, 0, 3, 1, 0)},
+        {"id": "undated"},
+    ]
+    fresh, _ = select_new_entries("s", feed)
+    assert [e["id"] for e in fresh] == ["undated", "new"]
+
+
+def test_update_high_water_without_entry_keeps_mark():
+    update_high_water("s", entries(1)[0], 5)
+    update_high_water("s", None)
+    state = feed_fetcher.feed_state["s"]
+    assert state["high_water"]["guid"] == "g1"
+    assert "backlog" not in state
+
+
+def test_track_failure_counts_consecutive_failures_of_same_item():
+    first, second = entries(1, 2)
+    assert track_failure("s", first) == 1
+    assert track_failure("s", first) == 2
+    assert track_failure("s", second) == 1
+    assert track_failure("s", None) == 0
+    assert "retry" not in feed_fetcher.feed_state["s"]
+    assert track_failure("s", second) == 1
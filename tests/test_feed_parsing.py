@@ -0,0 +1,83 @@
+import os
+import asyncio
+import concurrent.futures
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+import feed_parsing
+
+FIXTURES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "fixtures")
+
+pytestmark = pytest.mark.filterwarnings("ignore::DeprecationWarning")
+
+
+def read_fixture(name):
+    with open(os.path.join(FIXTURES, name), "rb") as f:
+        return f.read()
+
+
+class BrokenPool(concurrent.futures.Executor):
+    """استخری که مانند استخر با پردازه کارگر از دست رفته رفتار می‌کند"""
+
+    def __init__(self):
+        self.shut_down = False
+
+    def submit(self, fn, *args, **kwargs):
+        raise BrokenProcessPool("worker died")
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        self.shut_down = True
+
+
+@pytest.fixture
+def pool_settings(monkeypatch):
+    monkeypatch.setattr(feed_parsing, "_pool", None)
+    monkeypatch.setattr(feed_parsing, "PARSE_POOL_SIZE", 1)
+    monkeypatch.setattr(feed_parsing, "PARSE_POOL_THRESHOLD", 1000)
+    yield
+    asyncio.run(feed_parsing.shutdown())
+
+
+def test_large_feed_is_parsed_in_the_pool(pool_settings):
+    body = read_fixture("large_fa_feed.xml")
+    assert len(body) >= feed_parsing.PARSE_POOL_THRESHOLD
+
+    async def scenario():
+        parsed = await feed_parsing.parse(body)
+        return parsed, feed_parsing._pool
+
+    parsed, pool = asyncio.run(scenario())
+    assert isinstance(pool, concurrent.futures.ProcessPoolExecutor)
+
+    expected = feed_parsing.parse_feed(body)
+    assert parsed.entries == expected.entries
+    assert len(parsed.entries) > 0
+    assert set(parsed.entries[0]) <= set(feed_parsing.ENTRY_FIELDS) | {"content"}
+
+
+def test_small_feed_skips_the_pool(pool_settings):
+    body = b"<rss><channel><item><title>t</title><link>https://example.ir/1</link></item></channel></rss>"
+    assert len(body) < feed_parsing.PARSE_POOL_THRESHOLD
+
+    parsed = asyncio.run(feed_parsing.parse(body))
+    assert [entry.link for entry in parsed.entries] == ["https://example.ir/1"]
+    assert feed_parsing._pool is None
+
+
+def test_broken_pool_falls_back_to_local_parse(pool_settings, monkeypatch):
+    broken = BrokenPool()
+    monkeypatch.setattr(feed_parsing, "_pool", broken)
+    body = read_fixture("guardian_world.xml")
+
+    parsed = asyncio.run(feed_parsing.parse(body))
+    assert parsed.entries == feed_parsing.parse_feed(body).entries
+    # استخر خراب کنار گذاشته می‌شود تا پارس بعدی استخر تازه بسازد
+    assert broken.shut_down
+    assert feed_parsing._pool is None
+
+
+def test_malformed_feed_is_parsed_leniently():
+    parsed = feed_parsing.parse_feed(read_fixture("malformed_feed.xml"))
+    assert parsed.bozo
+    assert parsed.entries
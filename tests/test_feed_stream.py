@@ -0,0 +1,85 @@
+import os
+from xml.etree.ElementTree import ParseError
+
+import pytest
+
+import feed_parsing
+from feed_stream import StreamParser
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "fixtures")
+# slim_entry فیلد updated_parsed را می‌خواند و feedparser برای آن هشدار منسوخ شدن می‌دهد
+pytestmark = pytest.mark.filterwarnings("ignore::DeprecationWarning")
+
+FIELDS = ("id", "title", "link", "summary", "published_parsed")
+
+
+def read_fixture(name):
+    with open(os.path.join(FIXTURES_DIR, name), "rb") as f:
+        return f.read()
+
+
+def stream(body, stop=lambda entry, count: False, chunk=1024):
+    parser = StreamParser(stop)
+    for offset in range(0, len(body), chunk):
+        if parser.feed(body[offset:offset + chunk]):
+            break
+    parser.close()
+    return parser
+
+
+@pytest.mark.parametrize("name", ["small_feed.xml", "persian_agency.xml", "guardian_world.xml", "large_fa_feed.xml"])
+def test_entries_match_feedparser(name):
+    body = read_fixture(name)
+    expected = feed_parsing.parse_feed(body).entries
+    entries = stream(body).result().entries
+
+    assert len(entries) == len(expected)
+    for entry, reference in zip(entries, expected):
+        for field in FIELDS:
+            assert entry.get(field) == reference.get(field), field
+        assert [c.value for c in entry.get("content", [])] == [c.value for c in reference.get("content", [])]
+
+
+def test_summary_is_sanitized_like_feedparser():
+    body = b"""<rss><channel><item><guid>1</guid><title>t</title>
+    <description><![CDATA[<p style="x" onclick="evil()">text</p><script>bad()</script>]]></description>
+    </item></channel></rss>"""
+    entry = stream(body).result().entries[0]
+    assert entry["summary"] == feed_parsing.parse_feed(body).entries[0]["summary"]
+    assert "onclick" not in entry["summary"] and "script" not in entry["summary"]
+
+
+def test_atom_plain_text_summary_is_kept():
+    body = b"""<feed xmlns="http://www.w3.org/2005/Atom"><entry><id>1</id><title>t</title>
+    <link rel="enclosure" href="https://example.ir/a.mp3"/><link href="https://example.ir/1"/>
+    <summary>a &lt;b&gt; c</summary></entry></feed>"""
+    entry = stream(body).result().entries[0]
+    assert entry["summary"] == "a <b> c"
+    assert entry["link"] == "https://example.ir/1"
+
+
+def test_stop_ends_parsing_before_end_of_document():
+    body = read_fixture("large_fa_feed.xml")
+    parser = StreamParser(lambda entry, count: count >= 3)
+    consumed = 0
+    for offset in range(0, len(body), 4096):
+        consumed += 4096
+        if parser.feed(body[offset:offset + 4096]):
+            break
+    parser.close()
+
+    assert len(parser.entries) == 3
+    assert consumed < len(body)
+
+
+def test_malformed_feed_raises_parse_error():
+    with pytest.raises(ParseError):
+        stream(read_fixture("malformed_feed.xml"))
+
+
+def test_truncated_feed_raises_parse_error_on_close():
+    body = read_fixture("small_feed.xml")
+    parser = StreamParser(lambda entry, count: False)
+    parser.feed(body[:len(body) // 2])
+    with pytest.raises(ParseError):
+        parser.close()
@@ -0,0 +1,157 @@
+import asyncio
+
+import jobs
+from jobs import CANCELLED, DONE, FAILED, QUEUED, RUNNING, JobManager
+
+
+class GatedRunner:
+    """اجرای ساختگی چرخه که تا باز شدن gate منتظر می‌ماند"""
+
+    def __init__(self):
+        self.gate = asyncio.Event()
+        self.started = []
+        self.finished = []
+
+    async def __call__(self, job):
+        self.started.append(job.id)
+        await self.gate.wait()
+        self.finished.append(job.id)
+        return {"sources": job.sources}
+
+
+def test_duplicate_requests_join_the_running_or_queued_job():
+    async def scenario():
+        runner = GatedRunner()
+        manager = JobManager(runner)
+
+        first, coalesced = manager.submit(None, kind="force")
+        assert not coalesced
+        await asyncio.sleep(0)
+        assert first.status == RUNNING
+
+        # /force-news تکراری به همان چرخه در حال اجرا می‌پیوندد
+        again, coalesced = manager.submit(None, kind="force")
+        assert coalesced and again is first
+        assert first.requests == 2
+
+        runner.gate.set()
+        await manager.wait(first)
+        assert first.status == DONE
+        assert first.result == {"sources": None}
+        assert runner.started == [first.id]
+        assert manager.counters == {"submitted": 2, "coalesced": 1}
+
+    asyncio.run(scenario())
+
+
+def test_uncovered_requests_merge_into_one_queued_job():
+    async def scenario():
+        runner = GatedRunner()
+        manager = JobManager(runner)
+
+        running, _ = manager.submit(["a"])
+        await asyncio.sleep(0)
+        covered, coalesced = manager.submit(["a"])
+        assert coalesced and covered is running
+
+        queued, coalesced = manager.submit(["b"])
+        assert not coalesced and queued.status == QUEUED
+        merged, coalesced = manager.submit(["c"])
+        assert coalesced and merged is queued
+        assert queued.sources == {"b", "c"}
+        # درخواست همه منابع، چرخه صف را به همه منابع گسترش می‌دهد
+        manager.submit(None)
+        assert queued.sources is None and queued.requests == 3
+
+        runner.gate.set()
+        await manager.wait(queued)
+        assert runner.started == [running.id, queued.id]
+        assert [job["id"] for job in manager.snapshot()] == [queued.id, running.id]
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_job_does_not_block_the_next():
+    async def scenario():
+        runner = GatedRunner()
+        manager = JobManager(runner)
+
+        first, _ = manager.submit(["a"])
+        await asyncio.sleep(0)
+        second, _ = manager.submit(["b"])
+        await asyncio.sleep(0)
+        first.task.cancel()
+        await asyncio.gather(first.task, return_exceptions=True)
+        assert first.status == CANCELLED
+        assert first.finished_at is not None
+
+        runner.gate.set()
+        await manager.wait(second)
+        assert second.status == DONE
+        assert runner.finished == [second.id]
+
+    asyncio.run(scenario())
+
+
+def test_timeout_and_errors_mark_the_job_failed():
+    async def scenario():
+        async def slow(job):
+            await asyncio.sleep(1)
+
+        async def broken(job):
+            raise RuntimeError("feed exploded")
+
+        manager = JobManager(slow, timeout=0.01)
+        job, _ = manager.submit()
+        await manager.wait(job)
+        assert job.status == FAILED
+        assert "0.01" in job.error
+
+        manager = JobManager(broken)
+        job, _ = manager.submit()
+        await manager.wait(job)
+        assert job.status == FAILED
+        assert job.error == "feed exploded"
+
+    asyncio.run(scenario())
+
+
+def test_shutdown_cancels_queued_job_and_lets_running_job_finish(monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_SHUTDOWN_GRACE", 5)
+
+    async def scenario():
+        runner = GatedRunner()
+        manager = JobManager(runner)
+        running, _ = manager.submit(["a"])
+        await asyncio.sleep(0)
+        queued, _ = manager.submit(["b"])
+        await asyncio.sleep(0)
+
+        shutdown = asyncio.create_task(manager.shutdown())
+        await asyncio.sleep(0.01)
+        # چرخه صف بی‌درنگ لغو می‌شود و چرخه در حال اجرا تا پایان مهلت فرصت دارد
+        assert queued.status == CANCELLED
+        assert running.status == RUNNING
+        runner.gate.set()
+        await shutdown
+
+        assert running.status == DONE
+        assert runner.started == [running.id]
+
+    asyncio.run(scenario())
+
+
+def test_shutdown_cancels_running_job_after_grace(monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_SHUTDOWN_GRACE", 0.01)
+
+    async def scenario():
+        runner = GatedRunner()
+        manager = JobManager(runner)
+        running, _ = manager.submit()
+        await asyncio.sleep(0)
+
+        await manager.shutdown()
+        assert running.status == CANCELLED
+        assert runner.finished == []
+
+    asyncio.run(scenario())
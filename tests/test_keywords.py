@@ -0,0 +1,61 @@
+from keywords import DEFAULT_CATEGORY, KEYWORDS_FILE, KeywordAutomaton, KeywordEngine
+
+
+def test_automaton_reports_overlapping_matches():
+    automaton = KeywordAutomaton([("he", "he"), ("she", "she"), ("his", "his"), ("hers", "hers")])
+    assert sorted(automaton.iter_matches("ushers")) == [(3, "he"), (3, "she"), (5, "hers")]
+    # کلمه‌ای که پسوند کلمه دیگر است هم در همان موقعیت گزارش می‌شود
+    assert sorted(automaton.iter_matches("shis")) == [(3, "his")]
+    assert list(automaton.iter_matches("")) == []
+
+
+def test_automaton_repeated_keyword():
+    automaton = KeywordAutomaton([("نفت", 1), ("نفتکش", 2)])
+    assert list(automaton.iter_matches("نفتکش و نفت")) == [(2, 1), (4, 2), (10, 1)]
+
+
+def test_category_priority_and_distinct_important_keywords():
+    engine = KeywordEngine(
+        [("political", ["وزیر"]), ("economic", ["نفت", "دلار"])],
+        ["فوری", "breaking"],
+    )
+    # دسته اول فهرست بر دسته بعدی اولویت دارد
+    assert engine.analyze("فوری: وزیر نفت درباره قیمت دلار") == ("political", 1)
+    # هر کلمه مهم فقط یک بار شمرده می‌شود و تطبیق انگلیسی به بزرگی حروف حساس نیست
+    assert engine.analyze("BREAKING: oil breaking فوری فوری") == (DEFAULT_CATEGORY, 2)
+    assert engine.analyze("") == (DEFAULT_CATEGORY, 0)
+    assert engine.analyze(None) == (DEFAULT_CATEGORY, 0)
+
+
+def test_keywords_file_persian_and_english():
+    engine = KeywordEngine.from_file(KEYWORDS_FILE)
+    assert engine.analyze("فوری: افزایش قیمت دلار در بازار").category == "economic"
+    assert engine.analyze("فوری: افزایش قیمت دلار در بازار").important == 1
+    assert engine.analyze("نشست هوش مصنوعی در دانشگاه").category == "social"
+    assert engine.analyze("Breaking: urgent crisis talks") == (DEFAULT_CATEGORY, 3)
+    # نیم‌فاصله بخشی از کلمه کلیدی است
+    assert engine.analyze("همایش بین‌المللی").category == "international"
+
+
+def test_analyze_batch_matches_analyze():
+    engine = KeywordEngine.from_file(KEYWORDS_FILE)
+    titles = [
+        "فوری: وزیر نفت درباره قیمت دلار",
+        "Breaking news: urgent CRISIS meeting",
+        "",
+        None,
+        "خبر بی‌سابقه درباره فناوری و اینترنت",
+        "ورزش",
+        "مذاکره",
+    ]
+    assert engine.analyze_batch(titles) == [engine.analyze(title) for title in titles]
+    assert engine.analyze_batch([]) == []
+
+
+def test_analyze_batch_does_not_match_across_titles():
+    engine = KeywordEngine([("economic", ["نفت"]), ("political", ["news talks"])], ["breaking"])
+    # «نف» در پایان یک عنوان و «ت» در آغاز عنوان بعد نباید یک تطبیق بسازند
+    assert engine.analyze_batch(["خبر نف", "ت", "news", "talks break", "ing"]) == [
+        (DEFAULT_CATEGORY, 0), (DEFAULT_CATEGORY, 0), (DEFAULT_CATEGORY, 0), (DEFAULT_CATEGORY, 0),
+        (DEFAULT_CATEGORY, 0),
+    ]
@@ -0,0 +1,62 @@
+from near_duplicates import NearDuplicateIndex, normalize_title, shingles
+
+
+def is_duplicate(first, second, threshold=0.8):
+    index = NearDuplicateIndex(threshold=threshold)
+    index.add("first", index.signature(first))
+    return index.find(index.signature(second)) == "first"
+
+
+def test_persian_variants_normalize_to_the_same_title():
+    # ي و ك عربی، نیم‌فاصله، اعراب، کشیده و ارقام فارسی/عربی
+    assert normalize_title("افزايش قيمت نفت در بازارهاي جهاني") == normalize_title("افزایش قیمت نفت در بازارهای جهانی")
+    assert normalize_title("كاهش صادرات كشور") == normalize_title("کاهش صادرات کشور")
+    assert normalize_title("مذاکرات‌هسته‌ای ادامه می‌یابد") == normalize_title("مذاکرات هسته ای ادامه می یابد")
+    assert normalize_title("سفرِ وزیـــر به ۱۲ کشور") == normalize_title("سفر وزیر به 12 كشور")
+    assert normalize_title("«فوری»: تورم ٪۴۰ شد!") == "فوری تورم 40 شد"
+
+
+def test_persian_variants_are_near_duplicates():
+    assert is_duplicate(
+        "رئيس‌جمهور در نشست سران كشورهاي منطقه سخنراني كرد",
+        "رئیس جمهور در نشست سران کشورهای منطقه سخنرانی کرد",
+    )
+
+
+def test_small_edits_are_near_duplicates():
+    assert is_duplicate(
+        "Iran and Iraq sign a new trade agreement in Baghdad on Monday",
+        "Iran and Iraq sign a new trade agreement in Baghdad on Monday - Reuters",
+    )
+    assert is_duplicate("Oil prices rise after OPEC+ cut", "OIL PRICES RISE AFTER OPEC CUT")
+
+
+def test_reordered_words_are_not_duplicates():
+    assert shingles("Iran says talks with US are over") != shingles("US says talks with Iran are over")
+    assert not is_duplicate(
+        "Iran says talks with US will resume next week",
+        "US says talks with Iran will resume next week",
+    )
+    assert not is_duplicate("ایران و آمریکا درباره تبادل زندانیان توافق کردند", "آمریکا و ایران درباره تبادل زندانیان توافق کردند")
+
+
+def test_unrelated_titles_are_not_duplicates():
+    assert not is_duplicate("Oil prices rise after OPEC cut", "Football: Iran beats Japan in Asian Cup")
+
+
+def test_short_titles():
+    assert shingles("فوری") == {"فوری"}
+    assert shingles("  !! ") == set()
+    index = NearDuplicateIndex()
+    assert index.signature("...") is None
+    assert index.find(None) is None
+
+
+def test_signatures_survive_serialization_and_prune():
+    index = NearDuplicateIndex()
+    signature = index.signature("Iran and Iraq sign a new trade agreement")
+    index.add("old", index.load_signature(index.dump_signature(signature)), timestamp=100)
+    assert index.find(signature) == "old"
+    assert index.prune(older_than=200) == 1
+    assert index.find(signature) is None
+    assert len(index) == 0
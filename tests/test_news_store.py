@@ -0,0 +1,102 @@
+import json
+import sqlite3
+import hashlib
+
+import pytest
+
+from news_store import NewsStore, canonical_link
+
+
+def md5(text):
+    return hashlib.md5(text.encode()).hexdigest()
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = NewsStore(str(tmp_path / "sent_news.db"))
+    store.open()
+    yield store
+    store.close()
+
+
+def test_migrates_legacy_json_once(store, tmp_path):
+    legacy = tmp_path / "sent_news.json"
+    hashes = [md5(f"news {i}") for i in range(5)]
+    # فایل قدیمی ممکن است هش تکراری داشته باشد
+    legacy.write_text(json.dumps(hashes + hashes[:2]), encoding="utf-8")
+
+    assert store.migrate_json(str(legacy)) == 7
+    assert store.count() == 5
+    assert not legacy.exists()
+    assert (tmp_path / "sent_news.json.migrated").exists()
+    assert sorted(digest.hex() for digest, _ in store.digests_since(0)) == sorted(hashes)
+
+    # پس از تغییر نام، اجرای دوباره کاری نمی‌کند
+    assert store.migrate_json(str(legacy)) == 0
+    assert store.count() == 5
+
+
+def test_migration_keeps_rows_already_recorded(store, tmp_path):
+    store.record_sent("مهر", "عنوان", "https://example.ir/1", md5("news 0"), sent_at=1000)
+    legacy = tmp_path / "sent_news.json"
+    legacy.write_text(json.dumps([md5("news 0"), md5("news 1")]), encoding="utf-8")
+
+    store.migrate_json(str(legacy))
+    assert store.count() == 2
+    assert store.count(since=1001) == 1
+
+
+def test_invalid_legacy_file_is_left_in_place(store, tmp_path):
+    legacy = tmp_path / "sent_news.json"
+    legacy.write_text("{not json", encoding="utf-8")
+    with pytest.raises(ValueError):
+        store.migrate_json(str(legacy))
+    assert legacy.exists()
+    assert store.count() == 0
+
+
+def test_open_upgrades_older_schema(tmp_path):
+    path = str(tmp_path / "sent_news.db")
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE sent_news (
+            id INTEGER PRIMARY KEY, source TEXT NOT NULL, title TEXT NOT NULL, link TEXT NOT NULL,
+            digest BLOB NOT NULL UNIQUE, sent_at INTEGER NOT NULL
+        );
+        CREATE INDEX idx_sent_news_link ON sent_news (link);
+    """)
+    conn.close()
+
+    store = NewsStore(path)
+    store.open()
+    try:
+        store.record_sent("BBC", "title", "https://bbc.com/a", md5("a"), sent_at=2000, signature=b"sig")
+        assert store.signatures_since(0) == [(bytes.fromhex(md5("a")), b"sig", 2000)]
+        indexes = {row[0] for row in store._conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        assert "idx_sent_news_link" not in indexes
+    finally:
+        store.close()
+
+
+def test_record_count_prune_and_clear(store):
+    store.record_sent("BBC", "old", "https://bbc.com/a?utm_source=x#top", md5("old"), sent_at=1000)
+    store.record_sent("BBC", "new", "https://bbc.com/b", md5("new"), sent_at=5000)
+    # ثبت دوباره همان digest نادیده گرفته می‌شود
+    store.record_sent("BBC", "new", "https://bbc.com/b", md5("new"), sent_at=6000)
+
+    assert store.count() == 2
+    assert store.count(since=5000) == 1
+    assert store._conn.execute("SELECT link FROM sent_news WHERE title = 'old'").fetchone() == ("https://bbc.com/a",)
+
+    assert store.prune(older_than=2000) == 1
+    assert [digest.hex() for digest, _ in store.digests_since(0)] == [md5("new")]
+    assert store.clear() == 1
+    assert store.count() == 0
+
+
+def test_canonical_link():
+    assert canonical_link("HTTPS://Example.IR/news?id=1&amp;utm_medium=rss&fbclid=x#comments") == (
+        "https://example.ir/news?id=1"
+    )
+    assert canonical_link(" https://example.ir/a?b=&c=2 ") == "https://example.ir/a?b=&c=2"
+    assert canonical_link(None) == ""
@@ -0,0 +1,125 @@
+from types import SimpleNamespace
+
+import pytest
+
+import scheduler
+from scheduler import SourceScheduler
+
+
+class FakeClock:
+    def __init__(self, now=1_700_000_000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(scheduler, "time", SimpleNamespace(time=clock.time))
+    return clock
+
+
+def make_scheduler(names=("IRNA", "Brookings")):
+    return SourceScheduler(names, min_interval=60, max_interval=1800, default_interval=180,
+                           target_items=2, smoothing=0.5, backoff=1.5)
+
+
+def interval(schedule, name):
+    return schedule.snapshot()[name]["interval"]
+
+
+def test_new_sources_are_due_immediately(clock):
+    schedule = make_scheduler()
+    assert schedule.next_due() == clock.now
+    assert sorted(schedule.pop_due()) == ["Brookings", "IRNA"]
+    # سررسید موقت تا رسیدن نتیجه
+    assert schedule.pop_due() == []
+    assert schedule.next_due() == clock.now + 180
+
+
+def test_busy_source_interval_shrinks_to_its_publish_rate(clock):
+    schedule = make_scheduler()
+    schedule.pop_due()
+
+    # ۶ خبر در ۳ دقیقه: ۲ خبر در دقیقه، پس بازه یک دقیقه برای ۲ خبر
+    schedule.record("IRNA", new_items=6)
+    assert interval(schedule, "IRNA") == 60
+    assert schedule.snapshot()["IRNA"]["rate_per_hour"] == 120.0
+
+    clock.now += 60
+    assert schedule.pop_due() == ["IRNA"]
+    # نرخ بالاتر از کف بازه را پایین‌تر نمی‌برد
+    schedule.record("IRNA", new_items=10)
+    assert interval(schedule, "IRNA") == 60
+
+
+def test_quiet_source_backs_off_up_to_max(clock):
+    schedule = make_scheduler()
+    schedule.pop_due()
+
+    intervals = []
+    for not_modified in (True, False, True, True, True, True, True, True, True, True):
+        clock.now += interval(schedule, "Brookings")
+        schedule.record("Brookings", new_items=0, not_modified=not_modified)
+        intervals.append(interval(schedule, "Brookings"))
+    assert intervals[:3] == [270, 405, 608]
+    assert intervals[-1] == 1800
+    assert intervals == sorted(intervals)
+
+    # خبر جدید پس از سکوت طولانی بازه را دوباره کوتاه می‌کند
+    clock.now += 1800
+    schedule.record("Brookings", new_items=30)
+    assert interval(schedule, "Brookings") == 240
+
+
+def test_error_doubles_interval(clock):
+    schedule = make_scheduler()
+    schedule.pop_due()
+    schedule.record("IRNA", error=True)
+    assert interval(schedule, "IRNA") == 360
+    assert schedule.next_due() == clock.now + 180
+
+    schedule.record("Brookings", error=True)
+    schedule.record("Brookings", error=True)
+    assert interval(schedule, "Brookings") == 720
+
+
+def test_backlog_is_polled_again_at_min_interval(clock):
+    schedule = make_scheduler(["Brookings"])
+    schedule.pop_due()
+    for _ in range(3):
+        clock.now += 1800
+        schedule.record("Brookings", not_modified=True)
+    quiet_interval = interval(schedule, "Brookings")
+    assert quiet_interval > 60
+
+    clock.now += quiet_interval
+    schedule.record("Brookings", new_items=5, backlog=12)
+    # خبرهای منتقل شده پس از کف بازه بررسی می‌شوند، نه پس از بازه تطبیقی
+    assert schedule.next_due() == clock.now + 60
+    assert interval(schedule, "Brookings") > 60
+
+    clock.now += 60
+    assert schedule.pop_due() == ["Brookings"]
+    schedule.record("Brookings", new_items=5)
+    assert schedule.next_due() == clock.now + interval(schedule, "Brookings")
+
+    # خطای منبع بر backlog اولویت دارد
+    schedule.record("Brookings", error=True, backlog=3)
+    assert schedule.next_due() == clock.now + interval(schedule, "Brookings")
+
+
+def test_sync_adds_and_removes_sources(clock):
+    schedule = make_scheduler()
+    schedule.pop_due()
+    schedule.sync(["IRNA", "Tasnim"])
+
+    assert schedule.pop_due() == ["Tasnim"]
+    assert set(schedule.snapshot()) == {"IRNA", "Tasnim"}
+    # ورودی‌های منبع حذف شده در صف نادیده گرفته می‌شوند
+    clock.now += 180
+    assert sorted(schedule.pop_due()) == ["IRNA", "Tasnim"]
+    schedule.record("Brookings", new_items=3)
+    assert "Brookings" not in schedule.snapshot()
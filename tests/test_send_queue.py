@@ -0,0 +1,184 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from telegram.error import BadRequest, NetworkError, RetryAfter
+
+import send_queue
+from send_queue import SendQueue, TokenBucket
+
+CHAT_ID = 1001
+
+
+class FakeClock:
+    """ساعت ساختگی؛ sleep فقط زمان را جلو می‌برد و نوبت را به بقیه taskها می‌دهد"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+        self._sleep = asyncio.sleep
+
+    def monotonic(self):
+        return self.now
+
+    async def sleep(self, delay):
+        self.sleeps.append(round(delay, 6))
+        self.now += delay
+        await self._sleep(0)
+
+
+class FakeBot:
+    """ربات ساختگی که خطاهای داده شده را به ترتیب برمی‌گرداند و سپس موفق می‌شود"""
+
+    def __init__(self, clock, errors=()):
+        self.clock = clock
+        self.errors = list(errors)
+        self.sent = []
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.sent.append((self.clock.now, chat_id, text))
+        if self.errors:
+            raise self.errors.pop(0)
+        return f"message:{text}"
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(send_queue, "time", SimpleNamespace(monotonic=clock.monotonic))
+    monkeypatch.setattr(asyncio, "sleep", clock.sleep)
+    monkeypatch.setattr(send_queue.random, "uniform", lambda low, high: 1.0)
+    monkeypatch.setattr(send_queue, "TELEGRAM_PRIVATE_RATE", 1000.0)
+    monkeypatch.setattr(send_queue, "SEND_BACKOFF_BASE", 1.0)
+    return clock
+
+
+def test_token_bucket_allows_burst_then_paces(clock):
+    async def scenario():
+        bucket = TokenBucket(rate=2, capacity=3)
+        for _ in range(5):
+            await bucket.acquire()
+
+    asyncio.run(scenario())
+    # سه توکن اولیه بدون انتظار؛ بعد از آن هر توکن نیم ثانیه
+    assert clock.sleeps == [0.5, 0.5]
+    assert clock.now == 1.0
+
+
+def test_group_chat_is_limited_per_minute(clock, monkeypatch):
+    monkeypatch.setattr(send_queue, "TELEGRAM_GROUP_RATE_PER_MIN", 20.0)
+    monkeypatch.setattr(send_queue, "TELEGRAM_GROUP_BURST", 2)
+    bot = FakeBot(clock)
+
+    async def scenario():
+        queue = SendQueue()
+        try:
+            await asyncio.gather(*(queue.enqueue(bot, -100, f"n{i}") for i in range(4)))
+        finally:
+            await queue.close()
+
+    asyncio.run(scenario())
+    assert [round(at, 6) for at, _, _ in bot.sent] == [0.0, 0.0, 3.0, 6.0]
+
+
+def test_retry_after_pauses_chat_without_counting_a_retry(clock):
+    bot = FakeBot(clock, [RetryAfter(5)])
+
+    async def scenario():
+        queue = SendQueue()
+        try:
+            result = await queue.send(bot, CHAT_ID, "hello")
+        finally:
+            await queue.close()
+        return queue, result
+
+    queue, result = asyncio.run(scenario())
+    assert result == "message:hello"
+    assert [round(at, 6) for at, _, _ in bot.sent] == [0.0, 5.0]
+    assert queue.counters == {"sent": 1, "failed": 0, "retried": 0, "rate_limited": 1}
+
+
+def test_retry_after_does_not_pause_other_chats(clock):
+    bot = FakeBot(clock, [RetryAfter(30)])
+
+    async def scenario():
+        queue = SendQueue()
+        try:
+            await asyncio.gather(queue.enqueue(bot, CHAT_ID, "paused"), queue.enqueue(bot, CHAT_ID + 1, "other"))
+        finally:
+            await queue.close()
+
+    asyncio.run(scenario())
+    # تنها انتظار، توقف همان چتی است که RetryAfter گرفته
+    assert clock.sleeps == [30.0]
+    assert [text for _, _, text in bot.sent] == ["paused", "other", "paused"]
+
+
+def test_network_errors_back_off_exponentially(clock):
+    bot = FakeBot(clock, [NetworkError("reset"), NetworkError("reset"), NetworkError("reset")])
+
+    async def scenario():
+        queue = SendQueue()
+        try:
+            result = await queue.send(bot, CHAT_ID, "hello")
+        finally:
+            await queue.close()
+        return queue, result
+
+    queue, result = asyncio.run(scenario())
+    assert result == "message:hello"
+    assert clock.sleeps == [1.0, 2.0, 4.0]
+    assert queue.counters["retried"] == 3
+
+
+def test_network_errors_give_up_after_max_retries(clock, monkeypatch):
+    monkeypatch.setattr(send_queue, "SEND_MAX_RETRIES", 2)
+    bot = FakeBot(clock, [NetworkError("down")] * 5)
+
+    async def scenario():
+        queue = SendQueue()
+        try:
+            with pytest.raises(NetworkError):
+                await queue.send(bot, CHAT_ID, "hello")
+        finally:
+            await queue.close()
+        return queue
+
+    queue = asyncio.run(scenario())
+    assert len(bot.sent) == 3
+    assert queue.counters["failed"] == 1
+    assert queue.counters["retried"] == 2
+
+
+def test_bad_request_is_not_retried(clock):
+    bot = FakeBot(clock, [BadRequest("can't parse entities")])
+    queue = SendQueue()
+
+    async def scenario():
+        try:
+            with pytest.raises(BadRequest):
+                await queue.send(bot, CHAT_ID, "<b>")
+            # خطای یک پیام worker را متوقف نمی‌کند
+            return await queue.send(bot, CHAT_ID, "next")
+        finally:
+            await queue.close()
+
+    assert asyncio.run(scenario()) == "message:next"
+    assert [text for _, _, text in bot.sent] == ["<b>", "next"]
+    assert queue.counters == {"sent": 1, "failed": 1, "retried": 0, "rate_limited": 0}
+
+
+def test_cancelled_message_is_not_sent(clock):
+    bot = FakeBot(clock)
+
+    async def scenario():
+        queue = SendQueue()
+        try:
+            cancelled = queue.enqueue(bot, CHAT_ID, "cancelled")
+            cancelled.cancel()
+            return await queue.send(bot, CHAT_ID, "kept")
+        finally:
+            await queue.close()
+
+    assert asyncio.run(scenario()) == "message:kept"
+    assert [text for _, _, text in bot.sent] == ["kept"]
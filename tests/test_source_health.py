@@ -0,0 +1,118 @@
+from types import SimpleNamespace
+
+import pytest
+
+import source_health
+from source_health import CLOSED, HALF_OPEN, OPEN, SourceHealth
+
+
+class FakeClock:
+    def __init__(self, now=1_700_000_000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(source_health, "time", SimpleNamespace(time=clock.time))
+    return clock
+
+
+def make_health(**kwargs):
+    options = {"failure_threshold": 3, "base_cooldown": 300, "max_cooldown": 1000, "window": 4, "slow_seconds": 10}
+    options.update(kwargs)
+    return SourceHealth(**options)
+
+
+def test_breaker_opens_half_opens_and_closes(clock):
+    health = make_health()
+    for _ in range(2):
+        health.record("BBC", False, error="timeout")
+    assert health.state("BBC") == CLOSED and health.allow("BBC")
+
+    health.record("BBC", False, error="timeout")
+    assert health.state("BBC") == OPEN
+    assert not health.allow("BBC")
+    assert health.retry_in("BBC") == 300
+
+    clock.now += 300
+    # پس از مهلت فقط یک درخواست آزمایشی اجازه دارد
+    assert health.allow("BBC")
+    assert health.state("BBC") == HALF_OPEN
+    assert not health.allow("BBC")
+
+    # خطای بررسی آزمایشی مدار را با مهلت دو برابر دوباره باز می‌کند
+    health.record("BBC", False, error="timeout")
+    assert health.state("BBC") == OPEN
+    assert health.retry_in("BBC") == 600
+
+    clock.now += 600
+    assert health.allow("BBC")
+    health.record("BBC", True, elapsed=1.0)
+    assert health.state("BBC") == CLOSED
+    assert health.retry_in("BBC") == 0
+
+    # قطع بعدی دوباره از مهلت پایه شروع می‌شود
+    for _ in range(3):
+        health.record("BBC", False)
+    assert health.retry_in("BBC") == 300
+
+
+def test_cooldown_is_capped(clock):
+    health = make_health(failure_threshold=1)
+    cooldowns = []
+    for _ in range(4):
+        health.record("BBC", False)
+        cooldowns.append(health.retry_in("BBC"))
+        clock.now += cooldowns[-1]
+        assert health.allow("BBC")
+    assert cooldowns == [300, 600, 1000, 1000]
+
+
+def test_release_returns_probe_for_the_next_cycle(clock):
+    health = make_health(failure_threshold=1)
+    health.record("BBC", False)
+    clock.now += 300
+    assert health.allow("BBC")
+
+    # چرخه پیش از نتیجه لغو شد؛ بررسی آزمایشی بدون انتظار به چرخه بعد می‌رسد
+    health.release("BBC")
+    assert health.state("BBC") == OPEN
+    assert health.allow("BBC")
+    assert health.state("BBC") == HALF_OPEN
+
+    # release روی مدار بسته یا منبع ناشناخته اثری ندارد
+    health.record("BBC", True)
+    health.release("BBC")
+    health.release("unknown")
+    assert health.state("BBC") == CLOSED
+
+
+def test_health_score(clock):
+    health = make_health()
+    assert health.score("BBC") is None
+
+    health.record("BBC", True, elapsed=1.0)
+    health.record("BBC", True, elapsed=30.0)
+    health.record("BBC", True, elapsed=1.0, degraded=True)
+    health.record("BBC", False)
+    assert health.score("BBC") == 50
+
+    # فقط آخرین window نتیجه شمرده می‌شود
+    for _ in range(4):
+        health.record("BBC", True)
+    assert health.score("BBC") == 100
+
+    snapshot = health.snapshot()["BBC"]
+    assert snapshot == {"state": CLOSED, "score": 100, "failures": 0, "retry_in": 0, "last_error": None}
+
+
+def test_sync_forgets_removed_sources(clock):
+    health = make_health()
+    health.record("BBC", True)
+    health.record("مهر", False)
+    health.sync(["مهر"])
+    assert set(health.snapshot()) == {"مهر"}
@@ -0,0 +1,57 @@
+import asyncio
+
+from translation_batcher import SEPARATOR, TranslationBatcher
+
+
+def translate_all(fetch, texts, **options):
+    calls = []
+
+    async def recorded(text):
+        calls.append(text)
+        return fetch(text)
+
+    async def scenario():
+        batcher = TranslationBatcher(recorded, **options)
+        results = await asyncio.gather(*(batcher.translate(text) for text in texts))
+        return results, batcher.counters
+
+    results, counters = asyncio.run(scenario())
+    return results, calls, counters
+
+
+def test_short_texts_are_packed_and_unpacked():
+    results, calls, counters = translate_all(str.upper, ["one", "two", "three"])
+    assert results == ["ONE", "TWO", "THREE"]
+    assert calls == [SEPARATOR.join(["one", "two", "three"])]
+    assert counters["packed_texts"] == 3
+
+
+def test_unpack_mismatch_falls_back_to_separate_requests():
+    def merge_lines(text):
+        return text.upper().replace(SEPARATOR, " ")
+
+    results, calls, counters = translate_all(merge_lines, ["one", "two"])
+    assert results == ["ONE", "TWO"]
+    assert len(calls) == 3
+    assert counters["unpack_failures"] == 1
+
+
+def test_failed_packed_request_is_not_retried_per_text():
+    results, calls, counters = translate_all(lambda text: None, ["one", "two", "three"])
+    assert results == [None, None, None]
+    assert len(calls) == 1
+    assert counters["unpack_failures"] == 0
+
+
+def test_long_texts_are_sent_alone():
+    long_text = "x" * 200
+    results, calls, _ = translate_all(str.upper, [long_text, "a" + SEPARATOR + "b"], short_text=120)
+    assert results == [long_text.upper(), ("a" + SEPARATOR + "b").upper()]
+    assert sorted(calls) == sorted([long_text, "a" + SEPARATOR + "b"])
+
+
+def test_batch_respects_max_chars():
+    texts = ["a" * 40, "b" * 40, "c" * 40]
+    results, calls, _ = translate_all(str.upper, texts, max_chars=90)
+    assert results == [text.upper() for text in texts]
+    assert len(calls) == 2
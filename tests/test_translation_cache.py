@@ -0,0 +1,126 @@
+import asyncio
+
+import pytest
+
+import translation_cache
+from translation_cache import TranslationCache
+
+
+class FakeClock:
+    def __init__(self, now=1_700_000_000):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(translation_cache.time, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def cache(tmp_path, clock):
+    cache = TranslationCache(str(tmp_path / "translations.db"), max_entries=10, ttl_days=1)
+    cache.open()
+    yield cache
+    cache.close()
+
+
+def test_concurrent_misses_share_one_fetch(cache):
+    calls = []
+
+    async def fetch(text):
+        calls.append(text)
+        await asyncio.sleep(0.01)
+        return f"ترجمه {text}"
+
+    async def scenario():
+        # متن با فاصله‌های متفاوت کلید یکسان دارد
+        texts = ["Oil prices rise", "Oil  prices rise ", "Oil prices rise", "Gold falls"]
+        return await asyncio.gather(*(cache.get_or_fetch(text, "en|fa", fetch) for text in texts))
+
+    results = asyncio.run(scenario())
+    assert results == ["ترجمه Oil prices rise"] * 3 + ["ترجمه Gold falls"]
+    assert calls == ["Oil prices rise", "Gold falls"]
+    assert cache.counters["misses"] == 2
+    assert cache.counters["coalesced"] == 2
+    assert cache.get("Oil prices rise", "en|fa") == "ترجمه Oil prices rise"
+
+
+def test_failed_fetch_is_not_cached(cache):
+    async def fetch(text):
+        return None
+
+    assert asyncio.run(cache.get_or_fetch("Hello", "en|fa", fetch)) is None
+    assert cache.get("Hello", "en|fa") is None
+    assert cache.counters["failures"] == 1
+
+
+def test_cancelled_waiter_still_stores_translation(cache):
+    async def fetch(text):
+        await asyncio.sleep(0.02)
+        return "سلام"
+
+    async def scenario():
+        waiter = asyncio.ensure_future(cache.get_or_fetch("Hello", "en|fa", fetch))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.sleep(0.05)
+
+    asyncio.run(scenario())
+    assert cache.get("Hello", "en|fa") == "سلام"
+
+
+def test_entries_expire_after_ttl(cache, clock, tmp_path):
+    cache.put("Hello", "en|fa", "سلام")
+    clock.now += 86400 - 1
+    assert cache.get("Hello", "en|fa") == "سلام"
+
+    clock.now += 2
+    # هم لایه حافظه و هم دیسک منقضی شده‌اند
+    assert cache.get("Hello", "en|fa") is None
+    assert cache.stats()["memory_entries"] == 0
+
+    reopened = TranslationCache(str(tmp_path / "translations.db"), ttl_days=1)
+    reopened.open()
+    try:
+        assert reopened.get("Hello", "en|fa") is None
+        # open سطرهای منقضی را از دیسک حذف می‌کند
+        assert reopened._conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0] == 0
+    finally:
+        reopened.close()
+
+
+def test_disk_hit_is_promoted_to_memory(cache, clock, tmp_path):
+    cache.put("Hello", "en|fa", "سلام")
+    clock.now += 3600
+
+    reopened = TranslationCache(str(tmp_path / "translations.db"), ttl_days=1)
+    reopened.open()
+    try:
+        assert reopened.get("Hello", "en|fa") == "سلام"
+        assert reopened.get("Hello", "en|fa") == "سلام"
+        assert reopened.counters["disk_hits"] == 1
+        assert reopened.counters["memory_hits"] == 1
+
+        # نسخه ارتقا یافته زمان ساخت دیسک را نگه می‌دارد و همان موقع منقضی می‌شود
+        clock.now += 86400 - 3600 + 1
+        assert reopened.get("Hello", "en|fa") is None
+    finally:
+        reopened.close()
+
+
+def test_memory_tier_is_lru_bounded(clock):
+    cache = TranslationCache(":memory:", max_entries=2)
+    cache.put("a", "en|fa", "1")
+    cache.put("b", "en|fa", "2")
+    assert cache.get("a", "en|fa") == "1"
+    cache.put("c", "en|fa", "3")
+
+    # بدون اتصال دیسک فقط حافظه می‌ماند؛ b کم‌استفاده‌ترین بود
+    assert cache.get("b", "en|fa") is None
+    assert cache.get("a", "en|fa") == "1"
+    assert cache.get("c", "en|fa") == "3"
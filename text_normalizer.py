@@ -0,0 +1,91 @@
+import re
+import html
+
+# الگوها یک بار کامپایل می‌شوند و برای همه خبرها استفاده می‌شوند
+BLOCK_TAG_RE = re.compile(r"<\s*(?:br|/p|/div|/li|/h[1-6])\b[^>]*>", re.IGNORECASE)
+TAG_RE = re.compile(r"<[^>]+>")
+# الگوهای جدا با پیش‌بررسی رشته‌ای؛ بیشتر خلاصه‌ها هیچ‌کدام را ندارند
+MEDIA_URL_RE = re.compile(r"https?://\S+\.(?:mp4|avi|mov|wmv|flv|webm|jpg|jpeg|png|gif)", re.IGNORECASE)
+MEDIA_TAG_RE = re.compile(r"\[(?:video|image|photo|pic)\]", re.IGNORECASE)
+MEDIA_LABELS = ("تصویر:", "ویدیو:", "فیلم:", "عکس:")
+
+# خلاصه‌های کوتاه‌تر از این مقدار کافی نیستند و از محتوای کامل استفاده می‌شود
+MIN_SUMMARY_LENGTH = 50
+MIN_CONTENT_LENGTH = 100
+
+
+def _collapse_whitespace(text):
+    """یک فاصله بین کلمات و یک خط جدید بین پاراگراف‌ها
+
+    split و join برای هر کلمه یک شیء می‌سازد و کند است؛ فقط خط‌هایی که فاصله تکراری یا tab دارند
+    کلمه به کلمه بازسازی می‌شوند. از فاصله‌های یونیکد فقط NBSP (&nbsp;) به فاصله تبدیل می‌شود.
+    """
+    if "\xa0" in text:
+        text = text.replace("\xa0", " ")
+    text = text.strip()
+    if "\n" in text:
+        text = "\n".join(filter(None, map(str.strip, text.split("\n"))))
+    if "  " in text or "\t" in text:
+        text = "\n".join(map(" ".join, map(str.split, text.split("\n"))))
+    return text
+
+
+def _strip_html(value):
+    if "<" in value:
+        value = TAG_RE.sub("", BLOCK_TAG_RE.sub("\n", value))
+    if "&" in value:
+        value = html.unescape(value)
+    return value
+
+
+def html_to_text(value):
+    """تبدیل HTML به متن ساده: حذف تگ‌ها، رمزگشایی entityها و یکسان‌سازی فاصله‌ها"""
+    return _collapse_whitespace(_strip_html(value or ""))
+
+
+def clean_summary(value):
+    """متن ساده خلاصه بدون لینک فایل‌های رسانه‌ای و برچسب‌های تصویر/ویدیو"""
+    text = _strip_html(value or "")
+    if "://" in text:
+        text = MEDIA_URL_RE.sub("", text)
+    if "[" in text:
+        text = MEDIA_TAG_RE.sub("", text)
+    if ":" in text:
+        for label in MEDIA_LABELS:
+            if label in text:
+                text = text.replace(label, "")
+    return _collapse_whitespace(text)
+
+
+def _raw_summary(entry):
+    summary = entry.get("summary") or entry.get("description")
+    if summary:
+        return summary
+
+    content = entry.get("content")
+    if isinstance(content, list) and content:
+        return content[0].get("value", "")
+    return str(content) if content else ""
+
+
+def extract_summary(entry, title=""):
+    """خلاصه پاک‌سازی شده خبر؛ اگر خلاصه فید کوتاه باشد از محتوای کامل استفاده می‌شود
+
+    رشته خالی یعنی فید متن قابل استفاده‌ای نداشته است.
+    """
+    summary = clean_summary(_raw_summary(entry))
+    if summary and summary != title and len(summary) >= MIN_SUMMARY_LENGTH:
+        return summary
+
+    content = entry.get("content")
+    if isinstance(content, list):
+        for item in content:
+            value = item.get("value", "")
+            # پاک‌سازی متن را کوتاه‌تر می‌کند؛ محتوای کوتاه‌تر از حداقل بررسی نمی‌شود
+            if len(value) <= MIN_CONTENT_LENGTH:
+                continue
+            text = html_to_text(value)
+            if len(text) > MIN_CONTENT_LENGTH and text != title:
+                return text
+
+    return ""
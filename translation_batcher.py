@@ -0,0 +1,97 @@
+import asyncio
+import logging
+
+SEPARATOR = "\n"
+
+
+class TranslationBatcher:
+    """ترجمه با همزمانی محدود و بسته‌بندی متن‌های کوتاه در یک درخواست
+
+    متن‌های کوتاهی که در فاصله linger ثانیه می‌رسند با جداکننده خط جدید به یک درخواست
+    تبدیل می‌شوند؛ اگر پاسخ قابل تفکیک نباشد هر متن جداگانه ترجمه می‌شود.
+    """
+
+    def __init__(self, fetch, concurrency=4, max_chars=450, short_text=120, linger=0.05):
+        self.fetch = fetch
+        self.concurrency = concurrency
+        self.max_chars = max_chars
+        self.short_text = short_text
+        self.linger = linger
+        self._semaphore = None
+        self._pending = []
+        self._pending_chars = 0
+        self._flush_handle = None
+        self._tasks = set()
+        self.counters = {"requests": 0, "packed_requests": 0, "packed_texts": 0, "unpack_failures": 0}
+
+    def _limit(self):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._semaphore
+
+    async def _fetch_one(self, text):
+        async with self._limit():
+            self.counters["requests"] += 1
+            return await self.fetch(text)
+
+    async def translate(self, text):
+        """ترجمه یک متن؛ متن‌های کوتاه با متن‌های همزمان دیگر بسته‌بندی می‌شوند"""
+        if len(text) > self.short_text or SEPARATOR in text:
+            return await self._fetch_one(text)
+
+        loop = asyncio.get_running_loop()
+        if self._pending and self._pending_chars + len(SEPARATOR) + len(text) > self.max_chars:
+            self._flush()
+
+        future = loop.create_future()
+        self._pending.append((text, future))
+        self._pending_chars += len(text) + len(SEPARATOR)
+        if self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.linger, self._flush)
+        return await asyncio.shield(future)
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        batch, self._pending, self._pending_chars = self._pending, [], 0
+        if batch:
+            task = asyncio.get_running_loop().create_task(self._run_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch):
+        texts = [text for text, _ in batch]
+        results = None
+
+        try:
+            if len(texts) == 1:
+                results = [await self._fetch_one(texts[0])]
+            else:
+                self.counters["packed_requests"] += 1
+                self.counters["packed_texts"] += len(texts)
+                translated = await self._fetch_one(SEPARATOR.join(texts))
+                parts = None if translated is None else [part.strip() for part in translated.split(SEPARATOR)]
+                if parts is None:
+                    # درخواست گروهی ناموفق؛ درخواست جداگانه برای هر متن هم به همان سرویس است
+                    results = [None] * len(texts)
+                elif len(parts) == len(texts) and all(parts):
+                    results = parts
+                else:
+                    self.counters["unpack_failures"] += 1
+                    logging.info(f"↩️ تفکیک ترجمه گروهی ({len(texts)} متن) ناموفق، ترجمه جداگانه")
+                    results = await asyncio.gather(
+                        *(self._fetch_one(text) for text in texts), return_exceptions=True
+                    )
+        except Exception as e:
+            logging.warning(f"⚠️ خطا در ترجمه گروهی: {e}")
+            results = [None] * len(texts)
+
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_result(None)
+            else:
+                future.set_result(result)
@@ -0,0 +1,152 @@
+import time
+import asyncio
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS translations (
+    key TEXT PRIMARY KEY,
+    langpair TEXT NOT NULL,
+    translated TEXT NOT NULL,
+    created_at INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_translations_created_at ON translations (created_at);
+"""
+
+
+def normalize_text(text):
+    """متن یکسان برای کلید کش: بدون فاصله‌های اضافه"""
+    return " ".join((text or "").split())
+
+
+class TranslationCache:
+    """کش دو لایه ترجمه: LRU در حافظه و SQLite روی دیسک با TTL
+
+    درخواست‌های همزمان برای یک متن فقط یک فراخوانی بیرونی انجام می‌دهند.
+    """
+
+    def __init__(self, path, max_entries=2000, ttl_days=14):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = int(ttl_days * 86400)
+        self._lock = threading.Lock()
+        self._conn = None
+        self._memory = OrderedDict()
+        self._inflight = {}
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "coalesced": 0, "failures": 0}
+
+    def open(self):
+        with self._lock:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+            self._conn.execute(
+                "DELETE FROM translations WHERE created_at < ?", (int(time.time()) - self.ttl_seconds,)
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    @staticmethod
+    def make_key(text, langpair):
+        return hashlib.sha1(f"{langpair}\n{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+    def _remember(self, key, translated, created_at):
+        self._memory[key] = (translated, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, text, langpair):
+        """جستجو در حافظه و سپس دیسک؛ None اگر ترجمه معتبری وجود نداشته باشد"""
+        key = self.make_key(text, langpair)
+        cutoff = int(time.time()) - self.ttl_seconds
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[1] >= cutoff:
+                    self._memory.move_to_end(key)
+                    self.counters["memory_hits"] += 1
+                    return entry[0]
+                # TTL در حافظه هم رعایت می‌شود؛ نسخه دیسک هم به همین اندازه قدیمی است
+                del self._memory[key]
+
+            if self._conn is None:
+                return None
+
+            row = self._conn.execute(
+                "SELECT translated, created_at FROM translations WHERE key = ? AND created_at >= ?",
+                (key, cutoff)
+            ).fetchone()
+            if row is None:
+                return None
+
+            self.counters["disk_hits"] += 1
+            self._remember(key, row[0], row[1])
+            return row[0]
+
+    def put(self, text, langpair, translated):
+        key = self.make_key(text, langpair)
+        created_at = int(time.time())
+        with self._lock:
+            self._remember(key, translated, created_at)
+            if self._conn is not None:
+                with self._conn:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO translations (key, langpair, translated, created_at) VALUES (?, ?, ?, ?)",
+                        (key, langpair, translated, created_at)
+                    )
+
+    async def get_or_fetch(self, text, langpair, fetch):
+        """ترجمه از کش یا با یک فراخوانی مشترک fetch(text) برای درخواست‌های همزمان"""
+        cached = self.get(text, langpair)
+        if cached is not None:
+            return cached
+
+        key = self.make_key(text, langpair)
+        loop = asyncio.get_running_loop()
+        task = self._inflight.get(key)
+
+        if task is not None and task.get_loop() is loop:
+            self.counters["coalesced"] += 1
+            return await asyncio.shield(task)
+
+        self.counters["misses"] += 1
+        task = loop.create_task(fetch(text))
+        self._inflight[key] = task
+
+        def store(done):
+            # حتی اگر منتظر اصلی لغو شده باشد، ترجمه دیرهنگام برای چرخه‌های بعد ذخیره می‌شود
+            if self._inflight.get(key) is done:
+                del self._inflight[key]
+            if done.cancelled() or done.exception() is not None or not done.result():
+                self.counters["failures"] += 1
+            else:
+                self.put(text, langpair, done.result())
+
+        task.add_done_callback(store)
+        return await asyncio.shield(task)
+
+    def stats(self):
+        hits = self.counters["memory_hits"] + self.counters["disk_hits"] + self.counters["coalesced"]
+        lookups = hits + self.counters["misses"]
+        return {
+            **self.counters,
+            "memory_entries": len(self._memory),
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0
+        }
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._conn is not None:
+                with self._conn:
+                    self._conn.execute("DELETE FROM translations")
+        logging.info("🧹 کش ترجمه پاک شد")